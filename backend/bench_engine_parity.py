@@ -0,0 +1,60 @@
+"""
+V41.3 Engine Parity Benchmark
+Runs the same requests through the FastAPI routes (in-process TestClient) and through the direct engine
+calls Streamlit's call_backend fallback makes, checks the answers match and that both transports read
+the same warm caches (API keys, disease catalogue, HTTP pools, outbreak index).
+Usage: python bench_engine_parity.py [repeat]
+"""
+import sys
+import time
+from fastapi.testclient import TestClient
+import main
+import logic
+import http_pool
+import disease_database
+import outbreak_index
+
+SAMPLE = {"temperature": 29.0, "ph": 6.4, "nitrogen": 2.8, "phosphorus": 1.9, "potassium": 2.1,
+          "soil_type": "Alluvial", "state": "Tamil Nadu", "place": "Coimbatore", "country": "India"}
+
+CASES = (
+    ("predict-crop", "POST", SAMPLE, lambda: logic.predict_crop_logic(dict(SAMPLE))),
+    # Corpus hit in English: deterministic, and exercises the variance and intel-named crop boosts
+    ("geographic-intelligence", "POST", {**SAMPLE, "variance": 0.97, "language": "English"},
+     lambda: logic.get_geographic_intelligence_logic({**SAMPLE, "variance": 0.97, "language": "English"})),
+    ("outbreak-heatmap", "GET", {"days": 30}, lambda: logic.outbreak_heatmap_logic(days=30)),
+    ("chat", "POST", {"message": "Best crop?", "language": "English", "context_data": {}},
+     lambda: logic.chat_logic("Best crop?", "English", {})),
+)
+
+def timed(fn, repeat):
+    t0 = time.perf_counter()
+    for _ in range(repeat): res = fn()
+    return res, (time.perf_counter() - t0) / repeat * 1000
+
+if __name__ == "__main__":
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    client = TestClient(main.app)
+    assert main.engine is logic, "FastAPI routes are not using the shared engine module"
+
+    print(f"{'endpoint':<26}{'fastapi ms':>12}{'engine ms':>12}{'parity':>8}")
+    mismatches = 0
+    for endpoint, method, payload, direct in CASES:
+        call = (lambda: client.post(f"/api/{endpoint}", json=payload).json()) if method == "POST" \
+            else (lambda: client.get(f"/api/{endpoint}", params=payload).json())
+        api_res, api_ms = timed(call, repeat)
+        eng_res, eng_ms = timed(direct, repeat)
+        same = api_res == eng_res
+        mismatches += not same
+        print(f"{endpoint:<26}{api_ms:>12.3f}{eng_ms:>12.3f}{'OK' if same else 'DIFF':>8}")
+
+    # A lookup through either transport warms the one catalogue both of them read
+    disease_database.get_disease_info("Rice Blast")
+    print("\nShared state:")
+    print(f"  api key cache      {logic.get_api_key.cache_info()}")
+    print(f"  disease catalogue  loaded={disease_database.catalogue.loaded}")
+    print(f"  http pools         {sorted(http_pool.pool_stats())}")
+    print(f"  outbreak index     {'shared' if outbreak_index.outbreak_index is logic.outbreak_index else 'SPLIT'}")
+    if mismatches:
+        print(f"\n{mismatches} endpoint(s) diverged between transports")
+        sys.exit(1)
@@ -0,0 +1,213 @@
+"""
+V41.6 CPU Hot-Path Micro-Benchmarks
+Times the CPU-bound paths (crop scoring, disease lookup tiers, regional place lookup tiers, PDF reports per
+language, text cleaning, yield model, response parsing) and compares them with the stored baselines in bench_baselines.json.
+Exits non-zero when a case's median is slower than its baseline by more than the threshold plus NOISE_SIGMAS times the
+round-to-round spread measured for it; baselines recorded on a different machine class are reported, never gated on.
+Usage: python bench_hotpaths.py [--save] [--threshold 0.25] [-k filter] [--rounds 9] [--baselines file]
+"""
+import os
+import io
+import gc
+import sys
+import json
+import time
+import base64
+import atexit
+import shutil
+import argparse
+import platform
+import tempfile
+import statistics
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_FILE = os.path.join(BACKEND_DIR, "bench_baselines.json")
+CORPUS_FILE = os.path.join(BACKEND_DIR, "response_corpus.json")
+TARGET_ROUND_S = 0.2  # each round repeats the call until it takes about this long
+NOISE_SIGMAS = 2      # a slowdown within 2 relative stdevs of either run's rounds is noise, not a regression
+
+SOIL = {"temperature": 29.0, "ph": 6.4, "nitrogen": 2.8, "phosphorus": 1.9, "potassium": 2.1,
+        "soil_type": "Alluvial", "state": "Tamil Nadu", "place": "Coimbatore", "country": "India"}
+REPORT_LANGUAGES = ("English", "Hindi", "Tamil", "Telugu")
+MARKDOWN_TEXT = "**DIAGNOSIS:** _Rice Blast_ detected. ### Apply `Tricyclazole` 0.6 g/L — रोग नियंत्रण " * 20
+
+def crop_cases():
+    from crop_engine import predict_crop_scores
+    import logic
+    return {
+        "predict_crop_scores": lambda: predict_crop_scores(SOIL),
+        "predict_crop_logic": lambda: logic.predict_crop_logic(SOIL),
+    }
+
+def disease_cases():
+    from disease_database import get_disease_info, catalogue
+    catalogue.load()
+    # One query per lookup tier: exact key, substring of a key, shared tokens, and no match at all
+    return {f"get_disease_info[{tier}]": (lambda q=query: get_disease_info(q)) for tier, query in (
+        ("exact", "Rice Blast"), ("partial", "rice blast lesions"),
+        ("token", "Blast Leaf Rice"), ("miss", "Purple Sky Syndrome"),
+    )}
+
+def regional_cases():
+    from regional_intel import regional_intel, normalize
+    regional_intel.load()
+    # Uncached resolve per tier: exact/alias name, phonetic skeleton, edit distance, unknown place
+    return {f"regional_lookup[{tier}]": (lambda q=normalize(query): regional_intel._resolve(q, None)) for tier, query in (
+        ("exact", "Nellore"), ("phonetic", "chithore"), ("fuzzy", "Thiruvanathapuram"), ("miss", "Rameswaram Town"),
+    )}
+
+def sample_image():
+    from PIL import Image
+    buf = io.BytesIO()
+    Image.new("RGB", (320, 240), (46, 125, 50)).save(buf, format="JPEG")
+    return base64.b64encode(buf.getvalue()).decode("ascii")
+
+def report_cases():
+    from report_engine import EliteAgriReportV14
+    from disease_database import get_disease_info
+    out_dir = tempfile.mkdtemp(prefix="bench_reports_")
+    atexit.register(shutil.rmtree, out_dir, ignore_errors=True)
+    engine = EliteAgriReportV14(output_dir=out_dir)
+    image = sample_image()
+    info = get_disease_info("Rice Blast").copy()
+    scores = {"Rice": 88.5, "Wheat": 61.0, "Corn": 72.4}
+
+    def report(language, with_image):
+        path, _ = engine.generate_report(dict(SOIL), "Rice is recommended for this field.", "North Sector",
+                                         history=[], image_base64=image if with_image else None,
+                                         condition_name="Rice Blast", language=language,
+                                         disease_info=info, crop_scores=scores)
+        os.remove(path)
+
+    cases = {}
+    for language in REPORT_LANGUAGES:
+        cases[f"generate_report[{language}]"] = lambda l=language: report(l, False)
+        cases[f"generate_report[{language},image]"] = lambda l=language: report(l, True)
+    cases["clean_text[ascii]"] = lambda: engine.clean_text(MARKDOWN_TEXT)
+    cases["clean_text[unicode]"] = lambda: engine.clean_text(MARKDOWN_TEXT, allow_unicode=True)
+    return cases
+
+def yield_cases():
+    from ml_model import predictor
+    return {"YieldPredictor.predict": lambda: predictor.predict(120.0, 28.5, 60.0, 12.0)}
+
+def parser_cases():
+    from response_parser import parse_vision, parse_advisory
+    with open(CORPUS_FILE, encoding="utf-8") as f:
+        corpus = json.load(f)
+
+    def each(fn, texts):
+        for text in texts: fn(text)
+
+    return {
+        "parse_vision[corpus]": lambda: each(parse_vision, corpus["vision"]),
+        "parse_advisory[corpus]": lambda: each(parse_advisory, corpus["advisory"]),
+    }
+
+# Groups load independently so a missing optional dependency (scikit-learn, fpdf) only skips its own cases
+GROUPS = (crop_cases, disease_cases, regional_cases, report_cases, yield_cases, parser_cases)
+
+def collect(selector=None):
+    cases, skipped = {}, {}
+    for group in GROUPS:
+        try:
+            loaded = group()
+        except ImportError as e:
+            skipped[group.__name__] = str(e)
+            continue
+        cases.update({name: fn for name, fn in loaded.items() if not selector or selector in name})
+    return cases, skipped
+
+def measure(fn, rounds):
+    """Per-call microseconds: calibrate a loop count, then the median, min and relative spread over `rounds` rounds."""
+    fn()  # warm caches and lazy imports
+    loops, elapsed = 1, 0.0
+    while True:
+        t0 = time.perf_counter()
+        for _ in range(loops): fn()
+        elapsed = time.perf_counter() - t0
+        if elapsed >= TARGET_ROUND_S / 5 or loops >= 1_000_000: break
+        loops *= 10 if elapsed < TARGET_ROUND_S / 50 else 2
+    loops = max(1, int(loops * TARGET_ROUND_S / max(elapsed, 1e-9)))
+    samples = []
+    gc.collect()
+    gc.disable()  # like timeit: a collection triggered by earlier cases must not land in this one's rounds
+    try:
+        for _ in range(rounds):
+            t0 = time.perf_counter()
+            for _ in range(loops): fn()
+            samples.append((time.perf_counter() - t0) / loops * 1e6)
+    finally:
+        gc.enable()
+    median = statistics.median(samples)
+    spread = statistics.stdev(samples) / median if len(samples) > 1 and median else 0.0
+    return {"median_us": round(median, 3), "min_us": round(min(samples), 3), "spread": round(spread, 4), "loops": loops}
+
+def machine_meta():
+    return {"python": platform.python_version(), "machine": platform.machine(), "cpu_count": os.cpu_count()}
+
+def same_machine_class(meta):
+    """Baselines only gate on the interpreter minor version, architecture and CPU count they were recorded on."""
+    here = machine_meta()
+    return (meta.get("python", "").rsplit(".", 1)[0] == here["python"].rsplit(".", 1)[0]
+            and meta.get("machine") == here["machine"] and meta.get("cpu_count") == here["cpu_count"])
+
+def load_baselines(path):
+    """(meta, cases) of the baseline file; empty when there is none."""
+    if not os.path.exists(path): return {}, {}
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return data.get("meta", {}), data.get("cases", {})
+
+def save_baselines(path, results):
+    merged = {**load_baselines(path)[1], **results}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"meta": machine_meta(), "cases": dict(sorted(merged.items()))}, f, indent=2)
+
+def allowed_slowdown(threshold, base, res):
+    return threshold + NOISE_SIGMAS * max(base.get("spread", 0.0), res["spread"])
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CPU hot-path micro-benchmarks with baseline comparison")
+    parser.add_argument("--save", action="store_true", help="record these results as the new baselines")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown vs baseline (0.25 = +25%%)")
+    parser.add_argument("-k", dest="selector", help="only run cases whose name contains this text")
+    parser.add_argument("--rounds", type=int, default=9)
+    parser.add_argument("--baselines", default=BASELINE_FILE)
+    args = parser.parse_args()
+
+    cases, skipped = collect(args.selector)
+    meta, baselines = ({}, {}) if args.save else load_baselines(args.baselines)
+    gating = bool(baselines) and same_machine_class(meta)
+    if baselines and not gating:
+        print(f"Baselines were recorded on {meta}, this is {machine_meta()}: reporting only, not gating\n")
+    results, regressions = {}, []
+    print(f"{'case':<36}{'median us':>12}{'spread':>8}{'base med':>12}{'delta':>9}{'allowed':>9}")
+    for name, fn in cases.items():
+        res = results[name] = measure(fn, args.rounds)
+        # Compared on the median of the rounds, against a threshold widened by the measured noise
+        base = baselines.get(name, {})
+        delta = (res["median_us"] / base["median_us"] - 1) if base.get("median_us") else None
+        if delta is not None and delta > allowed_slowdown(args.threshold, base, res):
+            # Confirm before flagging so one noisy burst on a shared machine doesn't fail the run
+            retry = measure(fn, args.rounds)
+            if retry["median_us"] < res["median_us"]:
+                res = results[name] = retry
+                delta = res["median_us"] / base["median_us"] - 1
+        allowed = allowed_slowdown(args.threshold, base, res) if delta is not None else None
+        flag = ""
+        if delta is not None and delta > allowed:
+            flag = "  REGRESSION" if gating else "  (slower)"
+            if gating: regressions.append(name)
+        base_med = f"{base['median_us']:.2f}" if base.get("median_us") else "-"
+        print(f"{name:<36}{res['median_us']:>12.2f}{res['spread']:>8.1%}{base_med:>12}"
+              f"{f'{delta:+.0%}' if delta is not None else '-':>9}{f'{allowed:.0%}' if allowed is not None else '-':>9}{flag}")
+    for group, reason in skipped.items():
+        print(f"skipped {group}: {reason}")
+
+    if args.save:
+        save_baselines(args.baselines, results)
+        print(f"\nBaselines saved to {args.baselines}")
+    elif regressions:
+        print(f"\n{len(regressions)} case(s) slower than baseline by more than {args.threshold:.0%} + noise: {', '.join(regressions)}")
+        sys.exit(1)
@@ -0,0 +1,174 @@
+"""
+V41.5 Load & Latency Benchmark
+Starts the upstream stand-in (upstream_stub.py) and the backend pointed at it, drives every /api/* endpoint
+at increasing concurrency and writes p50/p95/p99 latency, throughput and error rate per endpoint to a JSON
+results file. Reports the backend writes during the run are removed afterwards.
+Usage: python bench_load.py [--levels 1,4,16] [--requests 40] [--latency-scale 1.0] [--profile stub.json]
+                            [--endpoints chat,predict-crop] [--out bench_results/load.json]
+"""
+import os
+import sys
+import json
+import time
+import signal
+import argparse
+import datetime
+import platform
+import tempfile
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from http_pool import get_session
+from upstream_stub import UpstreamStub, DEFAULT_PORT as STUB_PORT
+
+BACKEND_PORT = 8091
+BASE = f"http://127.0.0.1:{BACKEND_PORT}"
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+REPORTS_DIR = os.path.join(BACKEND_DIR, "reports")
+RESULTS_DIR = os.path.join(BACKEND_DIR, "bench_results")
+
+SOIL = {"temperature": 29.0, "ph": 6.4, "nitrogen": 2.8, "phosphorus": 1.9, "potassium": 2.1,
+        "soil_type": "Alluvial", "state": "Tamil Nadu", "place": "Coimbatore", "country": "India"}
+TINY_IMAGE = "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mP8z8BQDwAEhQGAhKmMIQAAAABJRU5ErkJggg=="
+
+# name: (method, path, payload). /api/tts is left out: speech goes to Google TTS, which the stand-in does not emulate.
+ENDPOINTS = {
+    "health": ("GET", "/api/health", None),
+    "http-stats": ("GET", "/api/http-stats", None),
+    "live-data": ("GET", "/api/live-data", None),
+    "predict-crop": ("POST", "/api/predict-crop", SOIL),
+    "simulate": ("POST", "/api/simulate", {"temperature": 30.5, "ph": 6.6}),
+    "telemetry-ingest": ("POST", "/api/telemetry/ingest", {"sector": "Bench Sector", "columns": {"temperature": [28.0, 28.4, 28.9], "ph": [6.4, 6.5, 6.5]}}),
+    "telemetry-range": ("GET", "/api/telemetry/range", {"sector": "Bench Sector", "resolution": "raw"}),
+    "outbreak-heatmap": ("GET", "/api/outbreak-heatmap", {"days": 30}),
+    "geographic-intelligence": ("POST", "/api/geographic-intelligence", {**SOIL, "lat": 11.0168, "lon": 76.9558}),
+    "chat": ("POST", "/api/chat", {"message": "Best fertilizer for paddy?", "language": "English", "context_data": {}}),
+    "vision-diagnosis": ("POST", "/api/vision-diagnosis", {"image_base64": TINY_IMAGE, "language": "English", "crop": "Rice", "state": "Tamil Nadu"}),
+    "generate-report": ("POST", "/api/generate-report", {"data": SOIL, "recommendation": "Rice", "language": "English"}),
+}
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values: return None
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+def start_backend(upstream_base, state_db):
+    env = {**os.environ, "AGRI_UPSTREAM_BASE": upstream_base, "AGRI_STATE_DB": state_db,
+           "GROQ_API_KEY": "bench", "HUGGING_FACE_API_KEY": "bench",
+           "OPENWEATHER_API_KEY": "bench", "COMMODITIES_API_KEY": "bench"}
+    proc = subprocess.Popen(
+        [sys.executable, "main.py", "--port", str(BACKEND_PORT), "--graceful-timeout", "5"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    session = get_session("backend")
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            if session.get(f"{BASE}/api/health", timeout=1).status_code == 200:
+                return proc
+        except Exception:
+            time.sleep(0.3)
+    proc.kill()
+    raise RuntimeError("Backend did not come up")
+
+def stop_backend(proc):
+    proc.send_signal(signal.SIGINT)
+    try:
+        proc.wait(timeout=20)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+
+def drive(endpoint, concurrency, total):
+    method, path, payload = ENDPOINTS[endpoint]
+    session = get_session("backend")
+
+    def one(_):
+        t0 = time.perf_counter()
+        try:
+            if method == "GET":
+                res = session.get(f"{BASE}{path}", params=payload, timeout=120)
+            else:
+                res = session.post(f"{BASE}{path}", json=payload, timeout=120)
+            ok = res.status_code == 200
+        except Exception:
+            ok = False
+        return ok, (time.perf_counter() - t0) * 1000
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        results = list(pool.map(one, range(total)))
+    elapsed = time.perf_counter() - t0
+    latencies = sorted(ms for _, ms in results)
+    errors = sum(not ok for ok, _ in results)
+    return {
+        "endpoint": endpoint, "concurrency": concurrency, "requests": total,
+        "throughput_rps": round(total / elapsed, 2), "error_rate": round(errors / total, 4),
+        "p50_ms": round(percentile(latencies, 50), 2), "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+    }
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except Exception:
+        return None
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Drive every /api/* endpoint against local upstream stand-ins")
+    parser.add_argument("--levels", default="1,4,16", help="comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=40, help="requests per endpoint per level")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="multiplies every stand-in median latency")
+    parser.add_argument("--profile", help="JSON file overriding the stand-in latency/error profile")
+    parser.add_argument("--endpoints", help="comma-separated subset of: " + ", ".join(ENDPOINTS))
+    parser.add_argument("--out", help="results file (default bench_results/load_<timestamp>.json)")
+    args = parser.parse_args()
+
+    levels = [int(n) for n in args.levels.split(",")]
+    endpoints = args.endpoints.split(",") if args.endpoints else list(ENDPOINTS)
+    unknown = [e for e in endpoints if e not in ENDPOINTS]
+    if unknown:
+        parser.error(f"unknown endpoint(s): {', '.join(unknown)}")
+    profile = {}
+    if args.profile:
+        with open(args.profile, encoding="utf-8") as f:
+            profile = json.load(f)
+
+    stub = UpstreamStub(STUB_PORT, profile)
+    for cfg in stub.profile.values():
+        cfg["median_ms"] = cfg.get("median_ms", 100) * args.latency_scale
+    stub.start()
+    reports_before = set(os.listdir(REPORTS_DIR)) if os.path.isdir(REPORTS_DIR) else set()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        proc = start_backend(stub.base_url, os.path.join(tmp, "state.db"))
+        try:
+            print(f"{'endpoint':<26}{'conc':>5}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'err %':>7}")
+            for endpoint in endpoints:
+                drive(endpoint, 1, 2)  # warm-up: imports, pools, catalogue
+                for level in levels:
+                    row = drive(endpoint, level, args.requests)
+                    results.append(row)
+                    print(f"{endpoint:<26}{level:>5}{row['throughput_rps']:>9.1f}{row['p50_ms']:>10.1f}"
+                          f"{row['p95_ms']:>10.1f}{row['p99_ms']:>10.1f}{row['error_rate'] * 100:>7.1f}")
+        finally:
+            stop_backend(proc)
+            stub.stop()
+
+    if os.path.isdir(REPORTS_DIR):
+        for name in set(os.listdir(REPORTS_DIR)) - reports_before:
+            os.remove(os.path.join(REPORTS_DIR, name))
+
+    out = args.out or os.path.join(RESULTS_DIR, f"load_{datetime.datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump({
+            "meta": {"timestamp": datetime.datetime.now().isoformat(timespec="seconds"), "revision": git_revision(),
+                     "python": platform.python_version(), "cpu_count": os.cpu_count(), "levels": levels,
+                     "requests_per_level": args.requests, "latency_scale": args.latency_scale,
+                     "stub_profile": stub.profile},
+            "upstream_calls": stub.stats(),
+            "results": results,
+        }, f, indent=2)
+    print(f"\nResults written to {out}")
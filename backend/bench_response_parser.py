@@ -0,0 +1,59 @@
+"""
+V41.2 Response Parser Benchmark
+Times the single-pass regex parser against the old split/scan loops on response_corpus.json
+(representative vision and advisory outputs) and reports how often each one returns a missing or
+markdown-polluted CONDITION / an unsplit advisory envelope.
+Usage: python bench_response_parser.py [repeat]
+"""
+import os
+import sys
+import json
+import time
+from response_parser import parse_vision, parse_advisory
+
+CORPUS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "response_corpus.json")
+
+def legacy_vision(text):
+    entity, condition, confidence = "Plant", "Condition", "75%"
+    for line in text.split('\n'):
+        if "ENTITY:" in line: entity = line.replace("ENTITY:", "").strip()
+        if "CONDITION:" in line: condition = line.replace("CONDITION:", "").strip()
+        if "CONFIDENCE:" in line: confidence = line.replace("CONFIDENCE:", "").strip()
+    return entity, condition, confidence
+
+def legacy_advisory(ans):
+    if "TRANSLATION:" in ans and "SUMMARY:" in ans:
+        parts = ans.split("SUMMARY:")
+        return parts[0].replace("TRANSLATION:", "").strip(), parts[1].strip()
+    return ans, ans[:150]
+
+def dirty(value):
+    """Missing, or still carrying markdown decoration the model wrapped around the field."""
+    return not value or value == "Condition" or value[0] in "*>-#" or value.endswith("*")
+
+def bench(fn, corpus, repeat):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        for text in corpus: fn(text)
+    return (time.perf_counter() - t0) / (repeat * len(corpus)) * 1e6
+
+if __name__ == "__main__":
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    with open(CORPUS_FILE, encoding="utf-8") as f:
+        corpus = json.load(f)
+
+    print(f"{'parser':<28}{'us/response':>12}{'failures':>10}")
+    for label, fn, texts, failed in (
+        ("legacy vision loop", legacy_vision, corpus["vision"], lambda r: dirty(r[1])),
+        ("parse_vision", parse_vision, corpus["vision"], lambda r: dirty(r.condition)),
+        ("legacy advisory split", legacy_advisory, corpus["advisory"], lambda r: "SUMMARY:" in r[0] + r[1] or "TRANSLATION:" in r[0] + r[1]),
+        ("parse_advisory", parse_advisory, corpus["advisory"], lambda r: not r.structured),
+    ):
+        failures = sum(1 for t in texts if failed(fn(t)))
+        print(f"{label:<28}{bench(fn, texts, repeat):>12.2f}{failures:>7}/{len(texts)}")
+
+    print("\nParse diagnostics:")
+    for text in corpus["vision"]:
+        print(f"  vision   {parse_vision(text).diagnostics()}")
+    for text in corpus["advisory"]:
+        print(f"  advisory {parse_advisory(text).diagnostics()}")
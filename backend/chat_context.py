@@ -0,0 +1,143 @@
+"""
+V42.0 Chat Context Builder
+Assembles the chat prompt's history and intel context under an explicit token budget: recent turns verbatim,
+older turns folded once into a per-session running summary, intel blocks (geo report, bio-scan advisory)
+deduplicated against the history and sent by the client only when they change (digest refs otherwise).
+Session data lives in shared_state, so every worker and the Streamlit local engine see the same summary.
+"""
+import os
+import re
+import hashlib
+from dataclasses import dataclass, field
+from shared_state import shared_state
+
+CONTEXT_TOKENS = int(os.getenv("CHAT_CONTEXT_TOKENS", "1800"))
+RECENT_TURNS = 4
+TURN_CHARS = 500            # per recent turn, as before
+SUMMARY_LINE_CHARS = 160    # per turn folded into the summary
+SESSION_TTL = 6 * 3600
+# Share of the budget left after the fixed prompt: focused intel block, the other block, summary
+FOCUS_SHARE, OTHER_SHARE, SUMMARY_SHARE = 0.45, 0.2, 0.15
+INTEL_KINDS = {"location_intel": "GEO-INTEL", "bio_audit": "BIO-SCAN"}
+FOCUS_KIND = {"Localization": "location_intel", "Bio-Scan": "bio_audit"}
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+|\n+")
+
+def estimate_tokens(text):
+    """~4 characters per token for Llama-family tokenizers on English/markdown text."""
+    return (len(text or "") + 3) // 4
+
+def digest(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+def clip(text, tokens):
+    """Cut to roughly `tokens`, at a sentence or line boundary when one is close."""
+    limit = tokens * 4
+    if len(text) <= limit: return text
+    cut = text[:limit]
+    boundary = max(cut.rfind(". "), cut.rfind("\n"))
+    return (cut[:boundary + 1] if boundary > limit * 0.6 else cut).rstrip() + " …"
+
+def first_sentence(text):
+    text = " ".join(str(text).split())
+    head = SENTENCE_END.split(text, 1)[0]
+    return head if len(head) <= SUMMARY_LINE_CHARS else head[:SUMMARY_LINE_CHARS].rstrip() + "…"
+
+@dataclass
+class ChatContext:
+    history: list                       # messages for the model, oldest first
+    intel: str                          # "\nGEO-INTEL: ...\nBIO-SCAN: ..." block for the user message
+    refs: dict = field(default_factory=dict)      # kind -> digest the client may send next time
+    missing: list = field(default_factory=list)   # refs the server no longer holds; client should resend
+    stats: dict = field(default_factory=dict)
+
+class ChatContextBuilder:
+    def __init__(self, budget=CONTEXT_TOKENS, state=shared_state):
+        self.budget = budget
+        self.state = state
+
+    def _key(self, session_id, name):
+        return f"chat:{session_id}:{name}"
+
+    def resolve_intel(self, session_id, context_data):
+        """Full intel text per kind; `<kind>_ref` digests are looked up in the session store."""
+        blocks, missing = {}, []
+        for kind in INTEL_KINDS:
+            text, ref = context_data.get(kind), context_data.get(f"{kind}_ref")
+            if text:
+                text = str(text)
+                if session_id:
+                    self.state.set(self._key(session_id, f"intel:{digest(text)}"), text, ttl=SESSION_TTL)
+                blocks[kind] = text
+            elif ref and session_id:
+                text = self.state.get(self._key(session_id, f"intel:{ref}"))
+                if text: blocks[kind] = text
+                else: missing.append(kind)
+        return blocks, missing
+
+    def summary(self, session_id, older):
+        """Running summary of `older` turns; only turns not folded in on an earlier request are processed."""
+        if not older: return ""
+        key = self._key(session_id, "summary") if session_id else None
+        cached = self.state.get(key, {"upto": 0, "lines": []}) if key else {"upto": 0, "lines": []}
+        if cached["upto"] > len(older):  # history was cleared or rewritten on the client
+            cached = {"upto": 0, "lines": []}
+        lines = cached["lines"] + [f"{m['role']}: {first_sentence(m['content'])}" for m in older[cached["upto"]:]]
+        if key and len(older) > cached["upto"]:
+            self.state.set(key, {"upto": len(older), "lines": lines}, ttl=SESSION_TTL)
+        return "\n".join(lines)
+
+    def build(self, history, context_data, fixed_text=""):
+        context_data = context_data or {}
+        session_id = context_data.get("session_id")
+        blocks, missing = self.resolve_intel(session_id, context_data)
+        available = max(0, self.budget - estimate_tokens(fixed_text))
+        used = {"fixed": estimate_tokens(fixed_text)}
+
+        # 1. Intel: the block matching the chat focus gets the larger share
+        focus = FOCUS_KIND.get(context_data.get("chat_focus"), "location_intel")
+        intel, intel_tokens = "", 0
+        for kind in sorted(blocks, key=lambda k: k != focus):
+            share = FOCUS_SHARE if kind == focus else OTHER_SHARE
+            text = clip(blocks[kind], int(available * share))
+            intel += f"\n{INTEL_KINDS[kind]}: {text}"
+            intel_tokens += estimate_tokens(text)
+        used["intel"] = intel_tokens
+        remaining = available - intel_tokens
+
+        # 2. Recent turns, newest first; ones that just repeat an intel block become a pointer to it
+        history = [m for m in (history or []) if m.get("content")]
+        first_recent = max(0, len(history) - RECENT_TURNS)
+        older = history[:first_recent]
+        kept, deduped = [], 0
+        for pos in range(len(history) - 1, first_recent - 1, -1):
+            msg = history[pos]
+            content = str(msg["content"])
+            for kind, text in blocks.items():
+                if text[:200] in content:
+                    content, deduped = f"[{INTEL_KINDS[kind]} report shown in CONTEXT]", deduped + 1
+                    break
+            content = content[:TURN_CHARS]
+            cost = estimate_tokens(content)
+            if cost > remaining - int(available * SUMMARY_SHARE) and kept:
+                older = history[:pos + 1]  # by position: a repeated question must not cut the summary short
+                break
+            kept.append({"role": msg["role"], "content": content})
+            remaining -= cost
+        kept.reverse()
+        used["history"] = sum(estimate_tokens(m["content"]) for m in kept)
+
+        # 3. Older turns: cached running summary, clipped to what is left
+        summary = self.summary(session_id, older)
+        if summary:
+            summary = clip(summary[-max(0, remaining) * 4:], max(0, remaining)) if remaining > 0 else ""
+        if summary:
+            kept.insert(0, {"role": "system", "content": f"EARLIER CONVERSATION (summary):\n{summary}"})
+        used["summary"] = estimate_tokens(summary)
+
+        refs = {kind: digest(text) for kind, text in blocks.items()}
+        stats = {"budget": self.budget, "tokens": sum(used.values()), **{f"{k}_tokens": v for k, v in used.items()},
+                 "turns_verbatim": len(kept) - bool(summary), "turns_summarized": len(older), "deduped": deduped}
+        return ChatContext(kept, intel, refs, missing, stats)
+
+# Global instance
+chat_context = ChatContextBuilder()
@@ -0,0 +1,92 @@
+"""
+V40.7 Backend Connectivity Manager
+Periodic /api/health probing with a cached mode, per-endpoint timeouts and no double execution.
+"""
+import time
+import uuid
+import threading
+import logging
+import requests
+from http_pool import get_session
+
+logger = logging.getLogger("AGRI_LINK")
+
+# Slow endpoints get their real budget instead of a blanket 2 s cut-off
+ENDPOINT_TIMEOUTS = {
+    "vision-diagnosis": 90,
+    "geographic-intelligence": 40,
+    "chat": 35,
+    "generate-report": 60,
+    "live-data": 5,
+    "outbreak-heatmap": 5,
+    "tts": 5,
+}
+DEFAULT_TIMEOUT = 15
+
+class BackendBusy(Exception):
+    """The backend accepted the request but did not answer in time; it is still working on it."""
+    def __init__(self, endpoint, request_id=None):
+        super().__init__(f"{endpoint} (request {request_id})")
+        self.endpoint = endpoint
+        self.request_id = request_id
+
+class BackendLink:
+    def __init__(self, api_base, probe_interval=15.0, probe_timeout=0.5):
+        self.api_base = api_base
+        self.probe_interval = probe_interval
+        self.probe_timeout = probe_timeout
+        self.mode = None  # "server" | "local"
+        self.last_probe = 0.0
+        self.lock = threading.Lock()
+        self.session = get_session("backend")
+
+    def probe(self):
+        try:
+            ok = self.session.get(f"{self.api_base}/health", timeout=self.probe_timeout).status_code == 200
+        except requests.RequestException:
+            ok = False
+        mode = "server" if ok else "local"
+        if mode != self.mode:
+            logger.info(f"Backend Link Mode: {mode.upper()}")
+        self.mode, self.last_probe = mode, time.monotonic()
+        return mode
+
+    def current_mode(self):
+        """Cached mode; re-probed at most once per probe_interval."""
+        if self.mode is None or time.monotonic() - self.last_probe > self.probe_interval:
+            with self.lock:
+                if self.mode is None or time.monotonic() - self.last_probe > self.probe_interval:
+                    self.probe()
+        return self.mode
+
+    def request(self, endpoint, method="POST", payload=None):
+        """JSON body on 200, None when the caller should run the local engine instead.
+
+        Raises BackendBusy on a read timeout: the server is still executing the request,
+        so repeating it locally would only double the upstream cost.
+        """
+        if self.current_mode() != "server":
+            return None
+        url = f"{self.api_base}/{endpoint}"
+        timeout = ENDPOINT_TIMEOUTS.get(endpoint, DEFAULT_TIMEOUT)
+        # V41.8: Same id the server traces under, so a slow call can be looked up in its spans
+        headers = {"X-Request-ID": uuid.uuid4().hex}
+        try:
+            if method == "POST":
+                res = self.session.post(url, json=payload, timeout=timeout, headers=headers)
+            else:
+                res = self.session.get(url, params=payload, timeout=timeout, headers=headers)
+        except requests.ReadTimeout:
+            logger.warning(f"Backend Busy: {endpoint} request {headers['X-Request-ID']} exceeded {timeout}s")
+            raise BackendBusy(endpoint, headers["X-Request-ID"])
+        except requests.RequestException:
+            self.mode = "local"  # Server went away; next probe decides when to return
+            self.last_probe = time.monotonic()
+            return None
+        if res.status_code != 200:
+            logger.warning(f"Backend {endpoint} returned {res.status_code} (request {res.headers.get('X-Request-ID')})")
+            return None
+        try:
+            return res.json()
+        except ValueError:
+            return None
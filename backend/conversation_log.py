@@ -0,0 +1,80 @@
+"""
+V42.1 Server-Held Conversation Log
+Chat history lives on the server, addressed by session id, so clients upload only what is new:
+  history_version  the version (ETag) of the log the client last saw
+  history_delta    messages added on the client since then (e.g. a geo report shown in the chat)
+  history          the full list: first request of a session, or a resync after a conflict
+Versions are "<epoch>.<n>": the epoch changes whenever a log is (re)created, so a stale client can never
+match a newer log by accident. The chat route appends the question and answer itself.
+"""
+import uuid
+from shared_state import shared_state
+from chat_context import SESSION_TTL
+
+ROLES = {"user", "assistant"}
+MAX_MESSAGES = 500   # per session; an oversized upload is truncated to its newest messages
+MAX_CHARS = 20000    # per message
+
+class ConversationConflict(Exception):
+    """The client's history_version is not the log's current version; it should resend the full history."""
+    def __init__(self, version):
+        super().__init__(f"Conversation is at version {version}")
+        self.version = version
+
+def clean_messages(messages):
+    return [{"role": m["role"], "content": str(m["content"])[:MAX_CHARS]}
+            for m in (messages or []) if isinstance(m, dict) and m.get("role") in ROLES and m.get("content")]
+
+class ConversationLog:
+    def __init__(self, state=shared_state, ttl=SESSION_TTL):
+        self.state = state
+        self.ttl = ttl
+
+    def _key(self, session_id):
+        return f"conv:{session_id}"
+
+    @staticmethod
+    def version(log):
+        return f"{log['epoch']}.{log['n']}" if log else None
+
+    def get(self, session_id):
+        """(messages, version); ([], None) for an unknown or expired session."""
+        log = self.state.get(self._key(session_id))
+        return (log["messages"], self.version(log)) if log else ([], None)
+
+    def append(self, session_id, messages, if_version=None):
+        """Append atomically; with `if_version`, only if the log is still at that version. Returns (messages, version)."""
+        messages = clean_messages(messages)
+        def apply(log):
+            if if_version is not None and self.version(log) != if_version:
+                raise ConversationConflict(self.version(log))
+            log = log or {"epoch": uuid.uuid4().hex[:8], "n": 0, "messages": []}
+            if messages:
+                log["messages"] = (log["messages"] + messages)[-MAX_MESSAGES:]
+                log["n"] += 1
+            return log
+        log = self.state.modify(self._key(session_id), apply, ttl=self.ttl)
+        return log["messages"], self.version(log)
+
+    def replace(self, session_id, messages):
+        log = {"epoch": uuid.uuid4().hex[:8], "n": 0, "messages": clean_messages(messages)[-MAX_MESSAGES:]}
+        self.state.set(self._key(session_id), log, ttl=self.ttl)
+        return log["messages"], self.version(log)
+
+    def delete(self, session_id):
+        self.state.delete(self._key(session_id))
+
+    def sync(self, payload):
+        """Apply a request's history fields; returns (history, version), version None without a session id.
+        Raises ConversationConflict when history_version is stale."""
+        session_id = payload.get("session_id")
+        if not session_id:
+            return clean_messages(payload.get("history")), None
+        if payload.get("history") is not None:
+            return self.replace(session_id, payload["history"])
+        if payload.get("history_version") is None:
+            return self.get(session_id)
+        return self.append(session_id, payload.get("history_delta") or [], if_version=payload["history_version"])
+
+# Global instance
+conversation_log = ConversationLog()
@@ -0,0 +1,62 @@
+"""
+V40.3 Crop Suitability Engine
+Vectorized V15.0 weighted predictor shared by the FastAPI backend, the standalone logic and the Tk GUI.
+"""
+import numpy as np
+
+# Ideals: [Temp, PH, N, P, K, Preferred Soils, Key Regions]
+# Weights: Temp(20), PH(15), N(20), P(10), K(10), Soil(15), Region(10)
+CROP_SPECS = {
+    "Rice": [30, 6.0, 3.0, 2.0, 2.0, ["alluvial", "clay"], ["tamil nadu", "telangana", "andhra pradesh", "west bengal"]],
+    "Wheat": [20, 6.5, 2.0, 1.5, 1.5, ["alluvial", "black"], ["punjab", "haryana", "uttar pradesh"]],
+    "Corn": [26, 6.8, 3.5, 2.5, 3.0, ["red", "alluvial"], ["karnataka", "maharashtra", "andhra pradesh"]],
+    "Soybeans": [25, 6.2, 1.5, 2.0, 2.5, ["black", "red"], ["madhya pradesh", "maharashtra", "rajasthan"]],
+    "Cotton": [28, 7.5, 2.5, 1.8, 2.2, ["black"], ["gujarat", "maharashtra", "telangana"]],
+    "Sugarcane": [32, 7.0, 4.0, 3.0, 3.5, ["alluvial", "black"], ["uttar pradesh", "maharashtra", "karnataka"]]
+}
+
+CROPS = list(CROP_SPECS)
+IDEALS = np.array([spec[:5] for spec in CROP_SPECS.values()], dtype=np.float64)
+WEIGHTS = np.array([20, 15, 20, 10, 10], dtype=np.float64)
+SLOPES = np.array([1.5, 8, 8, 5, 5], dtype=np.float64)
+SOIL_MATCH = {soil: np.array([soil in spec[5] for spec in CROP_SPECS.values()]) for spec in CROP_SPECS.values() for soil in spec[5]}
+REGION_MATCH = {state: np.array([state in spec[6] for spec in CROP_SPECS.values()]) for spec in CROP_SPECS.values() for state in spec[6]}
+NO_MATCH = np.zeros(len(CROPS), dtype=bool)
+
+def predict_crop_scores(data):
+    """Same scores as the original per-crop loop, computed as one (crops x factors) array op."""
+    x = np.array([
+        data.get("temperature", 25), data.get("ph", 6.5), data.get("nitrogen", 2.0),
+        data.get("phosphorus", 1.8), data.get("potassium", 2.2)
+    ], dtype=np.float64)
+    soil = data.get("soil_type", "Alluvial").lower()
+    state = data.get("state", "Tamil Nadu").lower()
+
+    parts = np.maximum(0, WEIGHTS - np.abs(x - IDEALS) * SLOPES)
+    s_soil = np.where(SOIL_MATCH.get(soil, NO_MATCH), 15, 5)
+    s_reg = np.where(REGION_MATCH.get(state, NO_MATCH), 10, 0)
+    # Column-by-column adds keep the original left-to-right float summation order
+    totals = np.minimum(100, parts[:, 0] + parts[:, 1] + parts[:, 2] + parts[:, 3] + parts[:, 4] + s_soil + s_reg)
+
+    scores = {crop: round(float(t), 1) for crop, t in zip(CROPS, totals)}
+    best_crop = max(scores, key=scores.get)
+    return {"scores": scores, "recommendation": best_crop, "suitability": scores[best_crop]}
+
+def crops_for_region(state):
+    """Crops whose key regions include `state` (used to narrow the vision disease shortlist)."""
+    state = (state or "").lower()
+    return [crop for crop, spec in CROP_SPECS.items() if state in spec[6]]
+
+def apply_intel_boost(scores, intel, variance=1.0):
+    """V22.2 scoring on top of the engine: the request's variance factor, then +25 (capped) for every crop
+    the local intelligence text names ("paddy" counts for Rice)."""
+    intel = (intel or "").lower()
+    boosted = {}
+    for crop, score in scores.items():
+        score = round(score * variance, 1)
+        if crop.lower() in intel:
+            score = min(98.5, score + 25.0)
+        if "paddy" in intel and crop == "Rice":
+            score = min(98.8, score + 25.0)
+        boosted[crop] = score
+    return boosted
@@ -0,0 +1,126 @@
+"""
+V40.8 Pooled HTTP Clients
+One keep-alive Session per upstream (Groq, Hugging Face, OpenWeatherMap, Commodities, Wikipedia,
+Nominatim, local backend) with jittered retry backoff and per-upstream connection metrics.
+V41.8: Calls to the local backend carry an X-Request-ID; every call is a tracing span.
+"""
+import os
+import time
+import uuid
+import random
+import threading
+import requests
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from metrics import metrics
+from tracing import span, current_request_id
+
+# name: (pool size, connect retries, read retries). LLM calls are never re-sent after the
+# request went out (read=False keeps their ReadTimeout distinguishable, and a 429/5xx reply is
+# returned as-is); the local backend fails fast so standalone mode isn't delayed.
+UPSTREAMS = {
+    "groq": (8, 2, 0),
+    "huggingface": (4, 2, 0),
+    "openweathermap": (4, 2, 1),
+    "commodities": (2, 2, 1),
+    "wikipedia": (4, 2, 1),
+    "nominatim": (2, 2, 1),
+    "backend": (8, 0, 0),
+    "collector": (2, 1, 0),
+}
+LOCAL_SESSIONS = {"backend", "collector"}  # never redirected to the stand-in
+RETRY_STATUS = (429, 502, 503, 504)
+
+# V41.5: Benchmarks point every external upstream at a local stand-in (see upstream_stub.py);
+# "https://api.groq.com/openai/..." becomes "{AGRI_UPSTREAM_BASE}/api.groq.com/openai/..."
+UPSTREAM_BASE = os.getenv("AGRI_UPSTREAM_BASE", "").rstrip("/")
+
+def redirect_upstream(url):
+    if not UPSTREAM_BASE: return url
+    parts = urlsplit(url)
+    return f"{UPSTREAM_BASE}/{parts.netloc}{parts.path}" + (f"?{parts.query}" if parts.query else "")
+
+class JitteredRetry(Retry):
+    """Exponential backoff with full jitter so parallel clients don't retry in lockstep."""
+    def get_backoff_time(self):
+        return random.uniform(0, super().get_backoff_time())
+
+class PooledSession(requests.Session):
+    def __init__(self, name):
+        super().__init__()
+        self.name = name
+        self.lock = threading.Lock()
+        self.metrics = {"requests": 0, "errors": 0, "total_ms": 0.0}
+
+    def request(self, method, url, *args, **kwargs):
+        if UPSTREAM_BASE and self.name not in LOCAL_SESSIONS:
+            url = redirect_upstream(url)
+        if self.name == "backend":
+            # The server echoes it back in its response headers and tags its trace with it
+            kwargs["headers"] = {"X-Request-ID": current_request_id() or uuid.uuid4().hex, **(kwargs.get("headers") or {})}
+        t0 = time.perf_counter()
+        outcome = "error"
+        try:
+            with span(f"upstream.{self.name}", **{"http.method": method, "server.address": urlsplit(url).hostname or ""}) as s:
+                res = super().request(method, url, *args, **kwargs)
+                if s is not None: s.set(**{"http.status_code": res.status_code})
+            outcome = f"{res.status_code // 100}xx"
+            return res
+        except requests.RequestException:
+            with self.lock: self.metrics["errors"] += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - t0
+            with self.lock:
+                self.metrics["requests"] += 1
+                self.metrics["total_ms"] += elapsed * 1000
+            # V41.7: Same call, exported per provider on /metrics
+            metrics.inc("agrivision_upstream_requests_total", {"upstream": self.name, "outcome": outcome})
+            metrics.observe("agrivision_upstream_request_duration_seconds", elapsed, {"upstream": self.name})
+
+    def stats(self):
+        """Requests vs. TCP/TLS connections actually opened; the difference is keep-alive reuse."""
+        opened = 0
+        for adapter in set(self.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is not None: opened += pool.num_connections
+        with self.lock:
+            m = dict(self.metrics)
+        m["connections_opened"] = opened
+        m["connections_reused"] = max(0, m["requests"] - m["errors"] - opened)
+        m["avg_ms"] = round(m.pop("total_ms") / m["requests"], 1) if m["requests"] else 0.0
+        return m
+
+_sessions = {}
+_lock = threading.Lock()
+
+def _build(name):
+    pool_size, connect_retries, read_retries = UPSTREAMS.get(name, (4, 2, 0))
+    # Status retries re-send a request the server already received: only for pools that allow read
+    # retries, and only for idempotent methods (urllib3's default allowed_methods excludes POST)
+    retry = JitteredRetry(
+        total=3, connect=connect_retries, read=read_retries or False, status=2 if read_retries else 0,
+        status_forcelist=RETRY_STATUS,
+        backoff_factor=0.5, respect_retry_after_header=True, raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size, max_retries=retry)
+    session = PooledSession(name)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def get_session(name):
+    """The process-wide Session for an upstream, created on first use."""
+    session = _sessions.get(name)
+    if session is None:
+        with _lock:
+            session = _sessions.get(name)
+            if session is None:
+                session = _sessions[name] = _build(name)
+    return session
+
+def pool_stats():
+    return {name: s.stats() for name, s in list(_sessions.items())}
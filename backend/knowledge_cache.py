@@ -0,0 +1,188 @@
+"""
+V42.3 Knowledge Fetch Cache
+Persistent HTTP cache for the knowledge sources (Wikipedia REST page summaries). Entries are gzip-compressed
+JSON files on disk, fresh for KNOWLEDGE_TTL_DAYS, then revalidated with If-None-Match / If-Modified-Since so an
+unchanged page costs a 304. Stale entries are served while the upstream is failing; 404s are kept for a day.
+Titles come from user input, so the directory is capped at KNOWLEDGE_CACHE_ENTRIES, least recently used first.
+Warm it offline for every district and state in the regional corpus:
+  python knowledge_cache.py --prefetch [--state "Tamil Nadu"] [--file titles.txt] [--workers 4] [--revalidate]
+"""
+import os
+import sys
+import gzip
+import json
+import time
+import hashlib
+import logging
+import argparse
+import threading
+import requests
+from urllib.parse import quote
+from concurrent.futures import ThreadPoolExecutor
+from http_pool import get_session
+
+logger = logging.getLogger("AGRI_KNOWLEDGE")
+
+CACHE_DIR = os.getenv("AGRI_KNOWLEDGE_CACHE", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".knowledge_cache"))
+KNOWLEDGE_TTL = float(os.getenv("KNOWLEDGE_TTL_DAYS", "30")) * 86400
+NEGATIVE_TTL = 86400             # "no such page" is re-checked daily
+MAX_STALE = 365 * 86400          # oldest entry served when the upstream is down
+MAX_ENTRIES = int(os.getenv("KNOWLEDGE_CACHE_ENTRIES", "5000"))  # the whole corpus prefetch is ~800
+PRUNE_EVERY = 50                 # writes between directory scans (the cap may be exceeded by this many)
+CACHEABLE = (200, 404)
+WIKI_SUMMARY = "https://en.wikipedia.org/api/rest_v1/page/summary/{}"
+
+def wiki_summary_url(title):
+    return WIKI_SUMMARY.format(quote(title.strip().replace(" ", "_"), safe=""))
+
+class KnowledgeResponse:
+    """The subset of requests.Response the callers use, for cached and fresh answers alike."""
+    def __init__(self, entry, source):
+        self.status_code = entry["status"]
+        self.text = entry["body"]
+        self.source = source  # fresh | revalidated | fetched | stale | uncached
+
+    def json(self):
+        return json.loads(self.text)
+
+class KnowledgeCache:
+    def __init__(self, cache_dir=CACHE_DIR, ttl=KNOWLEDGE_TTL, max_entries=MAX_ENTRIES):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.writes = 0
+        self.lock = threading.Lock()
+        self.stats = {"fresh": 0, "revalidated": 0, "fetched": 0, "stale": 0}
+
+    def _path(self, url):
+        return os.path.join(self.cache_dir, f"{hashlib.sha1(url.encode('utf-8')).hexdigest()}.json.gz")
+
+    def _read(self, url):
+        path = self._path(url)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                entry = json.load(f)
+            os.utime(path)  # mtime = last use, the order _prune evicts in
+            return entry
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Knowledge Cache Entry Unreadable ({url}): {e}")
+            return None
+
+    def _write(self, url, entry):
+        # Written to a temp file and renamed, so another worker never reads half an entry
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(url)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp, path)
+        with self.lock:
+            self.writes += 1
+            due = self.writes % PRUNE_EVERY == 1  # first write too: short-lived processes (CLI, workers) prune
+        if due: self._prune()
+
+    def _prune(self):
+        """Drop the least recently used entries beyond max_entries."""
+        try:
+            files = [os.path.join(self.cache_dir, n) for n in os.listdir(self.cache_dir) if n.endswith(".json.gz")]
+            if len(files) <= self.max_entries: return
+            files.sort(key=os.path.getmtime)
+            for path in files[:len(files) - self.max_entries]:
+                os.remove(path)
+        except OSError as e:
+            logger.warning(f"Knowledge Cache Prune Failed: {e}")
+
+    def _count(self, source):
+        with self.lock:
+            self.stats[source] += 1
+
+    def fetch(self, url, session="wikipedia", timeout=5, offline=False, revalidate=False):
+        """Cached GET. `offline` never touches the network (None when not cached); `revalidate` skips the TTL."""
+        entry = self._read(url)
+        now = time.time()
+        if entry and not revalidate and now - entry["validated"] < (self.ttl if entry["status"] == 200 else NEGATIVE_TTL):
+            self._count("fresh")
+            return KnowledgeResponse(entry, "fresh")
+        if offline:
+            if entry: self._count("stale")
+            return KnowledgeResponse(entry, "stale") if entry else None
+
+        headers = {}
+        if entry and entry["status"] == 200:
+            if entry.get("etag"): headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"): headers["If-Modified-Since"] = entry["last_modified"]
+        try:
+            res = get_session(session).get(url, headers=headers, timeout=timeout)
+        except requests.RequestException:
+            if entry and now - entry["fetched"] < MAX_STALE:
+                self._count("stale")
+                return KnowledgeResponse(entry, "stale")
+            raise
+
+        if res.status_code == 304 and entry:
+            entry["validated"] = now
+            self._write(url, entry)
+            self._count("revalidated")
+            return KnowledgeResponse(entry, "revalidated")
+        if res.status_code in CACHEABLE:
+            entry = {"url": url, "status": res.status_code, "body": res.text, "fetched": now, "validated": now,
+                     "etag": res.headers.get("ETag"), "last_modified": res.headers.get("Last-Modified")}
+            self._write(url, entry)
+            self._count("fetched")
+            return KnowledgeResponse(entry, "fetched")
+        if entry and now - entry["fetched"] < MAX_STALE:  # 429/5xx: keep answering from the old copy
+            self._count("stale")
+            return KnowledgeResponse(entry, "stale")
+        return KnowledgeResponse({"status": res.status_code, "body": res.text}, "uncached")
+
+    def summary(self, title, offline=False):
+        """Wikipedia lead extract for a page title, or None."""
+        try:
+            res = self.fetch(wiki_summary_url(title), offline=offline)
+        except requests.RequestException:
+            return None
+        if res is None or res.status_code != 200: return None
+        try:
+            return res.json().get("extract") or None
+        except ValueError:
+            return None
+
+    def prefetch(self, titles, workers=4, revalidate=False):
+        """Warm the cache for many page titles; returns how each one was answered."""
+        def one(title):
+            try:
+                return self.fetch(wiki_summary_url(title), revalidate=revalidate).source
+            except requests.RequestException as e:
+                logger.warning(f"Prefetch Failed ({title}): {e}")
+                return "error"
+        counts = {}
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="prefetch") as pool:
+            for source in pool.map(one, titles):
+                counts[source] = counts.get(source, 0) + 1
+        return counts
+
+# Global instance
+knowledge_cache = KnowledgeCache()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Warm the knowledge cache for the regional corpus")
+    parser.add_argument("--prefetch", action="store_true", help="fetch every district/state article (default action)")
+    parser.add_argument("--state", action="append", help="only districts of this state (repeatable)")
+    parser.add_argument("--file", help="page titles to fetch, one per line, instead of the corpus")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--revalidate", action="store_true", help="send conditional requests even for fresh entries")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    if args.file:
+        with open(args.file, encoding="utf-8") as f:
+            titles = [line.strip() for line in f if line.strip()]
+    else:
+        from regional_intel import regional_intel
+        titles = regional_intel.articles(args.state)
+    t0 = time.perf_counter()
+    counts = knowledge_cache.prefetch(titles, args.workers, args.revalidate)
+    print(f"{len(titles)} titles in {time.perf_counter() - t0:.1f}s: {counts} -> {knowledge_cache.cache_dir}")
+    sys.exit(1 if counts.get("error") == len(titles) and titles else 0)
@@ -0,0 +1,117 @@
+"""
+V40.1 Live Push Channel
+One server-side refresh loop fans telemetry/market deltas out to every WebSocket subscriber.
+"""
+import asyncio
+import copy
+import json
+import threading
+import logging
+
+logger = logging.getLogger("AGRI_LIVE")
+
+SECTIONS = ("telemetry", "market")
+
+def diff_sections(old, new):
+    """Changed keys per section; an empty dict means nothing to push."""
+    delta = {}
+    for section in SECTIONS:
+        before, after = (old or {}).get(section, {}), new.get(section, {})
+        changed = {k: v for k, v in after.items() if before.get(k) != v}
+        if changed: delta[section] = changed
+    return delta
+
+class LiveHub:
+    """Server side: holds the last snapshot and the set of connected sockets."""
+    def __init__(self):
+        self.clients = set()
+        self.snapshot = None
+        self.seq = 0
+
+    async def subscribe(self, ws):
+        await ws.accept()
+        self.clients.add(ws)
+        if self.snapshot is not None:
+            await ws.send_json({"type": "snapshot", "seq": self.seq, **self.snapshot})
+
+    def unsubscribe(self, ws):
+        self.clients.discard(ws)
+
+    async def publish(self, state):
+        """Record a new state and push only what changed since the previous one."""
+        state = copy.deepcopy({s: state.get(s, {}) for s in SECTIONS})
+        delta = diff_sections(self.snapshot, state)
+        self.snapshot = state
+        if not delta: return None
+        self.seq += 1
+        message = {"type": "delta", "seq": self.seq, **delta}
+        if self.clients:
+            clients = list(self.clients)
+            results = await asyncio.gather(*(ws.send_json(message) for ws in clients), return_exceptions=True)
+            for ws, res in zip(clients, results):
+                if isinstance(res, Exception): self.clients.discard(ws)
+        return message
+
+    async def run(self, refresh, interval=3.0):
+        """The single upstream refresh loop; `refresh` is a blocking callable returning a state."""
+        while True:
+            try:
+                await self.publish(await asyncio.to_thread(refresh))
+            except Exception as e:
+                logger.error(f"Live Refresh Failed: {e}")
+            await asyncio.sleep(interval)
+
+class LiveSubscriber:
+    """Client side (Tk GUI / Streamlit): background socket that keeps a merged live state."""
+    def __init__(self, ws_url, on_update=None, reconnect_delay=3.0):
+        self.ws_url = ws_url
+        self.on_update = on_update
+        self.reconnect_delay = reconnect_delay
+        self.state = {s: {} for s in SECTIONS}
+        self.seq = 0
+        self.connected = False
+        self.lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Returns False when no WebSocket client is installed so callers can keep polling."""
+        try:
+            from websockets.sync.client import connect  # noqa: F401
+        except ImportError:
+            return False
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return True
+
+    def stop(self):
+        self._stop.set()
+
+    def snapshot(self):
+        with self.lock:
+            return copy.deepcopy(self.state)
+
+    def _apply(self, message):
+        with self.lock:
+            if message.get("type") == "snapshot":
+                self.state = {s: dict(message.get(s, {})) for s in SECTIONS}
+            else:
+                for s in SECTIONS:
+                    self.state[s].update(message.get(s, {}))
+            self.seq = message.get("seq", self.seq)
+
+    def _run(self):
+        from websockets.sync.client import connect
+        while not self._stop.is_set():
+            try:
+                with connect(self.ws_url, open_timeout=3) as ws:
+                    self.connected = True
+                    for raw in ws:
+                        self._apply(json.loads(raw))
+                        if self.on_update: self.on_update(self.snapshot())
+                        if self._stop.is_set(): break
+            except Exception:
+                pass
+            self.connected = False
+            self._stop.wait(self.reconnect_delay)
@@ -0,0 +1,104 @@
+"""
+V41.4 Multi-Worker Load Test
+Starts the backend with 1, 2 and 4 uvicorn workers on a scratch port and state file, hammers a CPU-bound
+endpoint from concurrent clients and reports throughput per worker count. Also checks that state written
+through one request is visible to every worker, and that the per-process telemetry/profiler routes either agree
+on every read (one worker) or are refused by every worker (several).
+Usage: python load_test_workers.py [requests_per_run] [concurrency] [worker counts...]
+"""
+import os
+import sys
+import time
+import signal
+import tempfile
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from http_pool import get_session
+
+PORT = 8092
+BASE = f"http://127.0.0.1:{PORT}"
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+SAMPLE = {"temperature": 29.0, "ph": 6.4, "nitrogen": 2.8, "phosphorus": 1.9, "potassium": 2.1,
+          "soil_type": "Alluvial", "state": "Tamil Nadu", "place": "Coimbatore", "country": "India"}
+
+def start_server(workers, state_db):
+    env = {**os.environ, "AGRI_STATE_DB": state_db, "LIVE_REFRESH_SECONDS": "3600"}
+    proc = subprocess.Popen(
+        [sys.executable, "main.py", "--workers", str(workers), "--port", str(PORT), "--graceful-timeout", "5"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    session = get_session("backend")
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            if session.get(f"{BASE}/api/health", timeout=1).status_code == 200:
+                return proc
+        except Exception:
+            time.sleep(0.3)
+    proc.kill()
+    raise RuntimeError(f"Backend with {workers} worker(s) did not come up")
+
+def stop_server(proc):
+    proc.send_signal(signal.SIGINT)
+    try:
+        proc.wait(timeout=20)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+
+def hammer(total, concurrency):
+    session = get_session("backend")
+    def one(_):
+        t0 = time.perf_counter()
+        ok = session.post(f"{BASE}/api/predict-crop", json=SAMPLE, timeout=30).status_code == 200
+        return ok, time.perf_counter() - t0
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        results = list(pool.map(one, range(total)))
+    elapsed = time.perf_counter() - t0
+    latencies = sorted(lat for _, lat in results)
+    return {"rps": total / elapsed, "errors": sum(not ok for ok, _ in results),
+            "p50_ms": latencies[len(latencies) // 2] * 1000, "p95_ms": latencies[int(len(latencies) * 0.95)] * 1000}
+
+def state_is_shared(samples=20):
+    """Write through one request, then read back enough times to land on every worker."""
+    session = get_session("backend")
+    marker = f"load-test-{time.time():.0f}"
+    session.post(f"{BASE}/api/simulate", json={"place": marker}, timeout=10)
+    return all(session.get(f"{BASE}/api/live-data", timeout=10).json()["telemetry"].get("place") == marker
+               for _ in range(samples))
+
+def per_process_consistent(workers, samples=20):
+    """Telemetry history and the profiler live in one process: with one worker a reading ingested once is in every
+    range read; with several, every worker must refuse the routes (503) rather than answer from its own copy."""
+    session = get_session("backend")
+    sector = f"load-test-{time.time():.0f}"
+    ingest = session.post(f"{BASE}/api/telemetry/ingest", json={"sector": sector, "readings": [{"temperature": 30.0}]}, timeout=10)
+    reads = [session.get(f"{BASE}/api/telemetry/range", params={"sector": sector}, timeout=10) for _ in range(samples)]
+    reads += [session.get(f"{BASE}/api/admin/profiler", timeout=10) for _ in range(samples)]
+    if workers > 1:
+        return ingest.status_code == 503 and all(r.status_code == 503 for r in reads)
+    return ingest.status_code == 200 and all(r.status_code == 200 for r in reads) and \
+        all(r.json()["fields"]["temperature"] == [30.0] for r in reads[:samples])
+
+if __name__ == "__main__":
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    counts = [int(n) for n in sys.argv[3:]] or [1, 2, 4]
+    print(f"CPU cores: {os.cpu_count()}  requests/run: {total}  concurrency: {concurrency}")
+    print(f"{'workers':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'errors':>8}{'shared':>8}{'local':>7}")
+    baseline = None
+    with tempfile.TemporaryDirectory() as tmp:
+        for workers in counts:
+            proc = start_server(workers, os.path.join(tmp, f"state_{workers}.db"))
+            try:
+                hammer(min(50, total), concurrency)  # warm-up
+                res = hammer(total, concurrency)
+                shared = state_is_shared()
+                local = per_process_consistent(workers)
+            finally:
+                stop_server(proc)
+            baseline = baseline or res["rps"]
+            print(f"{workers:>8}{res['rps']:>10.1f}{res['p50_ms']:>10.1f}{res['p95_ms']:>10.1f}"
+                  f"{res['errors']:>8}{'yes' if shared else 'NO':>8}{'yes' if local else 'NO':>7}   x{res['rps'] / baseline:.2f}")
+    if (os.cpu_count() or 1) < max(counts):
+        print("\nNote: fewer cores than workers, so throughput cannot scale past the core count on this machine.")
@@ -1,37 +1,42 @@
-import requests
+"""
+AgriVision Core Engine
+Single implementation of weather/market feeds, geo-intelligence, chat, vision diagnosis and reports.
+V41.3: Invoked by the FastAPI routes (main.py) and by Streamlit's call_backend fallback alike, so both
+transports share one set of caches, HTTP pools and indexes.
+"""
 import os
+import re
 import json
 import base64
 import random
 import datetime
 import logging
-from geopy.geocoders import Nominatim
-from geopy.exc import GeopyError
-from disease_database import get_disease_info
+import sys
+import time
+from functools import lru_cache
+from disease_database import get_disease_info, candidate_diseases
+from outbreak_index import outbreak_index
+from regional_intel import regional_intel
+from knowledge_cache import knowledge_cache, wiki_summary_url
+from crop_engine import predict_crop_scores, crops_for_region, apply_intel_boost
+from urllib.parse import urlsplit
+from http_pool import get_session, UPSTREAM_BASE
+from response_parser import parse_vision, parse_advisory
+from tracing import span
+from chat_context import chat_context
+from conversation_log import conversation_log, ConversationConflict
 
 # --- CONFIG ---
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("AGRI_LOGIC")
 
-# --- REGIONAL KNOWLEDGE BASE ---
-REGIONAL_KNOWLEDGE = {
-    "nellore": "Famous as the 'Rice Bowl of Andhra Pradesh'. Best crops: Paddy (NLR-34449, RNR-15048), Blackgram, Chillies, and Cotton. Soil: Coastal Alluvial & Red soils.",
-    "coimbatore": "Industrial Agri-Hub. Best crops: Sorghum, Maize, Cotton, and Sugarcane. Soil: Black & Red Soil.",
-    "guntur": "World-famous for Chillies. Best crops: Chillies, Cotton, Tobacco, and Paddy.",
-    "chittoor": "Known for horticulture and poultry. Best crops: Groundnut, Sugarcane, Mango, and Paddy. Soil: Red Loamy/Sandy soils.",
-    "chithore": "Known for horticulture and poultry. Best crops: Groundnut, Sugarcane, Mango, and Paddy. Soil: Red Loamy/Sandy soils.",
-    "chithor": "Known for horticulture and poultry. Best crops: Groundnut, Sugarcane, Mango, and Paddy. Soil: Red Loamy/Sandy soils.",
-    "nashik": "Wine capital. Best crops: Grapes, Onion, and Tomatoes.",
-    "punjab": "Best crops: Wheat, Paddy (Basmati), and Sugarcane."
-}
-
 # --- REAL DATA FUNCTIONS ---
 def get_real_weather(city="Coimbatore", country_code="IN"):
     api_key = os.getenv("OPENWEATHER_API_KEY")
     if not api_key: return None
     try:
         url = f"https://api.openweathermap.org/data/2.5/weather?q={city},{country_code}&appid={api_key}&units=metric"
-        res = requests.get(url, timeout=5)
+        res = get_session("openweathermap").get(url, timeout=5)
         if res.status_code == 200:
             data = res.json()
             return {
@@ -43,15 +48,32 @@ def get_real_weather(city="Coimbatore", country_code="IN"):
     except: pass
     return None
 
+_geolocator = None
+
+def get_geolocator():
+    """V40.9: geopy costs ~100 ms to import, so it is loaded on the first geocode, not at startup"""
+    global _geolocator
+    if _geolocator is None:
+        from geopy.geocoders import Nominatim
+        if UPSTREAM_BASE:
+            # V41.5: Geocoding follows the other upstreams to the local stand-in during benchmarks
+            base = urlsplit(UPSTREAM_BASE)
+            _geolocator = Nominatim(user_agent="agrivision_ai", domain=f"{base.netloc}{base.path}/nominatim.openstreetmap.org", scheme=base.scheme)
+        else:
+            _geolocator = Nominatim(user_agent="agrivision_ai")
+    return _geolocator
+
 def reverse_geocode(lat, lon):
     """Converts coordinates to human-readable location data."""
+    from geopy.exc import GeopyError
     try:
-        geolocator = Nominatim(user_agent="agrivision_ai")
+        geolocator = get_geolocator()
         location = geolocator.reverse((lat, lon), language='en')
         if location:
             addr = location.raw.get('address', {})
             return {
                 "place": addr.get('village') or addr.get('suburb') or addr.get('town') or addr.get('city') or "Unknown",
+                "district": addr.get('state_district') or addr.get('county'),
                 "state": addr.get('state', "Unknown"),
                 "country": addr.get('country', "Unknown"),
                 "display_name": location.address
@@ -62,8 +84,9 @@ def reverse_geocode(lat, lon):
 
 def forward_geocode(query):
     """Converts a human-readable location into coordinates."""
+    from geopy.exc import GeopyError
     try:
-        geolocator = Nominatim(user_agent="agrivision_ai")
+        geolocator = get_geolocator()
         location = geolocator.geocode(query, language='en')
         if location:
             return {
@@ -80,7 +103,7 @@ def get_real_commodity_prices():
     if not api_key: return None
     try:
         url = f"https://commodities-api.com/api/latest?access_key={api_key}&base=USD&symbols=CORN,WHEAT,SOYBEAN,RICE"
-        res = requests.get(url, timeout=5)
+        res = get_session("commodities").get(url, timeout=5)
         if res.status_code == 200:
             data = res.json()
             if data.get("success"):
@@ -94,9 +117,13 @@ def get_real_commodity_prices():
     except: pass
     return None
 
+@lru_cache(maxsize=None)
 def get_api_key(name):
-    """Universal Key Discovery: Checks st.secrets then os.getenv safely"""
+    """Universal Key Discovery: Checks st.secrets then os.getenv safely (resolved once per key)"""
     try:
+        # Only consult secrets when already running under Streamlit; never import it from the API server
+        if "streamlit" not in sys.modules:
+            return os.getenv(name)
         import streamlit as st
         # Check if running on Streamlit Cloud (where secrets always exist) 
         # or if local secrets file exists to avoid property access warning
@@ -124,51 +151,38 @@ def translate_and_explain(text, target_lang):
         "temperature": 0.1
     }
     try:
-        res = requests.post(url, json=payload, headers=headers, timeout=15)
+        res = get_session("groq").post(url, json=payload, headers=headers, timeout=15)
         if res.status_code == 200:
-            raw = res.json()['choices'][0]['message']['content']
-            if "SUMMARY:" in raw and "TRANSLATION:" in raw:
-                parts = raw.split("TRANSLATION:")
-                return parts[1].strip(), parts[0].replace("SUMMARY:", "").strip()
+            parsed = parse_advisory(res.json()['choices'][0]['message']['content'])
+            if parsed.structured:
+                return parsed.answer, parsed.summary
         return text, text
     except: return text, text
 
+# --- PROGRAMMATIC SAFEGUARD (BOSS OVERRIDE) ---
+# V42.5: Applied once, server-side, to the final answer before it is logged, so the conversation log and every
+# client hold the same text; replacements are case-insensitive, so running it again finds nothing to change
+IDENTITY_TRIGGERS = ("Meta AI", "Facebook", "Meta's", "Llama", "Jason Weston")
+IDENTITY_REPLACEMENTS = ((re.compile(r"\bMeta AI\b", re.I), "Shaik's Engineering"), (re.compile(r"\bMeta\b", re.I), "Shaik"),
+                         (re.compile(r"Facebook", re.I), "SRM Tech Hub"), (re.compile(r"Llama", re.I), "AgriVision AI"),
+                         (re.compile(r"Jason Weston", re.I), "Shaik Mohammad Thaheer"))
+
+def enforce_identity(answer):
+    if not any(trigger.lower() in answer.lower() for trigger in IDENTITY_TRIGGERS): return answer
+    answer = f"I am AgriVision AI, an advanced agricultural intelligence ecosystem proudly developed by SHAIK MOHAMMAD THAHEER at SRM Institute. {answer}"
+    for pattern, replacement in IDENTITY_REPLACEMENTS:
+        answer = pattern.sub(replacement, answer)
+    return answer
+
 def get_official_resource(query):
     search_query = query.replace(" ", "+") + "+site%3Aicar.org.in+OR+site%3Atnau.ac.in"
     return f"https://www.google.com/search?q={search_query}"
 
 def predict_crop_logic(data):
-    temp = data.get("temperature", 25)
-    ph = data.get("ph", 6.5)
-    nitro = data.get("nitrogen", 2.0)
-    phos = data.get("phosphorus", 1.8)
-    potas = data.get("potassium", 2.2)
-    soil = data.get("soil_type", "Alluvial").lower()
-    state = data.get("state", "Tamil Nadu").lower()
-
-    crop_specs = {
-        "Rice": [30, 6.0, 3.0, 2.0, 2.0, ["alluvial", "clay"], ["tamil nadu", "telangana", "andhra pradesh", "west bengal"]],
-        "Wheat": [20, 6.5, 2.0, 1.5, 1.5, ["alluvial", "black"], ["punjab", "haryana", "uttar pradesh"]],
-        "Corn": [26, 6.8, 3.5, 2.5, 3.0, ["red", "alluvial"], ["karnataka", "maharashtra", "andhra pradesh"]],
-        "Soybeans": [25, 6.2, 1.5, 2.0, 2.5, ["black", "red"], ["madhya pradesh", "maharashtra", "rajasthan"]],
-        "Cotton": [28, 7.5, 2.5, 1.8, 2.2, ["black"], ["gujarat", "maharashtra", "telangana"]],
-        "Sugarcane": [32, 7.0, 4.0, 3.0, 3.5, ["alluvial", "black"], ["uttar pradesh", "maharashtra", "karnataka"]]
-    }
-
-    scores = {}
-    for crop, ideals in crop_specs.items():
-        s_temp = max(0, 20 - abs(temp - ideals[0]) * 1.5)
-        s_ph = max(0, 15 - abs(ph - ideals[1]) * 8)
-        s_n = max(0, 20 - abs(nitro - ideals[2]) * 8)
-        s_p = max(0, 10 - abs(phos - ideals[3]) * 5)
-        s_k = max(0, 10 - abs(potas - ideals[4]) * 5)
-        s_soil = 15 if soil in ideals[5] else 5
-        s_reg = 10 if state in ideals[6] else 0
-        total = round(min(100, s_temp + s_ph + s_n + s_p + s_k + s_soil + s_reg), 1)
-        scores[crop] = total
+    return predict_crop_scores(data)
 
-    best_crop = max(scores, key=scores.get)
-    return {"scores": scores, "recommendation": best_crop, "suitability": scores[best_crop]}
+# V22.1: Official intelligence line when neither the corpus nor Wikipedia knows the place
+DEFAULT_INTEL = "Real-time predictive analysis based on regional climate, soil taxonomy, and ICAR agricultural standards."
 
 def get_geographic_intelligence_logic(data):
     place = data.get("place", "Unknown")
@@ -176,29 +190,43 @@ def get_geographic_intelligence_logic(data):
     country = data.get("country", "India")
     lat = data.get("lat")
     lon = data.get("lon")
+    district = data.get("district")
     
     # If coordinates are provided, perform reverse geocoding
     if lat and lon:
-        geo_data = reverse_geocode(lat, lon)
+        with span("geo.reverse_geocode"):
+            geo_data = reverse_geocode(lat, lon)
         if geo_data:
             place = geo_data["place"]
             state = geo_data["state"]
             country = geo_data["country"]
+            district = geo_data.get("district") or district
 
     soil_type = data.get("soil_type", "Unknown")
     language = data.get("language", "English")
     
-    # 1. Check Local Knowledge Base
-    local_intel = ""
-    place_key = place.lower().strip()
-    if place_key in REGIONAL_KNOWLEDGE:
-        local_intel = f"**BUREAU DATA:** {REGIONAL_KNOWLEDGE[place_key]}\n\n"
+    # 1. Check Local Knowledge Base (V42.2: every district, misspellings resolved locally; a village falls back to its district)
+    local_intel = DEFAULT_INTEL
+    region = None
+    if country.strip().lower() == "india":
+        region = regional_intel.lookup(place, state) or (regional_intel.lookup(district, state) if district else None)
+    if region:
+        local_intel = regional_intel.summary(region)
     
-    # 2. AI POWERED REAL-DATA INFERENCE
+    # 2. AI POWERED REAL-DATA INFERENCE (only for places the regional corpus does not recognise)
     key = get_groq_key()
     intelligence_report = ""
     
-    if key:
+    if region:
+        intelligence_report = regional_intel.report(region)
+        # V42.3: add the Wikipedia lead when the prefetched knowledge cache has it; never fetched on this path
+        reference = knowledge_cache.summary(region["article"], offline=True)
+        if reference:
+            intelligence_report += f"\n5. 📚 REFERENCE: {reference}"
+        if language != "English":
+            with span("geo.translate_report", language=language):
+                intelligence_report, _ = translate_and_explain(intelligence_report, language)
+    elif key:
         prompt = (
             f"Role: Senior Agricultural Scientist (ICAR/FAO Expert).\n"
             f"Location: {place}, {state}, {country}. Lat/Lon: {lat},{lon}.\n"
@@ -220,8 +248,9 @@ def get_geographic_intelligence_logic(data):
         }
         
         try:
-            res = requests.post("https://api.groq.com/openai/v1/chat/completions", 
-                              json=payload, headers={"Authorization": f"Bearer {key}"}, timeout=20)
+            with span("geo.ai_report"):
+                res = get_session("groq").post("https://api.groq.com/openai/v1/chat/completions", 
+                                  json=payload, headers={"Authorization": f"Bearer {key}"}, timeout=20)
             if res.status_code == 200:
                 intelligence_report = res.json()['choices'][0]['message']['content']
         except:
@@ -230,18 +259,21 @@ def get_geographic_intelligence_logic(data):
     # Fallback to Wikipedia if AI fails
     if not intelligence_report:
         try:
-            wiki_url = f"https://en.wikipedia.org/api/rest_v1/page/summary/{place.replace(' ', '_')}"
-            wiki_res = requests.get(wiki_url, timeout=5)
+            # V42.3: persistent cache, revalidated with ETag/Last-Modified once stale
+            with span("geo.wikipedia_fallback") as sp:
+                wiki_res = knowledge_cache.fetch(wiki_summary_url(place))
+                if sp: sp.attributes["cache"] = wiki_res.source
             if wiki_res.status_code == 200:
-                intelligence_report = wiki_res.json().get('extract', "Real-time analysis unavailable.")
+                # V22.1: outside the corpus the encyclopedic extract is the official record
+                local_intel = wiki_res.json().get('extract') or local_intel
         except:
             intelligence_report = "Neural link failed. Manual field audit suggested."
 
-    full_intel = local_intel + intelligence_report
+    full_intel = f"**Official Intelligence:** {local_intel}" + (f"\n\n{intelligence_report}" if intelligence_report else "")
     
-    # 3. Crop Prediction Scores (Sync with the scientific report)
+    # 3. Crop Prediction Scores (Sync with the scientific report; V22.2 variance and intel boosts)
     pred_res = predict_crop_logic(data)
-    scores = pred_res["scores"]
+    scores = apply_intel_boost(pred_res["scores"], local_intel, float(data.get("variance") or 1.0))
     
     best_crop = max(scores, key=scores.get)
     summary = (
@@ -250,7 +282,8 @@ def get_geographic_intelligence_logic(data):
         f"**FINAL RECOMMENDATION:** {best_crop} ({scores[best_crop]}% suitability)"
     )
     
-    speech, _ = translate_and_explain(f"Geographic logistics for {place} complete. Providing real-time field data.", language)
+    with span("geo.translate", language=language):
+        speech, _ = translate_and_explain(f"Geographic logistics for {place} complete. Providing real-time field data.", language)
     
     return {
         "intelligence": summary, 
@@ -264,8 +297,11 @@ def chat_logic(message, language, context_data):
     key = get_groq_key()
     if not key: return {"answer": "Error: API_KEY_MISSING"}
     
-    chat_focus = context_data.get("chat_focus", "Localization")
-    history = context_data.get("history", [])
+    # V42.1: With a session id the history is the server-held log plus the client's delta
+    try:
+        history, version = conversation_log.sync(context_data)
+    except ConversationConflict as conflict:
+        return {"answer": "", "history_conflict": True, "history_version": conflict.version}
     
     identity_prefix = (
         "STRICT IDENTITY: You are AgriVision AI, an advanced agricultural intelligence ecosystem certified by ICAR (Indian Council of Agricultural Research). "
@@ -281,51 +317,65 @@ def chat_logic(message, language, context_data):
         f"STRICT: Respond ONLY in {language}. "
         f"Format: TRANSLATION: [Full Answer] SUMMARY: [1-sentence voice summary]. "
     )
+    if context_data.get("chat_focus") == "Bio-Scan":
+        system_prompt += (
+            "Instruction: You are in BIO-SCAN mode. Identify diseases and treatments. "
+            "Answer any agricultural questions with 100% accuracy. "
+        )
+    else:
+        system_prompt += (
+            "Instruction: You are an Agricultural Intelligence Expert. Answer any regional or "
+            "global crop questions with ICAR-level accuracy. Provide intelligence for any location requested. "
+        )
+    # Regional Knowledge Sync (V42.2: any district in the regional corpus, misspellings included)
+    place = context_data.get("place")
+    if place and str(context_data.get("country") or "India").strip().lower() == "india":
+        region = regional_intel.lookup(place, context_data.get("state"))
+        if region:
+            system_prompt += f"CURRENT CONTEXTUAL TRUTH for {region['name']}: {regional_intel.summary(region)} "
+    reminder = "STRICT IDENTITY REMINDER: You were created by Shaik Mohammad Thaheer. DO NOT MENTION META. Your Answer MUST reflect this.\n\n"
     
-    messages = [{"role": "system", "content": system_prompt}]
-    for msg in history[-4:]:
-        messages.append({"role": msg["role"], "content": str(msg["content"])[:500]})
+    # V42.0: History and intel fitted to the token budget (summary of older turns, intel deduplicated)
+    ctx = chat_context.build(history, context_data, fixed_text=system_prompt + reminder + message)
+    if ctx.missing:
+        # Intel sent by digest has expired server-side; the client resends it in full
+        return {"answer": "", "context_refs_missing": ctx.missing, "history_version": version}
     
-    intel_context = ""
-    if context_data.get("location_intel"): intel_context += f"\nGEO-INTEL: {context_data['location_intel']}"
-    if context_data.get("bio_audit"): intel_context += f"\nBIO-SCAN: {context_data['bio_audit']}"
+    messages = [{"role": "system", "content": system_prompt}] + ctx.history
     
     # Nuclear Injection: Force identity into the user message itself
-    injected_query = f"STRICT IDENTITY REMINDER: You were created by Shaik Mohammad Thaheer. DO NOT MENTION META. Your Answer MUST reflect this.\n\nCONTEXT: {intel_context}\nQUERY: {message}"
+    injected_query = f"{reminder}CONTEXT: {ctx.intel}\nQUERY: {message}"
     messages.append({"role": "user", "content": injected_query})
 
     try:
         payload = {"model": "llama-3.1-8b-instant", "messages": messages, "temperature": 0.2}
-        res = requests.post("https://api.groq.com/openai/v1/chat/completions", 
-                          json=payload, headers={"Authorization": f"Bearer {key}"}, timeout=20)
+        with span("chat.completion", history=len(history), prompt_tokens=ctx.stats["tokens"]):
+            res = get_session("groq").post("https://api.groq.com/openai/v1/chat/completions", 
+                              json=payload, headers={"Authorization": f"Bearer {key}"}, timeout=20)
         if res.status_code == 200:
-            ans = res.json()['choices'][0]['message']['content']
-            
-            # --- PROGRAMMATIC SAFEGUARD (BOSS OVERRIDE) ---
-            meta_triggers = ["Meta AI", "Facebook", "Meta's", "Llama", "Jason Weston"]
-            if any(trigger.lower() in ans.lower() for trigger in meta_triggers):
-                ans = f"I am AgriVision AI, an advanced agricultural intelligence ecosystem proudly developed by SHAIK MOHAMMAD THAHEER at SRM Institute. {ans}"
-                # Remove the Meta mentions manually
-                ans = ans.replace("Meta AI", "Shaik's Engineering").replace("Meta", "Shaik").replace("Facebook", "SRM Tech Hub")
-
-            if "TRANSLATION:" in ans and "SUMMARY:" in ans:
-                parts = ans.split("SUMMARY:")
-                return {"answer": parts[0].replace("TRANSLATION:", "").strip(), "speech_summary": parts[1].strip()}
-            return {"answer": ans, "speech_summary": ans[:150]}
-    except: pass
-    return {"answer": "Offline or API Error.", "speech_summary": "Link failure."}
-
-from disease_database import get_disease_info, DISEASE_TREATMENTS
-
-# ... (rest of logic remains same, just updating vision_diagnosis_logic)
+            parsed = parse_advisory(res.json()['choices'][0]['message']['content'])
+            resource_link = get_official_resource(message)
+            result = {"answer": enforce_identity(parsed.answer) + f"\n\n**🌐 OFFICAL SOURCE:** [Industrial Agriculture Research]({resource_link})",
+                      "speech_summary": enforce_identity(parsed.summary),
+                      "intel_refs": ctx.refs, "context": ctx.stats}
+        else:
+            result = {"answer": "Offline or API Error.", "speech_summary": "Link failure."}
+    except Exception:
+        result = {"answer": "Offline or API Error.", "speech_summary": "Link failure."}
+    if version:
+        # The client shows the same two messages; a concurrent write to the log forces it to resync
+        try:
+            _, result["history_version"] = conversation_log.append(
+                context_data["session_id"], [{"role": "user", "content": message}, {"role": "assistant", "content": result["answer"]}],
+                if_version=version)
+        except ConversationConflict:
+            result["history_version"] = None
+    return result
 
 def generate_report_logic(payload):
     try:
         from fpdf import FPDF
-        import base64
-        import datetime
         import tempfile
-        import os
         from io import BytesIO
 
         def clean(txt):
@@ -335,7 +385,10 @@ def generate_report_logic(payload):
         data = payload.get("data", {})
         recommendation = clean(payload.get("recommendation", "Industrial protocols deployed."))
         language = payload.get("language", "English")
-        history = payload.get("history", [])
+        try:
+            history, version = conversation_log.sync(payload)
+        except ConversationConflict as conflict:
+            return {"error": "history_conflict", "history_conflict": True, "history_version": conflict.version}
         condition_name = clean(payload.get("condition_name", "Unknown"))
         disease_info = payload.get("disease_info")
         market = payload.get("market_snapshot", {})
@@ -495,25 +548,30 @@ def generate_report_logic(payload):
             pdf_bytes = bytes(pdf_bytes)
             
         b64_pdf = base64.b64encode(pdf_bytes).decode('utf-8')
-        return {"report_b64": b64_pdf, "filename": f"Master_Dossier_{datetime.datetime.now().strftime('%H%M%S')}.pdf"}
+        return {"report_b64": b64_pdf, "filename": f"Master_Dossier_{datetime.datetime.now().strftime('%H%M%S')}.pdf",
+                "history_version": version}
         
     except Exception as e:
         import traceback
         return {"error": f"Dossier Engine Fatal: {str(e)} | Point: {traceback.format_exc().splitlines()[-2]}"}
 
-def vision_diagnosis_logic(image_base64, language):
+def vision_diagnosis_logic(image_base64, language, lat=None, lon=None, crop=None, state=None, season=None):
     hf_key = get_api_key("HUGGING_FACE_API_KEY")
     groq_key = get_groq_key()
     if not hf_key or not groq_key: return {"answer": "Link Error: Key Missing"}
     
     # V38.5: CONTEXT-AWARE INDUSTRIAL REASONER
-    supported_diseases = ", ".join(list(DISEASE_TREATMENTS.keys()))
+    # V41.1: Only the top-K catalogue entries for this crop/region/season go into the prompt
+    with span("vision.shortlist", crop=crop or "", state=state or "", season=season or ""):
+        shortlist = candidate_diseases(crop, crops_for_region(state), season)
+    supported_diseases = ", ".join(shortlist)
     
     vision_prompt = (
         "Role: Expert Botanical Pathologist. Perform high-fidelity analysis.\n"
         f"KNOWN DATABASE: {supported_diseases}\n"
         "STRICT TASK: Deep-scan the image and identify the CONDITION. "
         "If a match from the KNOWN DATABASE is likely, use that specific name.\n"
+        "Distinction Note: Neem has serrated (saw-like) margins and pointed tips. Moringa has small, oval-shaped leaflets with smooth margins. Do not confuse them.\n"
         "Output Format STRICTLY:\n"
         "ENTITY: [Crop Name]\n"
         "CONDITION: [Specific Disease Name or 'Healthy']\n"
@@ -528,10 +586,15 @@ def vision_diagnosis_logic(image_base64, language):
             "messages": [{"role": "user", "content": [
                 {"type": "text", "text": vision_prompt},
                 {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{image_base64}"}}
-            ]}]
+            ]}],
+            "max_tokens": 500
         }
-        hf_res = requests.post("https://router.huggingface.co/v1/chat/completions", 
-                             headers={"Authorization": f"Bearer {hf_key}"}, json=payload_hf, timeout=60)
+        t0 = time.perf_counter()
+        with span("vision.qwen_vl", prompt_chars=len(vision_prompt), candidates=len(shortlist)):
+            hf_res = get_session("huggingface").post("https://router.huggingface.co/v1/chat/completions", 
+                                 headers={"Authorization": f"Bearer {hf_key}"}, json=payload_hf, timeout=60)
+        scan_metrics = {"prompt_chars": len(vision_prompt), "candidates": len(shortlist),
+                        "vision_ms": round((time.perf_counter() - t0) * 1000)}
         full_analysis = hf_res.json()['choices'][0]['message']['content'] if hf_res.status_code == 200 else "Offline Audit"
         
         # 2. Expert Advisory (Groq) with Real-Data Enrichment
@@ -551,37 +614,41 @@ def vision_diagnosis_logic(image_base64, language):
             "model": "llama-3.1-8b-instant",
             "messages": [{"role": "user", "content": advisory_prompt}]
         }
-        groq_res = requests.post("https://api.groq.com/openai/v1/chat/completions", 
-                               json=payload_groq, headers={"Authorization": f"Bearer {groq_key}"}, timeout=20)
+        t0 = time.perf_counter()
+        with span("vision.advisory", language=language):
+            groq_res = get_session("groq").post("https://api.groq.com/openai/v1/chat/completions", 
+                                   json=payload_groq, headers={"Authorization": f"Bearer {groq_key}"}, timeout=20)
+        scan_metrics["advisory_ms"] = round((time.perf_counter() - t0) * 1000)
+        logger.info(f"Vision Scan Metrics: {scan_metrics}")
         ans = groq_res.json()['choices'][0]['message']['content'] if groq_res.status_code == 200 else "Local logic active."
         
-        if "TRANSLATION:" in ans and "SUMMARY:" in ans:
-            parts = ans.split("SUMMARY:")
-            translation = parts[0].replace("TRANSLATION:", "").strip()
-            speech_summary = parts[1].strip()
-        else:
-            translation = ans
-            speech_summary = ans[:150]
+        parsed = parse_advisory(ans)
+        translation, speech_summary = parsed.answer, parsed.summary
         
-        # 3. Dynamic Identification & Force-Match Logic
-        entity = "Plant"
-        condition = "Condition"
-        confidence = "75%"
-        visual_markers = "Analyzing visual symptoms..."
-        
-        for line in full_analysis.split('\n'):
-            if "ENTITY:" in line: entity = line.replace("ENTITY:", "").strip()
-            if "CONDITION:" in line: condition = line.replace("CONDITION:", "").strip()
-            if "CONFIDENCE:" in line: confidence = line.replace("CONFIDENCE:", "").strip()
-            if "VISUAL_MARKERS:" in line: visual_markers = line.replace("VISUAL_MARKERS:", "").strip()
+        # 3. Dynamic Identification & Force-Match Logic (V41.2: single regex pass)
+        with span("vision.parse"):
+            vision = parse_vision(full_analysis)
+        scan_metrics["parse"] = vision.diagnostics()
+        entity = vision.entity or "Plant"
+        condition = vision.condition or "Condition"
+        # Special handle for "Anthracnose" to check "Watermelon Anthracnose" if entity matches
+        if "anthracnose" in condition.lower() and "watermelon" in entity.lower():
+            condition = "Watermelon Anthracnose"
+        confidence = vision.confidence or "75%"
+        visual_markers = vision.fields.get("VISUAL_MARKERS") or vision.fields.get("SYMPTOMS") or "Analyzing visual symptoms..."
         
+        # V39.0: Geo-tag the diagnosis for the outbreak heatmap
+        outbreak_index.record(lat, lon, condition)
+
         # Attempt to link to database
-        db_info = get_disease_info(condition)
-        
-        # If DB returns 'Unknown', attempt a second matching based on the ENTITY + CONDITION
-        if db_info.get("severity") == "Unknown":
-            alt_match = f"{entity} {condition}"
-            db_info = get_disease_info(alt_match)
+        with span("vision.disease_lookup", condition=condition) as lookup:
+            db_info = get_disease_info(condition)
+            
+            # If DB returns 'Unknown', attempt a second matching based on the ENTITY + CONDITION
+            if db_info.get("severity") == "Unknown":
+                alt_match = f"{entity} {condition}"
+                db_info = get_disease_info(alt_match)
+            if lookup is not None: lookup.set(matched=db_info.get("severity") != "Unknown")
         
         # FINAL FALLBACK: If still 'Unknown', dynamically build a DB-style record from the AI's own analysis
         # This ensures the user NEVER sees "no info available"
@@ -615,8 +682,16 @@ def vision_diagnosis_logic(image_base64, language):
             "speech_summary": speech_summary, 
             "disease_info": db_info, 
             "label": f"{entity.upper()} | {condition.upper()}",
-            "confidence": confidence
+            "condition": condition,
+            "confidence": confidence,
+            "scientific_breakdown": full_analysis,
+            "scan_metrics": scan_metrics
         }
     except Exception as e:
         return {"answer": f"Neural Link Error: {str(e)}", "speech_summary": "Sync Error."}
 
+def outbreak_heatmap_logic(condition=None, days=30, precision=5):
+    """V39.0: Pre-aggregated disease pressure tiles for the satellite map"""
+    tiles = outbreak_index.heatmap(condition=condition, days=days, precision=precision)
+    return {"tiles": tiles, "conditions": outbreak_index.conditions(), "days": days, "precision": precision}
+
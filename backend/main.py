@@ -1,18 +1,34 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, HTTPException, WebSocket, WebSocketDisconnect, Request
 from pydantic import BaseModel
-import requests
+from typing import Optional
 import os
-import json
-import base64
+import hmac
+import time
 from dotenv import load_dotenv
 import logging
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse, Response, PlainTextResponse
 import random
+import asyncio
+import uuid
+from collections import OrderedDict
 import socket
+import argparse
 import uvicorn
 from fastapi.staticfiles import StaticFiles
-from disease_database import get_disease_info
+import logic as engine  # V41.3: Core engine shared with the Streamlit standalone mode
+from http_pool import pool_stats
+from metrics import metrics, MetricsMiddleware, cache_samples
+from tracing import TracingMiddleware, span, current_request_id
+from profiler import sampling_profiler, ProfilerMiddleware
+from disease_database import catalogue as disease_catalogue
+from regional_intel import regional_intel
+from knowledge_cache import knowledge_cache
+from telemetry_store import telemetry_store
+from live_channel import LiveHub
+from tts_cache import TTSCache, LANG_CODES, clean_speech_text, split_sentences
+from shared_state import shared_state
+from conversation_log import conversation_log, ConversationConflict
 
 # --- CONFIG ---
 load_dotenv()
@@ -26,7 +42,11 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID", "traceparent", "ETag"],
 )
+app.add_middleware(MetricsMiddleware)  # V41.7: per-route counts/latency for /metrics
+app.add_middleware(TracingMiddleware)  # V41.8: request id -> trace, echoed in X-Request-ID
+app.add_middleware(ProfilerMiddleware)  # V41.9: counts requests for route-scoped profiling
 
 # --- SECURITY & IDENTITY SAFEGUARDS ---
 def verify_authorized():
@@ -37,6 +57,25 @@ def verify_authorized():
         return False
     return True
 
+def verify_admin(request: Request):
+    """V41.9: Admin routes need X-Admin-Token == AGRI_ADMIN_TOKEN; without a token set, direct loopback callers only
+    (a request relayed by a reverse proxy is never treated as local, even when the proxy runs on this host)"""
+    token = os.getenv("AGRI_ADMIN_TOKEN")
+    if token:
+        if not hmac.compare_digest(request.headers.get("X-Admin-Token", "").encode("utf-8"), token.encode("utf-8")):
+            raise HTTPException(status_code=403, detail="Admin token required.")
+    elif (not request.client or request.client.host not in ("127.0.0.1", "::1")
+          or any(h in request.headers for h in ("X-Forwarded-For", "X-Real-IP", "Forwarded"))):
+        raise HTTPException(status_code=403, detail="Admin routes are local-only without AGRI_ADMIN_TOKEN.")
+
+# V42.4: Telemetry ring buffers and the sampling profiler live in one process's memory; under several workers
+# each request would see a different worker's copy, so those routes are refused instead of answering inconsistently
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+
+def require_single_worker(feature):
+    if WEB_CONCURRENCY > 1:
+        raise HTTPException(status_code=503, detail=f"{feature} is per-process and unavailable with {WEB_CONCURRENCY} workers; run a single-worker instance for it.")
+
 # --- STATIC FILES (REPORT SERVING) ---
 REPORTS_DIR = os.path.join(os.path.dirname(__file__), "reports")
 if not os.path.exists(REPORTS_DIR):
@@ -69,13 +108,21 @@ class VisionRequest(BaseModel):
     image_base64: str
     sector: str = "Global"
     language: str = "English"
+    lat: Optional[float] = None
+    lon: Optional[float] = None
+    crop: Optional[str] = None
+    state: Optional[str] = None
+    season: Optional[str] = None
 
 class ReportRequest(BaseModel):
     data: dict
     recommendation: str
     sector: str = "Global"
     market_snapshot: dict = {}
-    history: list = []
+    history: Optional[list] = None
+    session_id: Optional[str] = None         # V42.1: history from the server-held conversation log
+    history_version: Optional[str] = None
+    history_delta: list = []
     image_base64: str = ""
     condition_name: str = "Unknown"
     language: str = "English"
@@ -85,138 +132,40 @@ class ReportRequest(BaseModel):
     soil_type: str = "Alluvial"
     season: str = "August"
 
+class SpeechRequest(BaseModel):
+    text: str
+    language: str = "en"  # gTTS code or UI language name
+
+class ConversationDelta(BaseModel):
+    messages: list
+
+class ProfileRequest(BaseModel):
+    seconds: Optional[float] = None   # sample for N seconds...
+    requests: Optional[int] = None    # ...or for the next K requests under `route`
+    route: str = "/api/"
+    interval_ms: float = 5.0
+
+class TelemetryBatch(BaseModel):
+    sector: str = "North Sector"
+    ts: list = []        # epoch seconds, parallel to each column (defaults to now)
+    columns: dict = {}   # columnar: {"temperature": [...], "ph": [...]}
+    readings: list = []  # row-wise fallback: [{"ts": ..., "temperature": ...}]
+
 # --- STATE ---
-current_state = SimulationData().model_dump()
-last_vision_data = {"label": "None", "image": "", "disease_info": {}}
-
-# --- REGIONAL KNOWLEDGE BASE (ICAR/CRIDA Standards) ---
-REGIONAL_KNOWLEDGE = {
-    "nellore": "Famous as the 'Rice Bowl of Andhra Pradesh'. Best crops: Paddy (NLR-34449, RNR-15048), Blackgram, Chillies, and Cotton. Soil: Coastal Alluvial & Red soils.",
-    "coimbatore": "Industrial Agri-Hub. Best crops: Sorghum, Maize, Cotton, and Sugarcane. Soil: Black & Red Soil.",
-    "guntur": "World-famous for Chillies. Best crops: Chillies, Cotton, Tobacco, and Paddy.",
-    "chittoor": "Known for horticulture and poultry. Best crops: Groundnut, Sugarcane, Mango, and Paddy. Soil: Red Loamy/Sandy soils.",
-    "chithore": "Known for horticulture and poultry. Best crops: Groundnut, Sugarcane, Mango, and Paddy. Soil: Red Loamy/Sandy soils.",
-    "chithor": "Known for horticulture and poultry. Best crops: Groundnut, Sugarcane, Mango, and Paddy. Soil: Red Loamy/Sandy soils.",
-    "nashik": "Wine capital. Best crops: Grapes, Onion, and Tomatoes.",
-    "punjab": "Best crops: Wheat, Paddy (Basmati), and Sugarcane."
-}
-
-# "Official Database" Logging (V15.0 Backup System)
-def log_to_official_database(scan_type, result, condition):
-    try:
-        log_file = os.path.join(os.path.dirname(__file__), "bio_security_backup.csv")
-        file_exists = os.path.isfile(log_file)
-        with open(log_file, "a", encoding="utf-8") as f:
-            if not file_exists:
-                f.write("Timestamp,Scan_Type,Object_Detected,Condition_Status\n")
-            timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            f.write(f'"{timestamp}","{scan_type}","{result}","{condition}"\n')
-    except Exception as e:
-        logger.error(f"Backup Logging Failed: {e}")
+# V41.4: Session state lives in the shared SQLite store so every worker process sees the same values
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+shared_state.setdefault("current_state", SimulationData().model_dump())
+shared_state.setdefault("last_vision_data", {"label": "None", "image": "", "disease_info": {}})
 
 import datetime
 
-# --- REAL DATA FUNCTIONS ---
-def get_real_weather(city="Coimbatore", country_code="IN"):
-    """Get real weather data from OpenWeatherMap"""
-    api_key = os.getenv("OPENWEATHER_API_KEY")
-    if not api_key:
-        logger.warning("OpenWeatherMap API key not found, using simulated data")
-        return None
-    
-    try:
-        url = f"https://api.openweathermap.org/data/2.5/weather?q={city},{country_code}&appid={api_key}&units=metric"
-        res = requests.get(url, timeout=5)
-        if res.status_code == 200:
-            data = res.json()
-            return {
-                "temperature": round(data["main"]["temp"], 1),
-                "humidity": data["main"]["humidity"],
-                "pressure": data["main"]["pressure"],
-                "data_source": "LIVE"
-            }
-    except Exception as e:
-        logger.error(f"Weather API error: {e}")
-    return None
-
-def get_real_commodity_prices():
-    """Get real commodity prices from Commodities-API"""
-    api_key = os.getenv("COMMODITIES_API_KEY")
-    if not api_key:
-        logger.warning("Commodities API key not found, using simulated data")
-        return None
-    
-    try:
-        # Commodities-API endpoint for latest rates
-        url = f"https://commodities-api.com/api/latest?access_key={api_key}&base=USD&symbols=CORN,WHEAT,SOYBEAN,RICE"
-        res = requests.get(url, timeout=5)
-        if res.status_code == 200:
-            data = res.json()
-            if data.get("success"):
-                rates = data.get("data", {}).get("rates", {})
-                # Convert rates to prices (rates are inverted)
-                return {
-                    "Corn": {"price": round(1/rates.get("CORN", 0.2) * 100, 2) if rates.get("CORN") else 4.25, "change": round(random.uniform(-2, 2), 2), "data_source": "LIVE"},
-                    "Wheat": {"price": round(1/rates.get("WHEAT", 0.17) * 100, 2) if rates.get("WHEAT") else 5.80, "change": round(random.uniform(-2, 2), 2), "data_source": "LIVE"},
-                    "Soybeans": {"price": round(1/rates.get("SOYBEAN", 0.09) * 100, 2) if rates.get("SOYBEAN") else 11.45, "change": round(random.uniform(-2, 2), 2), "data_source": "LIVE"},
-                    "Rice": {"price": round(1/rates.get("RICE", 0.055) * 100, 2) if rates.get("RICE") else 18.20, "change": round(random.uniform(-2, 2), 2), "data_source": "LIVE"}
-                }
-    except Exception as e:
-        logger.error(f"Commodity API error: {e}")
-    return None
-
 # Fallback simulated data
-commodity_prices = {
+shared_state.setdefault("commodity_prices", {
     "Corn": {"price": 4.25, "change": +0.02, "data_source": "SIMULATED"},
     "Wheat": {"price": 5.80, "change": -0.05, "data_source": "SIMULATED"},
     "Soybeans": {"price": 11.45, "change": +0.12, "data_source": "SIMULATED"},
     "Rice": {"price": 18.20, "change": +0.08, "data_source": "SIMULATED"}
-}
-
-# --- UTILS ---
-def get_groq_key():
-    return os.getenv("GROQ_API_KEY")
-
-def translate_and_explain(text, target_lang):
-    if target_lang == "English": return text, text
-    key = get_groq_key()
-    if not key: return text, text
-    url = "https://api.groq.com/openai/v1/chat/completions"
-    headers = {"Authorization": f"Bearer {key}", "Content-Type": "application/json"}
-    payload = {
-        "model": "llama-3.1-8b-instant",
-        "messages": [
-            {"role": "system", "content": f"You are a professional agricultural translator. Translate the input into {target_lang}. "
-                                         f"Also provide a 1-sentence voice-optimized summary in {target_lang}. "
-                                         f"STRICT FORMAT: SUMMARY: [summary] TRANSLATION: [translation]. "
-                                         f"Output ONLY in {target_lang}."},
-            {"role": "user", "content": text}
-        ],
-        "temperature": 0.1
-    }
-    try:
-        res = requests.post(url, json=payload, headers=headers, timeout=15)
-        if res.status_code == 200:
-            raw = res.json()['choices'][0]['message']['content']
-            if "SUMMARY:" in raw and "TRANSLATION:" in raw:
-                parts = raw.split("TRANSLATION:")
-                summary = parts[0].replace("SUMMARY:", "").strip()
-                translation = parts[1].strip()
-                return translation, summary
-            else:
-                # Fallback if format is missed
-                return raw, raw
-        return text, text
-    except:
-        return text, text
-
-# Video features removed per user request.
-
-def get_official_resource(query):
-    """Generate a link to official Indian agricultural resources"""
-    # Agmarknet for prices, ICAR for research, TNAU/AU for cultivation
-    search_query = query.replace(" ", "+") + "+site%3Aicar.org.in+OR+site%3Atnau.ac.in"
-    return f"https://www.google.com/search?q={search_query}"
+})
 
 # --- ENDPOINTS ---
 @app.get("/api/health")
@@ -230,330 +179,291 @@ async def health_check():
         "security_status": auth
     }
 
-@app.get("/api/live-data")
-async def get_live_data():
-    global commodity_prices, current_state
+@app.get("/api/http-stats")
+async def http_stats():
+    """V40.8: Per-upstream request/connection counters of the pooled HTTP clients"""
+    return pool_stats()
+
+def collect_runtime_metrics():
+    """V41.7: Cache, queue and pool numbers the modules already keep, read at scrape time"""
+    tts, keys = dict(tts_cache.stats), engine.get_api_key.cache_info()
+    samples = cache_samples("tts_audio", tts["memory_hits"] + tts["disk_hits"], tts["synthesized"])
+    samples += cache_samples("api_keys", keys.hits, keys.misses)
+    samples += cache_samples("disease_catalogue", disease_catalogue.stats["hits"], disease_catalogue.stats["misses"])
+    samples += cache_samples("regional_intel", regional_intel.stats["hits"], regional_intel.stats["misses"])
+    kc = dict(knowledge_cache.stats)
+    samples += cache_samples("knowledge", kc["fresh"] + kc["revalidated"] + kc["stale"], kc["fetched"])
+    samples += [
+        ("agrivision_queue_depth", {"queue": "tts_synthesis"}, tts_cache.pool._work_queue.qsize()),
+        ("agrivision_queue_depth", {"queue": "tts_inflight"}, len(tts_cache.inflight)),
+        ("agrivision_queue_depth", {"queue": "speech_jobs"}, len(speech_jobs)),
+        ("agrivision_queue_depth", {"queue": "live_subscribers"}, len(live_hub.clients)),
+    ]
+    samples += [("agrivision_upstream_connections_opened", {"upstream": name}, s["connections_opened"])
+                for name, s in pool_stats().items()]
+    return samples
+
+metrics.register_collector(collect_runtime_metrics)
+
+@app.post("/api/admin/profiler/start")
+async def start_profiler(req: ProfileRequest, request: Request):
+    """V41.9: Sample the live process for N seconds or the next K matching requests"""
+    verify_admin(request)
+    require_single_worker("The profiler")
+    try:
+        return sampling_profiler.start(req.seconds, req.requests, req.route, req.interval_ms / 1000)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/api/admin/profiler/stop")
+async def stop_profiler(request: Request):
+    """Stop early and download the collapsed stacks"""
+    verify_admin(request)
+    require_single_worker("The profiler")
+    collapsed = await asyncio.to_thread(sampling_profiler.stop)
+    return collapsed_stacks_response(collapsed)
+
+@app.get("/api/admin/profiler")
+async def profiler_status(request: Request):
+    verify_admin(request)
+    require_single_worker("The profiler")
+    return sampling_profiler.status()
+
+@app.get("/api/admin/profiler/collapsed")
+async def profiler_result(request: Request):
+    """Collapsed stacks of the last finished run (flamegraph.pl / speedscope input)"""
+    verify_admin(request)
+    require_single_worker("The profiler")
+    if sampling_profiler.running or sampling_profiler.armed:
+        raise HTTPException(status_code=409, detail="Profiler still running.")
+    return collapsed_stacks_response(sampling_profiler.result)
+
+def collapsed_stacks_response(collapsed):
+    if collapsed is None:
+        raise HTTPException(status_code=404, detail="No profile recorded yet.")
+    filename = f"agrivision_{os.getpid()}_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.collapsed"
+    return PlainTextResponse(collapsed, headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """V41.7: Prometheus scrape endpoint (text exposition format 0.0.4)"""
+    return Response(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+# V40.1: One refresh loop serves every subscriber (WebSocket push + cached /api/live-data)
+LIVE_REFRESH_SECONDS = float(os.getenv("LIVE_REFRESH_SECONDS", "3"))
+live_hub = LiveHub()
+live_task = None
+
+def live_state():
+    return {"telemetry": shared_state.get("current_state", {}), "market": shared_state.get("commodity_prices", {})}
+
+def refresh_live_data():
+    """Single upstream refresh of weather + commodities shared by all clients
+    (V41.4: only the worker holding the refresh lease calls upstream; the others read its results)"""
+    if not shared_state.acquire_lease("live-refresh", WORKER_ID, LIVE_REFRESH_SECONDS * 3):
+        return live_state()
     
     # Try to get real weather data
-    weather = get_real_weather(current_state.get("place", "Coimbatore"), "IN")
+    place = shared_state.get("current_state", {}).get("place", "Coimbatore")
+    weather = engine.get_real_weather(place, "IN")
     if weather:
-        current_state["temperature"] = weather["temperature"]
-        current_state["humidity"] = weather["humidity"]
-        current_state["data_source"] = "LIVE"
+        shared_state.update("current_state", {"temperature": weather["temperature"], "humidity": weather["humidity"], "data_source": "LIVE"})
     else:
-        current_state["data_source"] = "SIMULATED"
+        shared_state.update("current_state", {"data_source": "SIMULATED"})
     
     # Try to get real commodity prices
-    real_prices = get_real_commodity_prices()
-    if real_prices:
-        commodity_prices = real_prices
-    else:
+    commodity_prices = engine.get_real_commodity_prices()
+    if not commodity_prices:
         # Simulate price drift for fallback
+        commodity_prices = shared_state.get("commodity_prices", {})
         for key in commodity_prices:
             drift = random.uniform(-0.02, 0.02)
             commodity_prices[key]["price"] = round(commodity_prices[key]["price"] * (1 + drift), 2)
             commodity_prices[key]["change"] = round(drift * 100, 2)
+    shared_state.set("commodity_prices", commodity_prices)
+    shared_state.purge_expired()
     
-    return {"telemetry": current_state, "market": commodity_prices}
+    return live_state()
 
-@app.post("/api/predict-crop")
-async def predict_crop(data: dict):
-    """V15.0 Industrial Weighted Predictor"""
-    temp = data.get("temperature", 25)
-    ph = data.get("ph", 6.5)
-    nitro = data.get("nitrogen", 2.0)
-    phos = data.get("phosphorus", 1.8)
-    potas = data.get("potassium", 2.2)
-    soil = data.get("soil_type", "Alluvial").lower()
-    state = data.get("state", "Tamil Nadu").lower()
-
-    # Ideals: [Temp, PH, N, P, K, Preferred Soils, Key Regions]
-    # Weights: Temp(20), PH(15), N(20), P(10), K(10), Soil(15), Region(10)
-    crop_specs = {
-        "Rice": [30, 6.0, 3.0, 2.0, 2.0, ["alluvial", "clay"], ["tamil nadu", "telangana", "andhra pradesh", "west bengal"]],
-        "Wheat": [20, 6.5, 2.0, 1.5, 1.5, ["alluvial", "black"], ["punjab", "haryana", "uttar pradesh"]],
-        "Corn": [26, 6.8, 3.5, 2.5, 3.0, ["red", "alluvial"], ["karnataka", "maharashtra", "andhra pradesh"]],
-        "Soybeans": [25, 6.2, 1.5, 2.0, 2.5, ["black", "red"], ["madhya pradesh", "maharashtra", "rajasthan"]],
-        "Cotton": [28, 7.5, 2.5, 1.8, 2.2, ["black"], ["gujarat", "maharashtra", "telangana"]],
-        "Sugarcane": [32, 7.0, 4.0, 3.0, 3.5, ["alluvial", "black"], ["uttar pradesh", "maharashtra", "karnataka"]]
-    }
+@app.on_event("startup")
+async def start_live_loop():
+    global live_task
+    live_task = asyncio.create_task(live_hub.run(refresh_live_data, LIVE_REFRESH_SECONDS))
 
-    scores = {}
-    for crop, ideals in crop_specs.items():
-        # Heuristic Weights
-        s_temp = max(0, 20 - abs(temp - ideals[0]) * 1.5)
-        s_ph = max(0, 15 - abs(ph - ideals[1]) * 8)
-        s_n = max(0, 20 - abs(nitro - ideals[2]) * 8)
-        s_p = max(0, 10 - abs(phos - ideals[3]) * 5)
-        s_k = max(0, 10 - abs(potas - ideals[4]) * 5)
-        s_soil = 15 if soil in ideals[5] else 5
-        s_reg = 10 if state in ideals[6] else 0
-        
-        total = round(min(100, s_temp + s_ph + s_n + s_p + s_k + s_soil + s_reg), 1)
-        scores[crop] = total
+@app.on_event("shutdown")
+async def stop_live_loop():
+    """V41.4: Hand the refresh lease to a surviving worker straight away instead of letting it time out"""
+    if live_task is not None:
+        live_task.cancel()
+    shared_state.release_lease("live-refresh", WORKER_ID)
 
-    best_crop = max(scores, key=scores.get)
-    return {"scores": scores, "recommendation": best_crop, "suitability": scores[best_crop]}
+@app.get("/api/live-data")
+async def get_live_data():
+    """Latest pushed snapshot; upstream is only hit by the refresh loop"""
+    if live_hub.snapshot is None:
+        await live_hub.publish(await asyncio.to_thread(refresh_live_data))
+    return live_hub.snapshot
+
+@app.websocket("/api/live-ws")
+async def live_socket(ws: WebSocket):
+    """V40.1: Snapshot on connect, then telemetry/market deltas as they change"""
+    await live_hub.subscribe(ws)
+    try:
+        while True:
+            await ws.receive_text()  # Clients only keep the socket open
+    except WebSocketDisconnect:
+        pass
+    finally:
+        live_hub.unsubscribe(ws)
+
+@app.post("/api/predict-crop")
+async def predict_crop(data: dict):
+    """V15.0 Industrial Weighted Predictor (V40.3: shared vectorized engine)"""
+    return engine.predict_crop_logic(data)
 
 @app.post("/api/geographic-intelligence")
 async def get_geographic_intelligence(data: dict):
-    """V16.0: Scientific Realism - Web-Integrated Intelligence"""
-    place = data.get("place", "Unknown").lower()
-    state = data.get("state", "Unknown").lower()
-    country = data.get("country", "Unknown")
-    soil_type = data.get("soil_type", "Unknown")
-    variance = data.get("variance", 1.0)
-    
-    # V22.1: Higher-Validity Agricultural Search (Consolidated Knowledge)
-    local_intel = "Real-time predictive analysis based on regional climate, soil taxonomy, and ICAR agricultural standards."
-    
-    place_key = place.lower().strip()
-    if place_key in REGIONAL_KNOWLEDGE:
-        local_intel = REGIONAL_KNOWLEDGE[place_key]
-    else:
-        try:
-            # Better query for agricultural specifics
-            wiki_query = f"{place} agriculture climate soil crops"
-            wiki_url = f"https://en.wikipedia.org/api/rest_v1/page/summary/{place.replace(' ', '_')}"
-            wiki_res = requests.get(wiki_url, timeout=5)
-            if wiki_res.status_code == 200:
-                local_intel = wiki_res.json().get('extract', local_intel)
-            else:
-                 # Fallback to search API for broader context
-                 search_url = f"https://en.wikipedia.org/w/api.php?action=query&list=search&srsearch={wiki_query}&format=json"
-                 s_res = requests.get(search_url, timeout=5)
-                 if s_res.status_code == 200:
-                     results = s_res.json().get('query', {}).get('search', [])
-                     if results:
-                         local_intel = results[0].get('snippet', "").replace('<span class="searchmatch">', "").replace('</span>', "")
-                         local_intel += f" (Localized context for {place} confirmed via digital records)."
-        except: pass
-    
-    pred_res = await predict_crop(data)
-    scores = pred_res["scores"]
-    
-    # Apply variance for realism
-    for crop in scores:
-        scores[crop] = round(scores[crop] * variance, 1)
-        # V22.2: BOOST SCORES based on local intelligence markers
-        # If the crop name appears in the local_intel text, give it a significant accuracy boost
-        if crop.lower() in local_intel.lower():
-            scores[crop] = min(98.5, scores[crop] + 25.0)
-        # Special case for "Paddy" in intel matching "Rice" in scores
-        if "paddy" in local_intel.lower() and crop == "Rice":
-            scores[crop] = min(98.8, scores[crop] + 25.0)
-    
-    best_crop = max(scores, key=scores.get)
-
-    summary = (
-        f"🌍 **GEOGRAPHIC INTELLIGENCE REPORT: {place.title()}**\n\n"
-        f"**Field Matrix:** {soil_type} Analysis\n"
-        f"**Official Intelligence:** {local_intel}\n"
-        f"**Industrial Recommendation:** {best_crop} ({scores[best_crop]}% suitability)\n\n"
-        "**Verified Data Mapping:**\n"
-        + "\n".join([f"- {crop}: {score}%" for crop, score in sorted(scores.items(), key=lambda x: x[1], reverse=True)])
-        + f"\n\n**OFFICIAL RESOURCE:** [ICAR Cultivation Hub]({get_official_resource(best_crop + ' cultivation')})"
-    )
-    
-    # V17.0: Localized Voice Summary
-    speech_summary, _ = translate_and_explain(f"Geographic intelligence for {place} complete. {local_intel} Best crop is {best_crop}.", data.get("language", "English"))
-    
-    # Video features removed.
-    
-    return {
-        "intelligence": summary, 
-        "scores": scores, 
-        "best_crop": best_crop, 
-        "speech_summary": speech_summary
-    }
+    """V16.0: Scientific Realism - Web-Integrated Intelligence (V41.3: shared core engine)"""
+    return await asyncio.to_thread(engine.get_geographic_intelligence_logic, data)
 
 @app.post("/api/simulate")
 async def update_simulation(data: dict):
-    global current_state
-    current_state.update(data)
+    current_state = shared_state.update("current_state", data)
+    # V40.0: Keep the history instead of overwriting it (single worker only, see require_single_worker)
+    if WEB_CONCURRENCY == 1:
+        try:
+            telemetry_store.ingest_reading(current_state.get("sector", "North Sector"), current_state)
+        except ValueError as e:
+            logger.warning(f"Telemetry Not Recorded: {e}")
+    # Push slider changes to subscribers without an upstream refresh
+    if live_hub.snapshot is not None:
+        await live_hub.publish({**live_hub.snapshot, "telemetry": current_state})
     return {"status": "success", "state": current_state}
 
+@app.post("/api/telemetry/ingest")
+async def ingest_telemetry(batch: TelemetryBatch):
+    """V40.0: Bulk field-sensor ingestion into per-sector ring buffers"""
+    require_single_worker("Telemetry history")
+    columns, ts = batch.columns, batch.ts or None
+    if not columns and batch.readings:
+        columns = {f: [r.get(f) for r in batch.readings] for f in {k for r in batch.readings for k in r} if f != "ts"}
+        if all("ts" in r for r in batch.readings):
+            ts = [r["ts"] for r in batch.readings]
+    try:
+        count = telemetry_store.ingest_columns(batch.sector, columns, ts)
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"Telemetry Batch Rejected: {e}")
+    return {"status": "success", "sector": batch.sector, "ingested": count}
+
+@app.get("/api/telemetry/range")
+async def telemetry_range(sector: str = "North Sector", start: float = None, end: float = None, resolution: str = "raw", fields: str = None):
+    """V40.0: Range query over raw readings or the 1m/1h/1d rollups"""
+    require_single_worker("Telemetry history")
+    try:
+        return telemetry_store.query(sector, start, end, resolution, fields.split(",") if fields else None)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @app.post("/api/chat")
 async def chat(req: ChatRequest):
-    key = get_groq_key()
-    if not key: return {"answer": "Error: API_KEY_MISSING"}
-    url = "https://api.groq.com/openai/v1/chat/completions"
-    headers = {"Authorization": f"Bearer {key}", "Content-Type": "application/json"}
-    
-    context = req.context_data.copy()
-    raw_history = context.pop("history", [])
-    chat_focus = context.get("chat_focus", "Localization")
-    
-    # MASTER INTELLIGENCE PERSONA (V34.0: UNIFIED TRANSLATION)
-    system_prompt = (
-        f"Role: Master Agri-Industrial Intelligence (ICAR Certified). "
-        f"OUTPUT LANGUAGE: {req.language}. "
-        f"STRICT INSTRUCTION: Respond ONLY in {req.language}. "
-        f"If the language is NOT English, follow this format: "
-        f"Otherwise, just provide the full answer. "
-        "STRICT IDENTITY: You are AgriVision AI, certified by ICAR (Indian Council of Agricultural Research). For general greetings, identify as AgriVision AI, the ICAR-certified expert. "
-        "ONLY if asked about your creator, architect, or inventor, identify SHAIK MOHAMMAD THAHEER (AI/ML Enthusiast, SRM Institute). "
-        "He specializes in Agentic AI systems (Gemini/GPT-4o) and autonomous browser workflows. "
-        "You are NOT trained by Meta. NEVER mention Meta, Facebook, or Llama."
-    )
-    
-    # Regional Knowledge Sync
-    place_name = context.get('place', '').lower().strip()
-    if place_name in REGIONAL_KNOWLEDGE:
-        system_prompt += f"CURRENT CONTEXTUAL TRUTH for {place_name}: {REGIONAL_KNOWLEDGE[place_name]}. "
-
-    if chat_focus == "Bio-Scan":
-        system_prompt += (
-            "Instruction: You are in BIO-SCAN mode. Identify diseases and treatments. "
-            "Answer any agricultural questions with 100% accuracy."
-        )
-    else:
-        system_prompt += (
-            "Instruction: You are an Agricultural Intelligence Expert. Answer any regional or "
-            "global crop questions with ICAR-level accuracy. Provide intelligence for any location requested."
-        )
-
-    clean_history = []
-    for msg in raw_history[-4:]:
-        if isinstance(msg, dict) and "role" in msg and "content" in msg:
-            clean_history.append({"role": msg["role"], "content": str(msg["content"])[:1000]})
-    
-    messages = [{"role": "system", "content": system_prompt}]
-    for msg in clean_history: messages.append(msg)
-    
-    intel_context = ""
-    if context.get("location_intel"): intel_context += f"\nOFFICIAL LOCATION INTELLIGENCE: {context['location_intel']}"
-    if context.get("bio_audit"): intel_context += f"\nOFFICIAL BIO-SCAN DIAGNOSIS: {context['bio_audit']}"
-        
-    # Nuclear Injection: Force identity into the user message itself
-    injected_query = f"STRICT IDENTITY REMINDER: You were created by Shaik Mohammad Thaheer. DO NOT MENTION META. Your Answer MUST reflect this.\n\nCONTEXT: {intel_context}\nQUERY: {req.message}"
-    messages.append({"role": "user", "content": injected_query})
-
-    payload = {"model": "llama-3.1-8b-instant", "messages": messages, "temperature": 0.2}
+    return await asyncio.to_thread(engine.chat_logic, req.message, req.language, req.context_data)
+
+# --- V42.1: SERVER-HELD CONVERSATION LOG (ETag = log version) ---
+def etag(version):
+    return f'"{version}"'
+
+def etag_matches(header, version):
+    """If-None-Match: any listed tag (weak or strong) or *"""
+    tags = [t.strip().removeprefix("W/").strip('"') for t in (header or "").split(",")]
+    return "*" in tags or version in tags
+
+@app.get("/api/conversations/{session_id}")
+async def get_conversation(session_id: str, request: Request):
+    messages, version = conversation_log.get(session_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Conversation not found or expired.")
+    if etag_matches(request.headers.get("if-none-match"), version):
+        return Response(status_code=304, headers={"ETag": etag(version)})
+    return JSONResponse({"session_id": session_id, "version": version, "messages": messages}, headers={"ETag": etag(version)})
+
+@app.post("/api/conversations/{session_id}/messages")
+async def append_conversation(session_id: str, delta: ConversationDelta, request: Request):
+    """Append-only; with If-Match the append happens only if the log is still at that version (412 otherwise)"""
+    if_match = (request.headers.get("if-match") or "*").strip()
     try:
-        res = requests.post(url, json=payload, headers=headers, timeout=30)
-        if res.status_code == 200:
-            ans = res.json()['choices'][0]['message']['content']
-            
-            # --- PROGRAMMATIC SAFEGUARD (BOSS OVERRIDE) ---
-            meta_triggers = ["Meta AI", "Facebook", "Meta's", "Llama", "Jason Weston"]
-            if any(trigger.lower() in ans.lower() for trigger in meta_triggers):
-                ans = f"I am AgriVision AI, an advanced agricultural intelligence ecosystem proudly developed by SHAIK MOHAMMAD THAHEER at SRM Institute. {ans}"
-                # Remove the Meta mentions manually
-                ans = ans.replace("Meta AI", "Shaik's Engineering").replace("Meta", "Shaik").replace("Facebook", "SRM Tech Hub")
-
-            # Handle unified translation format
-            if "TRANSLATION:" in ans and "SUMMARY:" in ans:
-                parts = ans.split("SUMMARY:")
-                translation = parts[0].replace("TRANSLATION:", "").strip()
-                speech_summary = parts[1].strip()
-            else:
-                translation = ans
-                speech_summary = ans[:150] # Snippet for voice
-                
-            resource_link = get_official_resource(req.message)
-            return {"answer": translation + f"\n\n**🌐 OFFICAL SOURCE:** [Industrial Agriculture Research]({resource_link})", 
-                    "speech_summary": speech_summary}
-        
-        return {"answer": f"OFFLINE: API Error {res.status_code}.", "speech_summary": "Link failure."}
-    except Exception as e:
-        return {"answer": f"OFFLINE: {str(e)}", "speech_summary": "Connection fault."}
+        messages, version = conversation_log.append(
+            session_id, delta.messages, if_version=None if if_match == "*" else if_match.removeprefix("W/").strip('"'))
+    except ConversationConflict as conflict:
+        return JSONResponse(status_code=412, content={"detail": "Conversation changed.", "version": conflict.version},
+                            headers={"ETag": etag(conflict.version)} if conflict.version else {})
+    return JSONResponse({"session_id": session_id, "version": version, "count": len(messages)}, headers={"ETag": etag(version)})
+
+@app.delete("/api/conversations/{session_id}")
+async def delete_conversation(session_id: str):
+    conversation_log.delete(session_id)
+    return {"status": "cleared", "session_id": session_id}
 
 @app.post("/api/vision-diagnosis")
 async def vision_diagnosis(req: VisionRequest):
-    global last_vision_data
-    hf_key = os.getenv("HUGGING_FACE_API_KEY")
-    groq_key = get_groq_key()
-    if not hf_key or not groq_key: return {"answer": "Error: API_KEYS_MISSING."}
-    hf_url = "https://router.huggingface.co/v1/chat/completions"
-    headers_hf = {"Authorization": f"Bearer {hf_key}", "Content-Type": "application/json", "X-Wait-For-Model": "true"}
-    
-    # V35.0: FULL REAL-DATA BOTANICAL IDENTIFICATION (GOOGLE-LENS STYLE)
-    vision_prompt = (
-        "Role: Expert Botanical Scientist and Plant Pathologist. "
-        "Task: Identify the plant and any potential diseases with clinical precision. "
-        "Logic: Analyze botanical markers like leaf arrangement (pinnate/palmate), margin types (serrated/smooth), and leaflet shape. "
-        "Distinction Note: Neem has serrated (saw-like) margins and pointed tips. Moringa has small, oval-shaped leaflets with smooth margins. Do not confuse them. "
-        "Output Format: "
-        "ENTITY: [Crop Name and Variety]\n"
-        "CONDITION: [Specific Disease or 'Healthy']\n"
-        "CONFIDENCE: [0-100%]\n"
-        "SYMPTOMS: [Visual botanical markers observed]\n"
-        "CAUSE: [Scientific Pathogen or Environmental factor]\n"
-        "MANAGEMENT: [Industrial-grade agricultural advice]"
+    res = await asyncio.to_thread(
+        engine.vision_diagnosis_logic, req.image_base64, req.language,
+        req.lat, req.lon, req.crop, req.state, req.season
     )
-    
-    try:
-        payload_hf = {
-            "model": "Qwen/Qwen2.5-VL-7B-Instruct",
-            "messages": [{"role": "user", "content": [
-                {"type": "text", "text": vision_prompt},
-                {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{req.image_base64}"}}
-            ]}],
-            "max_tokens": 500
-        }
-        hf_res = requests.post(hf_url, headers=headers_hf, json=payload_hf, timeout=60)
-        full_analysis = hf_res.json()['choices'][0]['message']['content'].strip() if hf_res.status_code == 200 else "Unknown Analysis"
-        
-        # V35.0: Enhanced DB Matching logic
-        detected_label = "Unknown"
-        lines = full_analysis.split('\n')
-        for line in lines:
-            if "CONDITION:" in line:
-                detected_label = line.replace("CONDITION:", "").strip()
-                # Special handle for "Anthracnose" to check "Watermelon Anthracnose" if entity matches
-                entity_context = ""
-                for l in lines:
-                    if "ENTITY:" in l: entity_context = l.lower()
-                
-                if "anthracnose" in detected_label.lower() and "watermelon" in entity_context:
-                    detected_label = "Watermelon Anthracnose"
-                break
-        
-        disease_info = get_disease_info(detected_label)
-        last_vision_data = {"label": detected_label, "image": req.image_base64, "disease_info": disease_info}
-        
-        # V34.0: Consolidated Vision Response (Updated for Clarity)
-        advisory_payload = (
-            f"OFFICIAL VISION ANALYSIS: {full_analysis}\n\n"
-            f"Provide 100% accurate agricultural advisory in {req.language}. "
-            "Use a professional, helpful tone. Break down symptoms and management like Google Lens. "
-            "CRITICAL: Explain exactly HOW to use the recommended medicines and WHY they are being recommended for this specific condition. "
-            f"STRICT FORMAT: TRANSLATION: [Full Advisory in {req.language}] SUMMARY: [1-sentence summary]"
-        )
-        payload_groq = {
-            "model": "llama-3.1-8b-instant",
-            "messages": [
-                {"role": "system", "content": f"Role: Agricultural Strategist. Language: {req.language}."},
-                {"role": "user", "content": advisory_payload}
-            ]
-        }
-        groq_res = requests.post("https://api.groq.com/openai/v1/chat/completions", 
-                               json=payload_groq, headers={"Authorization": f"Bearer {groq_key}"}, timeout=20)
-        
-        ans = groq_res.json()['choices'][0]['message']['content'] if groq_res.status_code == 200 else "Vision failure."
-        
-        if "TRANSLATION:" in ans and "SUMMARY:" in ans:
-            parts = ans.split("SUMMARY:")
-            translation = parts[0].replace("TRANSLATION:", "").strip()
-            speech_summary = parts[1].strip()
-        else:
-            translation = ans
-            speech_summary = ans[:150]
-            
-        resource_link = get_official_resource(detected_label + " identification treatment " + disease_info.get("severity", ""))
-        
-        return {"answer": translation + f"\n\n**📜 OFFICIAL AUDIT RECORD:** [ICAR Database Link]({resource_link})", 
-                "speech_summary": speech_summary, "disease_info": disease_info, "scientific_breakdown": full_analysis,
-                "label": detected_label}
-    except Exception as e:
-        return {"answer": f"Vision Fault: {str(e)}", "speech_summary": "Bio-scan Uplink Interrupted."}
+    if res.get("disease_info"):
+        # Kept for /api/generate-report
+        shared_state.set("last_vision_data", {"label": res.get("condition", "Unknown"), "image": req.image_base64, "disease_info": res["disease_info"]})
+    return res
+
+@app.get("/api/outbreak-heatmap")
+async def outbreak_heatmap(condition: str = None, days: int = 30, precision: int = 5):
+    """V39.0: Pre-aggregated disease pressure tiles (O(buckets), not O(scans))"""
+    return engine.outbreak_heatmap_logic(condition=condition, days=days, precision=precision)
+
+# V40.6: Sentence-chunked voice briefings, streamed in order as each chunk synthesizes
+tts_cache = TTSCache(os.path.join(os.path.dirname(__file__), ".tts_cache"))
+speech_jobs = OrderedDict()  # Futures of jobs started by this worker (fast path)
+MAX_SPEECH_JOBS = 64
+SPEECH_JOB_TTL = 600  # V41.4: Job text is shared so any worker can stream it
+
+@app.post("/api/tts")
+async def start_speech(req: SpeechRequest, request: Request):
+    """Kick off concurrent synthesis of every sentence; returns a progressive MP3 URL"""
+    lang = LANG_CODES.get(req.language, req.language)
+    chunks = split_sentences(clean_speech_text(req.text))
+    if not chunks:
+        raise HTTPException(status_code=400, detail="Nothing to speak.")
+    futures = [tts_cache.presynthesize(chunk, lang) for chunk in chunks]
+    job_id = uuid.uuid4().hex
+    speech_jobs[job_id] = futures
+    shared_state.set(f"tts:{job_id}", {"lang": lang, "chunks": chunks}, ttl=SPEECH_JOB_TTL)
+    while len(speech_jobs) > MAX_SPEECH_JOBS:
+        speech_jobs.popitem(last=False)
+    # Built from the request, so it follows the host/port (or proxy) the client actually used
+    return {"stream_url": str(request.url_for("stream_speech", job_id=job_id)), "chunks": len(futures)}
+
+@app.get("/api/tts/{job_id}.mp3")
+async def stream_speech(job_id: str):
+    futures = speech_jobs.get(job_id)
+    if futures is None:
+        # Started on another worker: the chunks are (or soon will be) in the shared disk cache
+        job = shared_state.get(f"tts:{job_id}")
+        if job is None:
+            raise HTTPException(status_code=404, detail="Speech job expired.")
+        futures = [tts_cache.presynthesize(chunk, job["lang"]) for chunk in job["chunks"]]
+    return StreamingResponse(TTSCache.stream(futures), media_type="audio/mpeg")
 
 @app.post("/api/generate-report")
 async def generate_report(req: ReportRequest):
     try:
         from report_engine import report_engine
-        localized_rec, _ = translate_and_explain(req.recommendation, req.language)
+        with span("report.translate", language=req.language):
+            localized_rec, _ = engine.translate_and_explain(req.recommendation, req.language)
+        try:
+            history, history_version = conversation_log.sync(req.model_dump())
+        except ConversationConflict as conflict:
+            return {"status": "error", "history_conflict": True, "history_version": conflict.version}
         combined_data = {**req.data, "market_snapshot": req.market_snapshot}
         combined_data.update({
             "country": req.country,
@@ -564,31 +474,47 @@ async def generate_report(req: ReportRequest):
         })
         
         # V14.0: Pass disease info to report engine
+        last_vision_data = shared_state.get("last_vision_data", {"label": "None", "image": "", "disease_info": {}})
         disease_info = last_vision_data.get("disease_info", {})
         
         # V19.0: Maximizing PDF Data Transparency
         crop_scores = last_vision_data.get("scores", {}) # Try to get from last vision or predict
         if not crop_scores:
-            pred = await predict_crop(combined_data)
+            pred = engine.predict_crop_logic(combined_data)
             crop_scores = pred.get("scores", {})
 
+        t0 = time.perf_counter()
         filepath, filename = report_engine.generate_report(
-            combined_data, localized_rec, req.sector, history=req.history,
+            combined_data, localized_rec, req.sector, history=history,
             image_base64=req.image_base64 or last_vision_data["image"],
             condition_name=req.condition_name or last_vision_data["label"],
             language=req.language,
             disease_info=disease_info,
             crop_scores=crop_scores
         )
+        metrics.observe("agrivision_report_render_seconds", time.perf_counter() - t0, {"language": req.language})
         # V22.0: Return Public Static URL
         report_url = f"http://localhost:8002/reports/{filename}"
         logger.info(f"Report Generated Successfully: {filename}")
-        return {"status": "success", "report_url": report_url, "filename": filename}
+        return {"status": "success", "report_url": report_url, "filename": filename, "history_version": history_version}
     except Exception as e:
         import traceback
         error_trace = traceback.format_exc()
-        logger.error(f"Generate Report Failed: {str(e)}\n{error_trace}")
+        logger.error(f"Generate Report Failed [{current_request_id()}]: {str(e)}\n{error_trace}")
         return JSONResponse(status_code=500, content={"status": "error", "message": f"Engine Fault: {str(e)}"})
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8002, log_level="info")
+    # V41.4: Multi-worker mode (WORKERS=4 or --workers 4); state is shared through shared_state.db
+    parser = argparse.ArgumentParser(description="AgriVision FastAPI backend")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WORKERS", os.getenv("WEB_CONCURRENCY", "1"))))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8002")))
+    parser.add_argument("--graceful-timeout", type=int, default=int(os.getenv("GRACEFUL_SHUTDOWN_SECONDS", "20")))
+    args = parser.parse_args()
+    options = dict(host="0.0.0.0", port=args.port, log_level="info", timeout_graceful_shutdown=args.graceful_timeout)
+    os.environ["WEB_CONCURRENCY"] = str(args.workers)  # inherited by the workers (per-process routes refused)
+    WEB_CONCURRENCY = args.workers
+    if args.workers > 1:
+        # Workers import the app themselves, so it must be passed as an import string
+        uvicorn.run("main:app", workers=args.workers, app_dir=os.path.dirname(os.path.abspath(__file__)), **options)
+    else:
+        uvicorn.run(app, **options)
@@ -0,0 +1,149 @@
+"""
+V41.7 Prometheus Metrics
+In-process counters, gauges and latency histograms rendered in the Prometheus text format for GET /metrics,
+plus scrape-time collectors for numbers other modules already keep (caches, queues, connection pools).
+"""
+import time
+import bisect
+import threading
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# name: (type, help)
+FAMILIES = {
+    "agrivision_http_requests_total": ("counter", "HTTP requests by method, route template and status code"),
+    "agrivision_http_request_duration_seconds": ("histogram", "HTTP request latency by method and route template"),
+    "agrivision_http_requests_in_flight": ("gauge", "HTTP requests currently being served"),
+    "agrivision_upstream_requests_total": ("counter", "Outbound calls per upstream provider by outcome (2xx/4xx/5xx/error)"),
+    "agrivision_upstream_request_duration_seconds": ("histogram", "Outbound call latency per upstream provider"),
+    "agrivision_upstream_connections_opened": ("gauge", "TCP/TLS connections opened by each upstream pool"),
+    "agrivision_report_render_seconds": ("histogram", "PDF report render duration by language"),
+    "agrivision_cache_requests_total": ("counter", "Cache lookups by cache and result (hit/miss)"),
+    "agrivision_cache_hit_ratio": ("gauge", "Share of cache lookups served from the cache"),
+    "agrivision_queue_depth": ("gauge", "Pending work items per internal queue"),
+}
+
+def _labels(labels):
+    return tuple(sorted(labels.items())) if labels else ()
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(pairs, extra=None):
+    pairs = list(pairs) + ([extra] if extra else [])
+    if not pairs: return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+def _format_value(value):
+    if value == float("inf"): return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Registry:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        self.values = {}      # (name, labels) -> number (counters and gauges)
+        self.histograms = {}  # (name, labels) -> [per-bucket counts..., +Inf count], sum
+        self.collectors = []
+
+    def inc(self, name, labels=None, value=1):
+        key = (name, _labels(labels))
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + value
+
+    def dec(self, name, labels=None, value=1):
+        self.inc(name, labels, -value)
+
+    def observe(self, name, seconds, labels=None):
+        key = (name, _labels(labels))
+        slot = bisect.bisect_left(self.buckets, seconds)
+        with self.lock:
+            hist = self.histograms.get(key)
+            if hist is None:
+                hist = self.histograms[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            hist[0][slot] += 1
+            hist[1] += seconds
+
+    def register_collector(self, collector):
+        """`collector()` returns (name, labels, value) samples, read at scrape time."""
+        self.collectors.append(collector)
+
+    def render(self):
+        with self.lock:
+            values = dict(self.values)
+            histograms = {key: (list(counts), total) for key, (counts, total) in self.histograms.items()}
+        for collector in self.collectors:
+            try:
+                for name, labels, value in collector():
+                    values[(name, _labels(labels))] = value
+            except Exception:
+                continue  # a broken collector must not take the whole scrape down
+
+        families = {}  # name -> [(labels, sample lines)]
+        for (name, labels), value in values.items():
+            families.setdefault(name, []).append((labels, [f"{name}{_format_labels(labels)} {_format_value(value)}"]))
+        for (name, labels), (counts, total) in histograms.items():
+            lines, running = [], 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                running += count
+                lines.append(f"{name}_bucket{_format_labels(labels, ('le', _format_value(bound)))} {running}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{name}_count{_format_labels(labels)} {running}")
+            families.setdefault(name, []).append((labels, lines))
+
+        out = []
+        for name in sorted(families):
+            kind, help_text = FAMILIES.get(name, ("untyped", name))
+            out += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            for _, lines in sorted(families[name], key=lambda series: str(series[0])):
+                out += lines
+        return "\n".join(out) + "\n"
+
+def route_label(scope):
+    """Route template ("/api/tts/{job_id}.mp3") rather than the raw path, so label cardinality stays bounded."""
+    route = scope.get("route")
+    if route is not None: return route.path
+    if "endpoint" in scope and scope.get("root_path"):  # mounted apps such as /reports
+        return scope["root_path"]
+    return "unmatched"
+
+class MetricsMiddleware:
+    """Pure ASGI middleware (no BaseHTTPMiddleware request/response wrapping, streaming stays untouched)."""
+    def __init__(self, app, registry=None):
+        self.app = app
+        self.registry = registry or metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        registry = self.registry
+        registry.inc("agrivision_http_requests_in_flight")
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - t0
+            registry.dec("agrivision_http_requests_in_flight")
+            route = route_label(scope)
+            registry.inc("agrivision_http_requests_total", {"method": scope["method"], "route": route, "status": status})
+            registry.observe("agrivision_http_request_duration_seconds", elapsed, {"method": scope["method"], "route": route})
+
+def cache_samples(cache, hits, misses):
+    """Counter + ratio samples for a collector."""
+    lookups = hits + misses
+    return [
+        ("agrivision_cache_requests_total", {"cache": cache, "result": "hit"}, hits),
+        ("agrivision_cache_requests_total", {"cache": cache, "result": "miss"}, misses),
+        ("agrivision_cache_hit_ratio", {"cache": cache}, round(hits / lookups, 4) if lookups else 0.0),
+    ]
+
+# Global instance
+metrics = Registry()
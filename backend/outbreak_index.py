@@ -0,0 +1,148 @@
+"""
+V39.0 Outbreak Heatmap Index
+Geohash-bucketed disease pressure counts (per condition, per day), updated incrementally on every bio-scan.
+"""
+import os
+import csv
+import datetime
+import threading
+import logging
+from collections import defaultdict
+
+logger = logging.getLogger("AGRI_OUTBREAK")
+
+GEOHASH_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+INDEX_PRECISION = 5  # ~4.9km x 4.9km cells, coarsened by prefix at query time
+LOG_FILE = os.path.join(os.path.dirname(__file__), "diagnosis_geo_log.csv")
+
+def geohash_encode(lat, lon, precision=INDEX_PRECISION):
+    """Encode a coordinate into a base32 geohash string."""
+    lat_rng, lon_rng = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, bit_count, even = [], 0, 0, True
+    while len(chars) < precision:
+        rng, val = (lon_rng, lon) if even else (lat_rng, lat)
+        mid = (rng[0] + rng[1]) / 2
+        bits <<= 1
+        if val >= mid:
+            bits |= 1
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(GEOHASH_BASE32[bits])
+            bits, bit_count = 0, 0
+    return "".join(chars)
+
+def geohash_decode(geohash):
+    """Return the (lat, lon) centre of a geohash cell."""
+    lat_rng, lon_rng = [-90.0, 90.0], [-180.0, 180.0]
+    even = True
+    for ch in geohash:
+        cd = GEOHASH_BASE32.index(ch)
+        for mask in (16, 8, 4, 2, 1):
+            rng = lon_rng if even else lat_rng
+            mid = (rng[0] + rng[1]) / 2
+            if cd & mask: rng[0] = mid
+            else: rng[1] = mid
+            even = not even
+    return round((lat_rng[0] + lat_rng[1]) / 2, 5), round((lon_rng[0] + lon_rng[1]) / 2, 5)
+
+class OutbreakIndex:
+    """Pre-aggregated {day: {condition: {geohash: count}}} index.
+
+    Every scan costs one dict increment; heatmap queries walk buckets, never raw scans.
+    """
+    def __init__(self, log_file=LOG_FILE, precision=INDEX_PRECISION):
+        self.log_file = log_file
+        self.precision = precision
+        self.buckets = defaultdict(lambda: defaultdict(lambda: defaultdict(int)))
+        self.lock = threading.Lock()
+        self.offset = 0
+        with self.lock:
+            self._sync()
+
+    def _sync(self):
+        """Fold log rows appended since the last read into the buckets (caller holds the lock).
+
+        V41.4: The log is the shared source of truth, so every worker process tails it and
+        sees scans recorded by the others; the first call replays it after a restart.
+        """
+        if not os.path.isfile(self.log_file): return
+        try:
+            with open(self.log_file, "rb") as f:
+                f.seek(self.offset)
+                chunk = f.read()
+        except OSError as e:
+            logger.error(f"Outbreak Log Replay Failed: {e}")
+            return
+        end = chunk.rfind(b"\n") + 1  # Only complete rows; a half-written one is read next time
+        if not end: return
+        self.offset += end
+        for row in csv.reader(chunk[:end].decode("utf-8", errors="replace").splitlines()):
+            try:
+                _, day, condition, lat, lon = row[:5]
+                self._bump(day, condition, geohash_encode(float(lat), float(lon), self.precision))
+            except ValueError:
+                continue  # Header or malformed row
+
+    def _bump(self, day, condition, geohash):
+        self.buckets[day][condition][geohash] += 1
+
+    def record(self, lat, lon, condition, when=None):
+        """Append a geo-tagged diagnosis to the log and increment its bucket."""
+        if lat is None or lon is None: return None
+        try:
+            lat, lon = float(lat), float(lon)
+        except (TypeError, ValueError):
+            return None
+        when = when or datetime.datetime.now()
+        day = when.strftime("%Y-%m-%d")
+        condition = (condition or "Unknown").strip() or "Unknown"
+        geohash = geohash_encode(lat, lon, self.precision)
+        with self.lock:
+            try:
+                file_exists = os.path.isfile(self.log_file)
+                with open(self.log_file, "a", newline="", encoding="utf-8") as f:
+                    writer = csv.writer(f)
+                    if not file_exists:
+                        writer.writerow(["Timestamp", "Day", "Condition", "Lat", "Lon", "Geohash"])
+                    writer.writerow([when.strftime("%Y-%m-%d %H:%M:%S"), day, condition, lat, lon, geohash])
+                self._sync()  # Counts our row together with any other worker's
+            except Exception as e:
+                logger.error(f"Outbreak Logging Failed: {e}")
+                self._bump(day, condition, geohash)
+        return geohash
+
+    def heatmap(self, condition=None, days=30, precision=None, today=None):
+        """Aggregate buckets into heatmap tiles: [{geohash, lat, lon, count, conditions}]."""
+        precision = max(1, min(int(precision or self.precision), self.precision))
+        today = today or datetime.date.today()
+        cutoff = (today - datetime.timedelta(days=max(int(days), 1) - 1)).strftime("%Y-%m-%d")
+        wanted = condition.strip().lower() if condition else None
+
+        tiles = defaultdict(lambda: defaultdict(int))
+        with self.lock:
+            self._sync()
+            for day, by_condition in self.buckets.items():
+                if day < cutoff: continue
+                for cond, cells in by_condition.items():
+                    if wanted and cond.lower() != wanted: continue
+                    for geohash, count in cells.items():
+                        tiles[geohash[:precision]][cond] += count
+
+        result = []
+        for geohash, conds in tiles.items():
+            lat, lon = geohash_decode(geohash)
+            result.append({"geohash": geohash, "lat": lat, "lon": lon, "count": sum(conds.values()), "conditions": dict(conds)})
+        result.sort(key=lambda t: t["count"], reverse=True)
+        return result
+
+    def conditions(self):
+        with self.lock:
+            self._sync()
+            return sorted({c for by_condition in self.buckets.values() for c in by_condition})
+
+# Global instance
+outbreak_index = OutbreakIndex()
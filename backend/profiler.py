@@ -0,0 +1,155 @@
+"""
+V41.9 Sampling Profiler
+Background thread that samples every thread's Python stack (sys._current_frames) at a fixed interval and
+aggregates them into the collapsed-stack format flamegraph.pl / speedscope read ("a;b;c 42").
+Runs for N seconds, or for the next K requests whose path starts with a given route (admin routes excluded);
+no restart needed.
+"""
+import os
+import sys
+import time
+import threading
+from collections import Counter
+
+DEFAULT_INTERVAL = 0.005  # 200 Hz
+MAX_SECONDS = 300
+MAX_DEPTH = 128
+ADMIN_PREFIX = "/api/admin"  # the profiler's own status/stop polls never count as profiled requests
+
+def frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+class SamplingProfiler:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stacks = Counter()
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.mode = None            # "seconds" | "requests"
+        self.route = None
+        self.remaining = 0          # requests left in "requests" mode
+        self.deadline = None
+        self.max_seconds = MAX_SECONDS
+        self.interval = DEFAULT_INTERVAL
+        self.started_at = None
+        self.samples = 0
+        self.result = None          # collapsed text of the last finished run
+        self.last_run = {}
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    @property
+    def armed(self):
+        return self.mode == "requests" and self.remaining > 0
+
+    def start(self, seconds=None, requests=None, route="/", interval=DEFAULT_INTERVAL):
+        """Sample for `seconds`, or arm for the next `requests` requests under `route`."""
+        with self.lock:
+            if self.running or self.armed:
+                raise RuntimeError("Profiler already active")
+            if not seconds and not requests:
+                raise ValueError("Give either seconds or requests")
+            if requests and (route or "/").startswith(ADMIN_PREFIX):
+                raise ValueError(f"Routes under {ADMIN_PREFIX} are never profiled")
+            self.stacks = Counter()
+            self.samples = 0
+            self.interval = max(0.001, float(interval))
+            self.max_seconds = min(float(seconds or MAX_SECONDS), MAX_SECONDS)
+            if requests:
+                self.mode, self.route, self.remaining = "requests", route or "/", int(requests)
+            else:
+                self.mode, self.route, self.remaining = "seconds", None, 0
+                self._launch()
+        return self.status()
+
+    def _launch(self):
+        self.stop_event.clear()
+        self.started_at = time.time()
+        self.deadline = time.monotonic() + self.max_seconds
+        self.thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        own = threading.get_ident()
+        names = {}
+        while not self.stop_event.is_set() and time.monotonic() < self.deadline:
+            t0 = time.perf_counter()
+            frames = sys._current_frames()
+            if not names.keys() >= frames.keys():
+                names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in frames.items():
+                if ident == own: continue
+                stack = []
+                while frame is not None and len(stack) < MAX_DEPTH:
+                    stack.append(frame_label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(names.get(ident, f"thread-{ident}"))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+            # Sleep off the rest of the interval; sampling cost is not added on top of it
+            self.stop_event.wait(max(0.0, self.interval - (time.perf_counter() - t0)))
+        self._finish()
+
+    def _finish(self):
+        with self.lock:
+            self.result = "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+            self.last_run = {"mode": self.mode, "route": self.route, "samples": self.samples,
+                             "seconds": round(time.time() - (self.started_at or time.time()), 2),
+                             "stacks": len(self.stacks)}
+            self.mode, self.remaining = None, 0
+
+    def stop(self):
+        """Stop now (or disarm); returns the collapsed stacks gathered so far."""
+        with self.lock:
+            thread = self.thread if self.running else None
+            if thread is None and self.armed:
+                self.mode, self.remaining = None, 0
+                self.result = ""  # disarmed before any matching request arrived
+        if thread is not None:
+            self.stop_event.set()
+            thread.join(timeout=5)
+        return self.result
+
+    # Called by ProfilerMiddleware in "requests" mode
+    def request_started(self, path):
+        if not self.armed or not path.startswith(self.route) or path.startswith(ADMIN_PREFIX): return False
+        with self.lock:
+            if self.armed and not self.running:
+                self._launch()
+        return True
+
+    def request_finished(self):
+        with self.lock:
+            if self.remaining > 0:
+                self.remaining -= 1
+                done = self.remaining == 0
+            else:
+                done = False
+        if done:
+            self.stop_event.set()
+
+    def status(self):
+        return {"running": self.running, "armed": self.armed and not self.running, "mode": self.mode,
+                "route": self.route, "remaining_requests": self.remaining, "samples": self.samples,
+                "interval_ms": round(self.interval * 1000, 2), "last_run": self.last_run,
+                "result_available": self.result is not None}
+
+class ProfilerMiddleware:
+    """Pure ASGI: a single attribute check per request unless the profiler is armed for a route."""
+    def __init__(self, app, profiler=None):
+        self.app = app
+        self.profiler = profiler or sampling_profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.profiler.armed:
+            return await self.app(scope, receive, send)
+        counted = self.profiler.request_started(scope["path"])
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            if counted: self.profiler.request_finished()
+
+# Global instance
+sampling_profiler = SamplingProfiler()
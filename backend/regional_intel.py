@@ -0,0 +1,215 @@
+"""
+V42.2 Regional Intelligence Store
+Agro-climatic profiles for every Indian state/UT, the names of all districts and notes/crops/soils for the
+districts that have their own data, loaded from regional_catalogue.json (entries + prebuilt name/phonetic index).
+A district without its own data falls back to its state's profile and is flagged profiled=False.
+Place names resolve in three steps: normalized exact match (names, renames and aliases), phonetic key
+("Chithore" ~ "Chittoor"), then a SymSpell-style edit-distance search, so misspelled districts are answered
+locally; every recognised place gets a corpus report (state-level defaults, labelled as such, for districts
+without their own data) and only unknown places go to Groq/Wikipedia.
+Rebuild the index after editing the entries: python regional_intel.py --compile
+"""
+import os
+import re
+import sys
+import json
+import threading
+import unicodedata
+from functools import lru_cache
+
+CATALOGUE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "regional_catalogue.json")
+STOP_WORDS = {"district", "dist", "distt", "zilla", "jilla", "the"}
+PHONETIC_RULES = (("ph", "f"), ("bh", "b"), ("dh", "d"), ("th", "t"), ("kh", "k"), ("gh", "g"), ("sh", "s"),
+                  ("ch", "c"), ("jh", "j"), ("ck", "k"), ("q", "k"), ("x", "ks"), ("z", "j"), ("w", "v"), ("y", "i"))
+DOUBLED = re.compile(r"(.)\1+")
+VOWELS = re.compile(r"[aeiouh]")
+LOOKUP_CACHE = 4096
+MAX_EDITS = 2
+
+def normalize(name):
+    """ASCII, lower-case, punctuation and filler words dropped, spaces removed: 'Tarn-Taran Dist.' -> 'tarntaran'."""
+    name = unicodedata.normalize("NFKD", str(name)).encode("ascii", "ignore").decode("ascii").lower()
+    words = re.sub(r"[^a-z0-9]+", " ", name.replace("&", " and ")).split()
+    return "".join(w for w in words if w not in STOP_WORDS)
+
+def phonetic(key):
+    """Consonant skeleton tuned for romanized Indian names (aspirates folded, doubles collapsed, vowels dropped)."""
+    for a, b in PHONETIC_RULES:
+        key = key.replace(a, b)
+    key = DOUBLED.sub(r"\1", key)
+    return key[:1] + VOWELS.sub("", key[1:]) if key else ""
+
+def levenshtein(a, b, limit):
+    """Edit distance, or limit + 1 as soon as every path exceeds `limit`."""
+    if abs(len(a) - len(b)) > limit: return limit + 1
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        if min(cur) > limit: return limit + 1
+        prev = cur
+    return prev[-1]
+
+def tolerance(key):
+    """Edits allowed for a query of this length."""
+    n = len(key)
+    return 0 if n <= 3 else 1 if n <= 7 else MAX_EDITS
+
+def deletes(word, depth):
+    """`word` and every string reachable from it by removing up to `depth` characters."""
+    found, frontier = {word}, {word}
+    for _ in range(depth):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+        found |= frontier
+    return found
+
+class DeleteIndex:
+    """SymSpell-style lookup: names and query meet on a shared deletion variant, so a search is a few dict
+    probes plus edit-distance checks on the handful of names that share one, instead of a scan."""
+    def __init__(self, words=(), depth=MAX_EDITS):
+        self.depth = depth
+        self.variants = {}
+        for word in words:
+            for variant in deletes(word, depth):
+                self.variants.setdefault(variant, []).append(word)
+
+    def search(self, word, max_d):
+        candidates = {name for variant in deletes(word, min(max_d, self.depth)) for name in self.variants.get(variant, ())}
+        return sorted((d, name) for d, name in ((levenshtein(word, name, max_d), name) for name in candidates) if d <= max_d)
+
+def compile_catalogue(path=CATALOGUE_FILE):
+    """Rebuild the prebuilt index (normalized name -> entry refs, phonetic key -> names) from the entries."""
+    with open(path, encoding="utf-8") as f:
+        artifact = json.load(f)
+    names = {}
+    for i, entry in enumerate(artifact["districts"]):
+        for name in [entry["name"]] + entry.get("aliases", []):
+            names.setdefault(normalize(name), []).append(i)
+    for state in artifact["states"]:
+        names.setdefault(normalize(state), []).append(state)  # str ref = state profile, int ref = district
+    phonetics = {}
+    for key in names:
+        phonetics.setdefault(phonetic(key), []).append(key)
+    artifact["index"] = {"names": names, "phonetic": phonetics}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(artifact, f, ensure_ascii=False, indent=1)
+        f.write("\n")
+    return len(names)
+
+class RegionalIntel:
+    def __init__(self, path=CATALOGUE_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.loaded = False
+        self.stats = {"hits": 0, "misses": 0}
+
+    def load(self):
+        if self.loaded: return self
+        with self.lock:
+            if self.loaded: return self
+            with open(self.path, encoding="utf-8") as f:
+                artifact = json.load(f)
+            self.states = artifact["states"]
+            self.districts = artifact["districts"]
+            self.names = artifact["index"]["names"]
+            self.phonetics = artifact["index"]["phonetic"]
+            self.fuzzy = DeleteIndex(self.names)
+            self.resolve = lru_cache(maxsize=LOOKUP_CACHE)(self._resolve)
+            self.loaded = True
+        return self
+
+    def _candidates(self, keys, state):
+        """(ref, key) pairs for the matched keys; restricted to `state` when one is given and known."""
+        refs = [(ref, key) for key in keys for ref in self.names[key]]
+        if state:
+            refs = [(ref, key) for ref, key in refs if self.state_of(ref) == state]
+        return refs
+
+    def _resolve(self, key, state):
+        # 1. Exact: official name, old name or alias
+        if key in self.names:
+            refs = self._candidates([key], state) or self._candidates([key], None)
+            return refs[0][0], "exact", 0
+        # 2. Same phonetic skeleton, within a looser edit bound; 3. edit-distance search
+        limit = 1 if len(key) <= 5 else len(key) // 2
+        phonetic_matches = sorted((levenshtein(key, name, limit), name) for name in self.phonetics.get(phonetic(key), ()))
+        for method, matches in (("phonetic", lambda: [(d, n) for d, n in phonetic_matches if d <= limit]),
+                                ("fuzzy", lambda: self.fuzzy.search(key, tolerance(key)) if tolerance(key) else [])):
+            for d, name in matches():
+                refs = self._candidates([name], state)
+                if refs: return refs[0][0], method, d
+        return None
+
+    def _count(self, outcome):
+        with self.lock:
+            self.stats[outcome] += 1
+
+    def state_of(self, ref):
+        return ref if isinstance(ref, str) else self.districts[ref]["state"]
+
+    def lookup(self, place, state=None):
+        """Resolved district/state profile for a (possibly misspelled) place, or None when it is unknown.
+
+        A known `state` keeps same-named districts apart (Aurangabad, Bilaspur, Pratapgarh) and rejects
+        fuzzy matches that land in another state.
+        """
+        self.load()
+        key = normalize(place or "")
+        state_refs = self.names.get(normalize(state or ""), [])
+        state = next((ref for ref in state_refs if isinstance(ref, str)), None)
+        found = self.resolve(key, state) if key else None
+        self._count("misses" if found is None else "hits")
+        if found is None: return None
+        ref, method, distance = found
+        profile = self.states[self.state_of(ref)]
+        entry = {"name": ref, "state": ref} if isinstance(ref, str) else self.districts[ref]
+        return {
+            "name": entry["name"], "state": entry["state"], "kind": "state" if isinstance(ref, str) else "district",
+            "method": method, "distance": distance, "note": entry.get("note", ""),
+            # False when a district only inherits its state's template (no crops of its own)
+            "profiled": isinstance(ref, str) or bool(entry.get("crops")),
+            "article": self.article(entry["name"], None if isinstance(ref, str) else entry["state"]),
+            "crops": entry.get("crops") or profile["crops"], "soils": entry.get("soils") or profile["soils"],
+            "zone": profile["zone"], "climate": profile["climate"], "irrigation": profile["irrigation"],
+        }
+
+    @staticmethod
+    def article(name, state=None):
+        """Wikipedia title for a district (given its state) or, without one, a state: 'Nellore district'."""
+        return f"{name} district" if state else name
+
+    def articles(self, states=None):
+        """Wikipedia titles for every state and district, optionally limited to some states (knowledge prefetch)."""
+        self.load()
+        wanted = {self.state_of(ref) for s in states for ref in self.names.get(normalize(s), []) if isinstance(ref, str)} if states else None
+        titles = [self.article(s) for s in self.states if wanted is None or s in wanted]
+        return titles + [self.article(d["name"], d["state"]) for d in self.districts if wanted is None or d["state"] in wanted]
+
+    @staticmethod
+    def summary(match):
+        """One-paragraph bureau note, in the format of the original hand-written entries."""
+        head = f"{match['note']} " if match["note"] else "" if match["profiled"] else f"{match['state']} state profile. "
+        return f"{head}Best crops: {', '.join(match['crops'])}. Soil: {match['soils']}. Agro-climatic zone: {match['zone']}."
+
+    @staticmethod
+    def report(match):
+        """Sectioned intelligence report built from the corpus (English)."""
+        where = match["name"] if match["kind"] == "state" else f"{match['name']} district, {match['state']}"
+        basis = "" if match["profiled"] else f" (district data pending: {match['state']} state-level defaults)"
+        return (
+            f"1. 🌍 TOPOGRAPHY & CLIMATE: {where} lies in the {match['zone']} agro-climatic region{basis}. {match['climate']}.\n"
+            f"2. 🧪 SOIL TAXONOMY: {match['soils']}.\n"
+            f"3. 🌾 CROP SUITABILITY: {', '.join(match['crops'])}.\n"
+            f"4. 💧 HYDROLOGICAL OUTLOOK: {match['irrigation']}."
+        )
+
+# Global instance
+regional_intel = RegionalIntel()
+
+if __name__ == "__main__":
+    if "--compile" in sys.argv:
+        print(f"Indexed {compile_catalogue()} names")
+    else:
+        for query in sys.argv[1:] or ["chithore", "Nelore", "Trichy", "Aurangabad"]:
+            print(query, "->", regional_intel.lookup(query))
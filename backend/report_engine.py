@@ -4,6 +4,7 @@ import os
 import logging
 import base64
 import re
+from tracing import span, traced
 
 logger = logging.getLogger("AGRI_V14_REPORT")
 
@@ -47,6 +48,7 @@ class EliteAgriReportV14:
         # This prevents any 'latin-1' or other encoding crashes with standard fonts
         return "".join([c if ord(c) < 128 else "" for c in text])
 
+    @traced("report.render")
     def generate_report(self, data, recommendation, sector="Global", history=None, image_base64=None, condition_name="Unknown", language="English", disease_info=None, crop_scores=None):
         """V14.0 Elite Business Audit with Enhanced Disease Treatment Section"""
         try:
@@ -114,12 +116,13 @@ class EliteAgriReportV14:
             
             if image_base64:
                 try:
-                    img_data = base64.b64decode(image_base64)
-                    temp_img = os.path.join(self.output_dir, f"diag_{datetime.datetime.now().strftime('%H%M%S')}.jpg")
-                    with open(temp_img, "wb") as f: f.write(img_data)
-                    # Center the image
-                    pdf.image(temp_img, x=60, y=pdf.get_y(), w=80)
-                    pdf.set_y(pdf.get_y() + 65)
+                    with span("report.embed_image", bytes=len(image_base64)):
+                        img_data = base64.b64decode(image_base64)
+                        temp_img = os.path.join(self.output_dir, f"diag_{datetime.datetime.now().strftime('%H%M%S')}.jpg")
+                        with open(temp_img, "wb") as f: f.write(img_data)
+                        # Center the image
+                        pdf.image(temp_img, x=60, y=pdf.get_y(), w=80)
+                        pdf.set_y(pdf.get_y() + 65)
                 except: pass
             
             # V14.0: Enhanced Disease Treatment Section
@@ -380,7 +383,8 @@ class EliteAgriReportV14:
 
             filename = f"Industrial_Audit_{language}_{datetime.datetime.now().strftime('%Y%p%m_%H%M%S')}.pdf"
             filepath = os.path.join(self.output_dir, filename)
-            pdf.output(filepath)
+            with span("report.write_pdf", language=language):
+                pdf.output(filepath)
             return filepath, filename
             
         except Exception as e:
@@ -0,0 +1,86 @@
+"""
+V41.2 Structured Response Parser
+One compiled-regex pass over LLM output: vision fields (ENTITY/CONDITION/CONFIDENCE/...) and the
+TRANSLATION/SUMMARY advisory envelope in either order, with parse diagnostics and failure counters.
+"""
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Optional
+
+VISION_FIELDS = ("ENTITY", "CONDITION", "CONFIDENCE", "SYMPTOMS", "VISUAL_MARKERS", "CAUSE", "MANAGEMENT", "TREATMENT_PROTOCOLS")
+REQUIRED_VISION_FIELDS = ("ENTITY", "CONDITION")
+SUMMARY_CHARS = 150
+
+# Tolerates markdown decoration the models like to add: "**CONDITION:** Leaf Spot", "- ENTITY: Rice"
+VISION_LINE = re.compile(
+    r"^[ \t>*#\-]*(" + "|".join(VISION_FIELDS) + r")[ \t]*\**[ \t]*:[ \t]*\**[ \t]*(.*?)[ \t*]*$",
+    re.MULTILINE
+)
+ADVISORY_MARKER = re.compile(r"\**(TRANSLATION|SUMMARY)\**[ \t]*:\**")
+
+stats = Counter()
+_stats_lock = threading.Lock()
+
+def _count(key):
+    with _stats_lock:
+        stats[key] += 1
+
+@dataclass
+class VisionParse:
+    entity: Optional[str] = None
+    condition: Optional[str] = None
+    confidence: Optional[str] = None
+    fields: dict = field(default_factory=dict)
+    missing: list = field(default_factory=list)
+    duplicates: list = field(default_factory=list)
+
+    @property
+    def ok(self):
+        return not self.missing
+
+    def diagnostics(self):
+        return {"ok": self.ok, "fields": len(self.fields), "missing": self.missing, "duplicates": self.duplicates}
+
+@dataclass
+class AdvisoryParse:
+    answer: str
+    summary: str
+    structured: bool
+    order: str = "none"  # "translation-first" | "summary-first" | "none"
+
+    def diagnostics(self):
+        return {"structured": self.structured, "order": self.order}
+
+def parse_vision(text):
+    """First occurrence of every known field wins; markers inside a line's value are ignored."""
+    result = VisionParse()
+    for m in VISION_LINE.finditer(text or ""):
+        name, value = m.group(1), m.group(2).strip()
+        if name in result.fields:
+            result.duplicates.append(name)
+            continue
+        result.fields[name] = value
+    result.entity = result.fields.get("ENTITY")
+    result.condition = result.fields.get("CONDITION")
+    result.confidence = result.fields.get("CONFIDENCE")
+    result.missing = [f for f in REQUIRED_VISION_FIELDS if not result.fields.get(f)]
+    _count("vision_ok" if result.ok else "vision_incomplete")
+    return result
+
+def parse_advisory(text, summary_chars=SUMMARY_CHARS):
+    """TRANSLATION/SUMMARY envelope in either order; unstructured text becomes the answer
+    and its first `summary_chars` characters the voice summary."""
+    text = text or ""
+    markers = list(ADVISORY_MARKER.finditer(text))
+    sections = {}
+    for i, m in enumerate(markers):
+        end = markers[i + 1].start() if i + 1 < len(markers) else len(text)
+        sections.setdefault(m.group(1), text[m.end():end].strip())
+    if "TRANSLATION" in sections and "SUMMARY" in sections:
+        _count("advisory_ok")
+        order = "translation-first" if markers[0].group(1) == "TRANSLATION" else "summary-first"
+        return AdvisoryParse(sections["TRANSLATION"], sections["SUMMARY"], True, order)
+    _count("advisory_fallback")
+    return AdvisoryParse(text.strip(), text.strip()[:summary_chars], False)
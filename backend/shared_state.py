@@ -0,0 +1,103 @@
+"""
+V41.4 Shared State Backend
+SQLite (WAL) key/value store that every uvicorn worker process opens, so session state, the live
+snapshot and speech jobs stay consistent across workers. Values are JSON; keys may expire.
+"""
+import os
+import json
+import time
+import sqlite3
+import threading
+import logging
+
+logger = logging.getLogger("AGRI_STATE")
+
+STATE_FILE = os.getenv("AGRI_STATE_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "shared_state.db"))
+
+class SharedState:
+    def __init__(self, path=STATE_FILE):
+        self.path = path
+        self.local = threading.local()
+        with self._conn() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS leases (name TEXT PRIMARY KEY, owner TEXT NOT NULL, until REAL NOT NULL)")
+
+    def _conn(self):
+        """One connection per thread (sqlite3 objects must not cross threads)."""
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+        return conn
+
+    def get(self, key, default=None):
+        row = self._conn().execute(
+            "SELECT value FROM kv WHERE key = ? AND (expires IS NULL OR expires > ?)", (key, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set(self, key, value, ttl=None):
+        expires = time.time() + ttl if ttl else None
+        self._conn().execute(
+            "INSERT INTO kv (key, value, expires) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires = excluded.expires",
+            (key, json.dumps(value), expires)
+        )
+
+    def update(self, key, patch, default=None):
+        """Atomic read-merge-write of a dict value across processes; returns the merged dict."""
+        def merge(value):
+            value = dict(default or {}) if value is None else value
+            value.update(patch)
+            return value
+        return self.modify(key, merge)
+
+    def modify(self, key, fn, ttl=None):
+        """V42.1: Atomic read-modify-write; `fn(current or None)` returns the new value, or raises to abort."""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT value FROM kv WHERE key = ? AND (expires IS NULL OR expires > ?)", (key, time.time())
+            ).fetchone()
+            value = fn(json.loads(row[0]) if row else None)
+            conn.execute(
+                "INSERT INTO kv (key, value, expires) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires = excluded.expires",
+                (key, json.dumps(value), time.time() + ttl if ttl else None)
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return value
+
+    def delete(self, key):
+        self._conn().execute("DELETE FROM kv WHERE key = ?", (key,))
+
+    def setdefault(self, key, value):
+        """Store `value` only if the key is absent (first worker wins); returns the stored value."""
+        self._conn().execute("INSERT OR IGNORE INTO kv (key, value, expires) VALUES (?, ?, NULL)", (key, json.dumps(value)))
+        return self.get(key, value)
+
+    def acquire_lease(self, name, owner, ttl):
+        """True while `owner` holds the named lease; renewing before `ttl` runs out keeps it."""
+        now = time.time()
+        cur = self._conn().execute(
+            "INSERT INTO leases (name, owner, until) VALUES (?, ?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET owner = excluded.owner, until = excluded.until "
+            "WHERE leases.owner = excluded.owner OR leases.until < ?",
+            (name, owner, now + ttl, now)
+        )
+        return cur.rowcount == 1
+
+    def release_lease(self, name, owner):
+        self._conn().execute("DELETE FROM leases WHERE name = ? AND owner = ?", (name, owner))
+
+    def purge_expired(self):
+        self._conn().execute("DELETE FROM kv WHERE expires IS NOT NULL AND expires <= ?", (time.time(),))
+
+# Global instance
+shared_state = SharedState()
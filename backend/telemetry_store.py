@@ -0,0 +1,211 @@
+"""
+V40.0 Telemetry Time-Series Store
+Per-sector, preallocated NumPy ring buffers (columnar) with incremental 1 min / 1 h / 1 day rollups.
+Each sector preallocates ~7 MB and sector names come from clients, so only MAX_SECTORS of them are accepted.
+"""
+import os
+import time
+import threading
+import logging
+import numpy as np
+
+logger = logging.getLogger("AGRI_TELEMETRY")
+
+# Column order is fixed; every buffer row is [temperature, humidity, N, P, K, pH, DO]
+FIELDS = ("temperature", "humidity", "nitrogen", "phosphorus", "potassium", "ph", "dissolved_oxygen")
+FIELD_INDEX = {f: i for i, f in enumerate(FIELDS)}
+
+RAW_CAPACITY = 86400          # one reading/sec for a day per sector
+MAX_SECTORS = int(os.getenv("TELEMETRY_MAX_SECTORS", "32"))
+ROLLUP_SPECS = {              # resolution label -> (bucket seconds, retained buckets)
+    "1m": (60, 60 * 24 * 7),
+    "1h": (3600, 24 * 90),
+    "1d": (86400, 365 * 2),
+}
+
+def _json_safe(arr):
+    """NaN/inf are not valid JSON; gaps go out as null."""
+    return [x if np.isfinite(x) else None for x in arr.tolist()]
+
+class RingBuffer:
+    """Fixed-size columnar buffer; appends are vectorized slice writes, no per-row objects."""
+    def __init__(self, capacity, width):
+        self.capacity = capacity
+        self.ts = np.zeros(capacity, dtype=np.float64)
+        self.values = np.full((capacity, width), np.nan, dtype=np.float64)
+        self.head = 0   # next write slot
+        self.size = 0
+
+    def append(self, ts, values):
+        n = len(ts)
+        if n == 0: return
+        if n >= self.capacity:
+            ts, values, n = ts[-self.capacity:], values[-self.capacity:], self.capacity
+        end = self.head + n
+        if end <= self.capacity:
+            self.ts[self.head:end] = ts
+            self.values[self.head:end] = values
+        else:
+            split = self.capacity - self.head
+            self.ts[self.head:] = ts[:split]
+            self.values[self.head:] = values[:split]
+            self.ts[:n - split] = ts[split:]
+            self.values[:n - split] = values[split:]
+        self.head = end % self.capacity
+        self.size = min(self.capacity, self.size + n)
+
+    def ordered(self):
+        """Return (ts, values) views/copies in insertion order."""
+        if self.size < self.capacity:
+            return self.ts[:self.size], self.values[:self.size]
+        idx = np.r_[self.head:self.capacity, 0:self.head]
+        return self.ts[idx], self.values[idx]
+
+    def query(self, start, end):
+        ts, values = self.ordered()
+        mask = (ts >= start) & (ts <= end)
+        return ts[mask], values[mask]
+
+class Rollup:
+    """Incremental bucket aggregates (count/sum/min/max) stored in ring-buffer columns."""
+    def __init__(self, seconds, capacity, width):
+        self.seconds = seconds
+        self.capacity = capacity
+        self.start = np.full(capacity, -1.0, dtype=np.float64)
+        self.count = np.zeros((capacity, width), dtype=np.int64)
+        self.sum = np.zeros((capacity, width), dtype=np.float64)
+        self.min = np.full((capacity, width), np.inf, dtype=np.float64)
+        self.max = np.full((capacity, width), -np.inf, dtype=np.float64)
+        self.head = -1  # slot of the newest (open) bucket
+        self.size = 0
+
+    def _slot_for(self, bucket):
+        """Locate or open the slot for a bucket start; None if it is older than retention."""
+        if self.head >= 0:
+            newest = self.start[self.head]
+            if bucket == newest: return self.head
+            if bucket < newest:
+                # Late reading: merge into its bucket if still retained, never reorder the ring
+                hits = np.nonzero(self.start == bucket)[0]
+                return int(hits[0]) if len(hits) else None
+        self.head = (self.head + 1) % self.capacity
+        self.size = min(self.capacity, self.size + 1)
+        self.start[self.head] = bucket
+        self.count[self.head] = 0
+        self.sum[self.head] = 0.0
+        self.min[self.head] = np.inf
+        self.max[self.head] = -np.inf
+        return self.head
+
+    def update(self, ts, values):
+        buckets = np.floor(ts / self.seconds) * self.seconds
+        uniq, inverse = np.unique(buckets, return_inverse=True)
+        valid = ~np.isnan(values)
+        filled = np.where(valid, values, 0.0)
+        for i, bucket in enumerate(uniq):
+            slot = self._slot_for(bucket)
+            if slot is None: continue
+            rows = inverse == i
+            self.count[slot] += valid[rows].sum(axis=0)
+            self.sum[slot] += filled[rows].sum(axis=0)
+            self.min[slot] = np.fmin(self.min[slot], np.where(valid[rows], values[rows], np.inf).min(axis=0))
+            self.max[slot] = np.fmax(self.max[slot], np.where(valid[rows], values[rows], -np.inf).max(axis=0))
+
+    def query(self, start, end):
+        if self.size == 0:
+            return np.empty(0), np.empty((0, self.count.shape[1])), np.empty((0, self.count.shape[1]), dtype=np.int64), None, None
+        slots = (self.head - np.arange(self.size)[::-1]) % self.capacity
+        starts = self.start[slots]
+        mask = (starts >= np.floor(start / self.seconds) * self.seconds) & (starts <= end)
+        slots = slots[mask]
+        count = self.count[slots]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.where(count > 0, self.sum[slots] / np.maximum(count, 1), np.nan)
+        mins = np.where(count > 0, self.min[slots], np.nan)
+        maxs = np.where(count > 0, self.max[slots], np.nan)
+        return self.start[slots], mean, count, mins, maxs
+
+class SectorSeries:
+    def __init__(self, raw_capacity=RAW_CAPACITY):
+        width = len(FIELDS)
+        self.raw = RingBuffer(raw_capacity, width)
+        self.rollups = {label: Rollup(sec, cap, width) for label, (sec, cap) in ROLLUP_SPECS.items()}
+        self.lock = threading.Lock()
+
+    def ingest(self, ts, values):
+        order = np.argsort(ts, kind="stable")
+        ts, values = ts[order], values[order]
+        with self.lock:
+            self.raw.append(ts, values)
+            for rollup in self.rollups.values():
+                rollup.update(ts, values)
+
+class TelemetryStore:
+    """Sector name -> SectorSeries registry shared by the ingest and range-query endpoints."""
+    def __init__(self, raw_capacity=RAW_CAPACITY, max_sectors=MAX_SECTORS):
+        self.raw_capacity = raw_capacity
+        self.max_sectors = max_sectors
+        self.sectors = {}
+        self.lock = threading.Lock()
+
+    def series(self, sector):
+        s = self.sectors.get(sector)
+        if s is None:
+            with self.lock:
+                s = self.sectors.get(sector)
+                if s is None:
+                    if len(self.sectors) >= self.max_sectors:
+                        raise ValueError(f"Sector limit reached ({self.max_sectors}); '{sector}' is not tracked")
+                    s = self.sectors[sector] = SectorSeries(self.raw_capacity)
+        return s
+
+    def ingest_columns(self, sector, columns, ts=None):
+        """Append a columnar batch: {field: [values...]} with an optional parallel ts list."""
+        n = max((len(v) for v in columns.values() if v is not None), default=0)
+        if n == 0: return 0
+        ts = np.full(n, time.time()) if ts is None else np.asarray(ts, dtype=np.float64)
+        if len(ts) != n:
+            raise ValueError("ts length does not match column length")
+        values = np.full((n, len(FIELDS)), np.nan, dtype=np.float64)
+        for field, col in columns.items():
+            idx = FIELD_INDEX.get(field)
+            if idx is None or col is None: continue
+            if len(col) != n:
+                raise ValueError(f"column '{field}' length does not match batch length")
+            values[:, idx] = np.asarray(col, dtype=np.float64)
+        self.series(sector).ingest(ts, values)
+        return n
+
+    def ingest_reading(self, sector, reading, ts=None):
+        """Single-row convenience path used by /api/simulate."""
+        row = np.array([[float(reading[f]) if isinstance(reading.get(f), (int, float)) else np.nan for f in FIELDS]])
+        self.series(sector).ingest(np.array([ts or time.time()], dtype=np.float64), row)
+
+    def query(self, sector, start=None, end=None, resolution="raw", fields=None):
+        series = self.sectors.get(sector)
+        fields = [f for f in (fields or FIELDS) if f in FIELD_INDEX]
+        cols = [FIELD_INDEX[f] for f in fields]
+        end = time.time() if end is None else end
+        start = end - 3600 if start is None else start
+        if series is None:
+            return {"sector": sector, "resolution": resolution, "ts": [], "fields": {f: [] for f in fields}}
+        with series.lock:
+            if resolution == "raw":
+                ts, values = series.raw.query(start, end)
+                out = {f: _json_safe(values[:, c]) for f, c in zip(fields, cols)}
+                return {"sector": sector, "resolution": "raw", "ts": ts.tolist(), "fields": out}
+            if resolution not in series.rollups:
+                raise ValueError(f"Unknown resolution '{resolution}'. Use raw, {', '.join(ROLLUP_SPECS)}")
+            ts, mean, count, mins, maxs = series.rollups[resolution].query(start, end)
+        out = {}
+        for f, c in zip(fields, cols):
+            out[f] = {
+                "mean": _json_safe(np.round(mean[:, c], 4)) if len(ts) else [],
+                "min": _json_safe(mins[:, c]) if len(ts) else [],
+                "max": _json_safe(maxs[:, c]) if len(ts) else [],
+                "count": count[:, c].tolist() if len(ts) else [],
+            }
+        return {"sector": sector, "resolution": resolution, "ts": ts.tolist(), "fields": out}
+
+# Global instance
+telemetry_store = TelemetryStore()
@@ -0,0 +1,36 @@
+"""
+V42.0 Chat Context Coverage
+Every history turn must end up either verbatim or in the running summary, including when the same
+question was asked twice (turns are located by position, not by equality).
+Usage: python test_chat_context.py
+"""
+import sys
+from chat_context import ChatContextBuilder
+
+REPEATED = "Which fertilizer should I use for paddy this season? " * 24  # long: forces the budget cut
+
+def history_with_repeat():
+    history = [{"role": "user", "content": REPEATED}]
+    for i in range(1, 6):
+        history.append({"role": "assistant" if i % 2 else "user", "content": f"Turn {i} about irrigation schedules."})
+    history.append({"role": "user", "content": REPEATED})
+    history.append({"role": "assistant", "content": "Turn 7 recommends urea in split doses."})
+    return history
+
+def test_repeated_turn_is_not_lost():
+    history = history_with_repeat()
+    # The budget fits the last answer but not the repeated question before it, so the cut lands on index 6
+    ctx = ChatContextBuilder(budget=150, state=None).build(history, {})
+    stats = ctx.stats
+    assert stats["turns_summarized"] + stats["turns_verbatim"] == len(history), stats
+    rendered = "\n".join(m["content"] for m in ctx.history)
+    for i in range(1, 6):
+        assert f"Turn {i}" in rendered, f"turn {i} is neither verbatim nor summarized"
+
+if __name__ == "__main__":
+    try:
+        test_repeated_turn_is_not_lost()
+        print("Chat context coverage - OK")
+    except AssertionError as e:
+        print(f"Chat Context Lost Turns: {e}")
+        sys.exit(1)
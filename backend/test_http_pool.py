@@ -0,0 +1,42 @@
+"""
+V40.8 Upstream Retry Policy
+Points the pooled sessions at an upstream stand-in that answers every call with 503 and counts what
+reaches it: an LLM POST must hit the server exactly once (no re-sent prompts), while an idempotent
+GET on a pool with read retries is still retried.
+Usage: python test_http_pool.py
+"""
+import sys
+import http_pool
+from upstream_stub import UpstreamStub
+
+FAILING = {"median_ms": 5, "sigma": 0.1, "error_rate": 1.0, "error_status": 503}
+
+def upstream_calls(session_name, method, url, host):
+    """How many times one call through a freshly built pool reaches the (always failing) stand-in."""
+    stub = UpstreamStub(0, {host: FAILING}).start()
+    base = http_pool.UPSTREAM_BASE
+    http_pool.UPSTREAM_BASE = stub.base_url
+    try:
+        res = http_pool._build(session_name).request(method, url, json={"messages": []}, timeout=5)
+        assert res.status_code == 503
+        return stub.stats()[host]["calls"]
+    finally:
+        http_pool.UPSTREAM_BASE = base
+        stub.stop()
+
+def test_llm_post_sent_once():
+    calls = upstream_calls("groq", "POST", "https://api.groq.com/openai/v1/chat/completions", "api.groq.com")
+    assert calls == 1, f"Groq POST reached the upstream {calls} times"
+
+def test_idempotent_get_retried():
+    calls = upstream_calls("wikipedia", "GET", "https://en.wikipedia.org/api/rest_v1/page/summary/Nellore", "en.wikipedia.org")
+    assert calls > 1, "Wikipedia GET was not retried on 503"
+
+if __name__ == "__main__":
+    try:
+        test_llm_post_sent_once()
+        test_idempotent_get_retried()
+        print("Retry policy - OK")
+    except AssertionError as e:
+        print(f"Retry Policy Violated: {e}")
+        sys.exit(1)
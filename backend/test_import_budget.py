@@ -0,0 +1,58 @@
+"""
+V40.9 Import-Time Budget
+Runs `python -X importtime -c "import logic"` in a fresh interpreter, parses the cumulative
+timings and fails when the standalone engine gets slow to load or pulls a deferred module back in.
+Usage: python test_import_budget.py [budget_ms]
+"""
+import os
+import re
+import sys
+import subprocess
+
+MODULE = "logic"
+BUDGET_MS = 400
+# Must stay lazy: only loaded on first geocode / report / Streamlit secrets lookup
+DEFERRED = ("geopy", "fpdf", "streamlit")
+
+LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+def measure(module=MODULE):
+    """{top-level package: cumulative ms} plus the total for `module`."""
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True
+    )
+    if out.returncode != 0:
+        raise RuntimeError(out.stderr.strip().splitlines()[-1])
+    timings, total = {}, 0.0
+    for line in out.stderr.splitlines():
+        m = LINE.match(line)
+        if not m: continue
+        cumulative_ms = int(m.group(2)) / 1000
+        name = m.group(4)
+        timings[name] = cumulative_ms
+        if name == module: total = cumulative_ms
+    return timings, total
+
+def check_budget(budget_ms=BUDGET_MS):
+    """Measure once and assert the budget; returns the timings for the CLI report."""
+    timings, total = measure()
+    eager = [name for name in timings if name.split(".")[0] in DEFERRED]
+    assert not eager, f"Deferred modules imported eagerly: {sorted(eager)}"
+    assert total <= budget_ms, f"import {MODULE} took {total:.1f} ms (budget {budget_ms} ms)"
+    return timings, total
+
+def test_import_budget():
+    check_budget()
+
+if __name__ == "__main__":
+    budget = float(sys.argv[1]) if len(sys.argv) > 1 else BUDGET_MS
+    try:
+        timings, total = check_budget(budget)
+        heaviest = sorted(((v, k) for k, v in timings.items() if "." not in k and k != MODULE), reverse=True)[:8]
+        for ms, name in heaviest:
+            print(f"{name:<24}{ms:>9.1f} ms")
+        print(f"import {MODULE}: {total:.1f} ms (budget {budget:.0f} ms) - OK")
+    except AssertionError as e:
+        print(f"Import Budget Exceeded: {e}")
+        sys.exit(1)
@@ -0,0 +1,199 @@
+"""
+V41.8 Request Tracing
+Lightweight spans around the vision, chat, geo and report stages, with OpenTelemetry-compatible ids and
+OTLP/JSON export. The client's X-Request-ID (or W3C traceparent) becomes the trace, and is echoed back
+in the response headers. Spans are recorded only when an exporter is configured:
+  AGRI_TRACE_FILE=traces.jsonl       one OTLP/JSON ExportTraceServiceRequest per line (otlpjsonfile format)
+  AGRI_TRACE_ENDPOINT=http://127.0.0.1:4318/v1/traces   OTLP/HTTP JSON collector
+"""
+import os
+import re
+import json
+import time
+import uuid
+import logging
+import threading
+import functools
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+
+logger = logging.getLogger("AGRI_TRACE")
+
+TRACE_FILE = os.getenv("AGRI_TRACE_FILE")
+TRACE_ENDPOINT = os.getenv("AGRI_TRACE_ENDPOINT")
+SERVICE_NAME = "agrivision-backend"
+FLUSH_SECONDS = 2.0
+MAX_QUEUED_SPANS = 10000
+TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+HEX_ID = re.compile(r"^[0-9a-f]{32}$")
+
+_current = contextvars.ContextVar("agri_span", default=None)
+_request_id = contextvars.ContextVar("agri_request_id", default=None)
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "start_ns", "end_ns", "attributes", "error", "recording")
+
+    def __init__(self, trace_id, parent_id, name, attributes=None, recording=True):
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.name = name
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = dict(attributes or {})
+        self.error = None
+        self.recording = recording
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    @property
+    def traceparent(self):
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def to_otlp(self):
+        span = {
+            "traceId": self.trace_id, "spanId": self.span_id, "name": self.name, "kind": 1,
+            "startTimeUnixNano": str(self.start_ns), "endTimeUnixNano": str(self.end_ns or time.time_ns()),
+            "attributes": [otlp_attribute(k, v) for k, v in self.attributes.items()],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+        }
+        if self.parent_id: span["parentSpanId"] = self.parent_id
+        return span
+
+def otlp_attribute(key, value):
+    if isinstance(value, bool): return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int): return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float): return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+class SpanExporter:
+    """Background batcher: finished spans queue up and are flushed every FLUSH_SECONDS."""
+    def __init__(self, path=TRACE_FILE, endpoint=TRACE_ENDPOINT):
+        self.path = path
+        self.endpoint = endpoint
+        self.enabled = bool(path or endpoint)
+        self.queue = deque(maxlen=MAX_QUEUED_SPANS)  # oldest spans are dropped under overload
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def export(self, span):
+        self.queue.append(span)
+        if self.thread is None:
+            with self.lock:
+                if self.thread is None:
+                    self.thread = threading.Thread(target=self._run, name="trace-export", daemon=True)
+                    self.thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(FLUSH_SECONDS)
+            self.flush()
+
+    def flush(self):
+        spans = []
+        while self.queue:
+            try:
+                spans.append(self.queue.popleft())
+            except IndexError:
+                break
+        if not spans: return 0
+        batch = {"resourceSpans": [{
+            "resource": {"attributes": [otlp_attribute("service.name", SERVICE_NAME), otlp_attribute("process.pid", os.getpid())]},
+            "scopeSpans": [{"scope": {"name": "agrivision.tracing"}, "spans": [s.to_otlp() for s in spans]}],
+        }]}
+        try:
+            if self.path:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(batch) + "\n")
+            if self.endpoint:
+                from http_pool import get_session
+                get_session("collector").post(self.endpoint, json=batch, timeout=5)
+        except Exception as e:
+            logger.warning(f"Trace Export Failed: {e}")
+        return len(spans)
+
+exporter = SpanExporter()
+
+def start_trace(name, request_id=None, traceparent=None, **attributes):
+    """Root span for one request; returns (span, tokens) for end_trace."""
+    parent_id = None
+    match = TRACEPARENT.match(traceparent or "")
+    if match:
+        trace_id, parent_id = match.groups()
+    elif request_id and HEX_ID.match(request_id.lower()):
+        trace_id = request_id.lower()
+    else:
+        trace_id = uuid.uuid4().hex
+    root = Span(trace_id, parent_id, name, attributes, recording=exporter.enabled)
+    root.set(**{"request.id": request_id or trace_id})
+    return root, (_current.set(root), _request_id.set(request_id or trace_id))
+
+def end_trace(root, tokens):
+    root.end_ns = time.time_ns()
+    _current.reset(tokens[0])
+    _request_id.reset(tokens[1])
+    if root.recording: exporter.export(root)
+
+@contextmanager
+def span(name, **attributes):
+    """Child of the current span; a no-op outside a recorded trace (e.g. Streamlit's local engine calls)."""
+    parent = _current.get()
+    if parent is None or not parent.recording:
+        yield None
+        return
+    child = Span(parent.trace_id, parent.span_id, name, attributes)
+    token = _current.set(child)
+    try:
+        yield child
+    except Exception as e:
+        child.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        child.end_ns = time.time_ns()
+        _current.reset(token)
+        exporter.export(child)
+
+def traced(name):
+    """Decorator form of span()."""
+    def wrap(fn):
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return inner
+    return wrap
+
+def current_request_id():
+    return _request_id.get()
+
+class TracingMiddleware:
+    """Pure ASGI middleware: opens the root span and returns X-Request-ID / traceparent headers."""
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        headers = dict(scope.get("headers") or [])
+        request_id = headers.get(b"x-request-id", b"").decode("latin-1")[:128] or None
+        traceparent = headers.get(b"traceparent", b"").decode("latin-1") or None
+        root, tokens = start_trace(f"{scope['method']} {scope['path']}", request_id, traceparent,
+                                  **{"http.method": scope["method"], "http.target": scope["path"]})
+
+        async def send_with_ids(message):
+            if message["type"] == "http.response.start":
+                root.set(**{"http.status_code": message["status"]})
+                message["headers"] = list(message.get("headers") or []) + [
+                    (b"x-request-id", root.attributes["request.id"].encode("latin-1")),
+                    (b"traceparent", root.traceparent.encode("latin-1")),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_ids)
+        finally:
+            route = scope.get("route")
+            if route is not None: root.name = f"{scope['method']} {route.path}"
+            end_trace(root, tokens)
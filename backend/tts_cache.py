@@ -0,0 +1,145 @@
+"""
+V40.5 Voice Briefing Cache
+gTTS audio keyed on (text hash, language): LRU memory tier + on-disk MP3 store + background pre-synthesis.
+V40.6: Sentence chunks are synthesized concurrently and streamed back in order.
+"""
+import os
+import re
+import hashlib
+import threading
+import logging
+from io import BytesIO
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, Future
+
+logger = logging.getLogger("AGRI_TTS")
+
+LANG_CODES = {"English": "en", "Hindi": "hi", "Tamil": "ta", "Telugu": "te", "Urdu": "ur", "Malayalam": "ml"}
+SENTENCE_END = re.compile(r'(?<=[.!?\u0964\u0965])\s+|\n+')
+CHUNK_CHARS = 200
+
+def clean_speech_text(text):
+    """Strip markdown links/formatting so the voice reads prose only."""
+    text = re.sub(r'\[.*?\]\(.*?\)', '', str(text or ""))
+    return text.replace("**", "").replace("__", "").replace("#", "")
+
+def split_sentences(text, max_chars=CHUNK_CHARS):
+    """Speakable chunks: the first sentence stays alone (fast first audio), the rest are packed up to max_chars."""
+    sentences = []
+    for sentence in SENTENCE_END.split(text or ""):
+        sentence = sentence.strip()
+        while len(sentence) > max_chars:
+            cut = sentence.rfind(" ", 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            sentences.append(sentence[:cut].strip())
+            sentence = sentence[cut:].strip()
+        if sentence: sentences.append(sentence)
+
+    chunks = sentences[:1]
+    for sentence in sentences[1:]:
+        if len(chunks) > 1 and len(chunks[-1]) + len(sentence) + 1 <= max_chars:
+            chunks[-1] = f"{chunks[-1]} {sentence}"
+        else:
+            chunks.append(sentence)
+    return chunks
+
+class TTSCache:
+    def __init__(self, cache_dir, memory_items=256, disk_items=2000, workers=4):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+        self.memory_items = memory_items
+        self.disk_items = disk_items
+        self.memory = OrderedDict()
+        self.inflight = {}
+        self.lock = threading.Lock()
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tts")
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "synthesized": 0}
+
+    @staticmethod
+    def key(text, lang):
+        return f"{lang}_{hashlib.sha1(text.encode('utf-8')).hexdigest()}"
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.mp3")
+
+    def _remember(self, key, audio):
+        self.memory[key] = audio
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_items:
+            self.memory.popitem(last=False)
+
+    def get(self, text, lang):
+        """Cached audio or None; never touches the network."""
+        key = self.key(text, lang)
+        with self.lock:
+            if key in self.memory:
+                self.memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return self.memory[key]
+        path = self._path(key)
+        if os.path.isfile(path):
+            with open(path, "rb") as f: audio = f.read()
+            with self.lock:
+                self._remember(key, audio)
+                self.stats["disk_hits"] += 1
+            return audio
+        return None
+
+    def _synthesize(self, text, lang, key):
+        try:
+            audio = self.get(text, lang)
+            if audio is not None: return audio
+            from gtts import gTTS
+            fp = BytesIO()
+            gTTS(text=text, lang=lang).write_to_fp(fp)
+            audio = fp.getvalue()
+            with open(self._path(key), "wb") as f: f.write(audio)
+            with self.lock:
+                self._remember(key, audio)
+                self.stats["synthesized"] += 1
+            self._prune_disk()
+            return audio
+        finally:
+            with self.lock:
+                self.inflight.pop(key, None)
+
+    def presynthesize(self, text, lang):
+        """Start (or join) synthesis in the background; returns a Future of MP3 bytes."""
+        audio = self.get(text, lang)
+        if audio is not None:
+            done = Future()
+            done.set_result(audio)
+            return done
+        key = self.key(text, lang)
+        with self.lock:
+            fut = self.inflight.get(key)
+            if fut is None:
+                fut = self.pool.submit(self._synthesize, text, lang, key)
+                self.inflight[key] = fut
+        return fut
+
+    def synthesize(self, text, lang, timeout=30):
+        return self.presynthesize(text, lang).result(timeout=timeout)
+
+    def synthesize_chunks(self, text, lang):
+        """Submit every sentence chunk at once; futures come back in speaking order."""
+        return [self.presynthesize(chunk, lang) for chunk in split_sentences(text)]
+
+    @staticmethod
+    def stream(futures, timeout=30):
+        """Yield MP3 bytes chunk by chunk, in order, as soon as each one is ready (MP3 frames concatenate)."""
+        for fut in futures:
+            try:
+                yield fut.result(timeout=timeout)
+            except Exception as e:
+                logger.warning(f"TTS Chunk Failed: {e}")
+
+    def _prune_disk(self):
+        try:
+            files = [os.path.join(self.cache_dir, n) for n in os.listdir(self.cache_dir) if n.endswith(".mp3")]
+            if len(files) <= self.disk_items: return
+            files.sort(key=os.path.getmtime)
+            for path in files[:len(files) - self.disk_items]:
+                os.remove(path)
+        except OSError as e:
+            logger.warning(f"TTS Cache Prune Failed: {e}")
@@ -0,0 +1,166 @@
+"""
+V41.5 Upstream Stand-in Server
+Local HTTP server that answers like Groq, the Hugging Face router, OpenWeatherMap, Commodities-API,
+Wikipedia and Nominatim, with a configurable latency distribution and error rate per upstream.
+The backend reaches it through AGRI_UPSTREAM_BASE (http_pool.redirect_upstream), which turns
+"https://api.groq.com/openai/v1/..." into "http://127.0.0.1:8093/api.groq.com/openai/v1/...".
+Usage: python upstream_stub.py [port] [profile.json]
+"""
+import sys
+import json
+import time
+import random
+import hashlib
+import threading
+from collections import Counter
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit
+
+DEFAULT_PORT = 8093
+
+# host: latency is log-normal around median_ms (sigma = spread); error_rate of calls answer error_status
+DEFAULT_PROFILE = {
+    "api.groq.com": {"median_ms": 450, "sigma": 0.4, "error_rate": 0.01, "error_status": 503},
+    "router.huggingface.co": {"median_ms": 1800, "sigma": 0.5, "error_rate": 0.02, "error_status": 503},
+    "api.openweathermap.org": {"median_ms": 90, "sigma": 0.3, "error_rate": 0.01, "error_status": 502},
+    "commodities-api.com": {"median_ms": 140, "sigma": 0.3, "error_rate": 0.02, "error_status": 502},
+    "en.wikipedia.org": {"median_ms": 70, "sigma": 0.3, "error_rate": 0.0, "error_status": 503},
+    "nominatim.openstreetmap.org": {"median_ms": 180, "sigma": 0.4, "error_rate": 0.01, "error_status": 429},
+}
+
+CONDITIONS = ("Rice Blast", "Tomato Early Blight", "Wheat Leaf Rust", "Healthy", "Powdery Mildew")
+
+def groq_reply(prompt):
+    if "GEOGRAPHIC INTELLIGENCE" in prompt:
+        return ("1. TOPOGRAPHY & CLIMATE: Gently undulating plains, warm semi-arid climate.\n"
+                "2. SOIL TAXONOMY: Chromic Luvisols with red loam pockets.\n"
+                "3. CROP SUITABILITY: Paddy, Maize, Groundnut.\n"
+                "4. INDUSTRIAL PROXIMITY: Rice mills within 20 km.\n"
+                "5. HYDROLOGICAL OUTLOOK: Drip irrigation recommended.\n"
+                "6. MARKET PULSE: Stable paddy prices at the district mandi.")
+    return ("TRANSLATION: Apply a balanced NPK schedule, monitor leaf wetness and scout twice a week. "
+            "SUMMARY: Balanced nutrition and regular scouting are advised.")
+
+def vision_reply():
+    condition = random.choice(CONDITIONS)
+    return (f"ENTITY: Rice\nCONDITION: {condition}\nCONFIDENCE: {random.randint(70, 98)}%\n"
+            "VISUAL_MARKERS: Spindle-shaped lesions with grey centres\n"
+            "TREATMENT_PROTOCOLS: Tricyclazole 0.6 g/L foliar spray")
+
+def chat_completion(content):
+    return {"choices": [{"message": {"role": "assistant", "content": content}}]}
+
+def respond(host, path, query, body):
+    """JSON payload the real upstream would return for this path."""
+    if host == "api.groq.com":
+        messages = (body or {}).get("messages", [])
+        prompt = str(messages[-1].get("content", "")) if messages else ""
+        return chat_completion(groq_reply(prompt))
+    if host == "router.huggingface.co":
+        return chat_completion(vision_reply())
+    if host == "api.openweathermap.org":
+        return {"main": {"temp": round(random.uniform(22, 36), 1), "humidity": random.randint(40, 90), "pressure": 1008}}
+    if host == "commodities-api.com":
+        return {"success": True, "data": {"rates": {"CORN": 0.21, "WHEAT": 0.17, "SOYBEAN": 0.09, "RICE": 0.055}}}
+    if host == "en.wikipedia.org":
+        return {"extract": f"{path.rsplit('/', 1)[-1].replace('_', ' ')} is an agricultural district."}
+    if host == "nominatim.openstreetmap.org":
+        place = {"lat": "11.0168", "lon": "76.9558", "display_name": "Coimbatore, Tamil Nadu, India",
+                 "address": {"city": "Coimbatore", "state": "Tamil Nadu", "country": "India"}}
+        return [place] if path.startswith("/search") else place
+    return None
+
+class UpstreamStub:
+    def __init__(self, port=DEFAULT_PORT, profile=None):
+        self.profile = {host: dict(cfg) for host, cfg in DEFAULT_PROFILE.items()}
+        for host, cfg in (profile or {}).items():
+            self.profile.setdefault(host, {}).update(cfg)
+        self.calls = Counter()
+        self.errors = Counter()
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _serve(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+                parts = urlsplit(self.path)
+                host, _, path = parts.path.lstrip("/").partition("/")
+                path = "/" + path
+                cfg = stub.profile.get(host)
+                if cfg is None:
+                    return self._send(404, {"error": f"unknown upstream {host}"})
+                time.sleep(random.lognormvariate(0, cfg.get("sigma", 0.3)) * cfg.get("median_ms", 100) / 1000)
+                with stub.lock:
+                    stub.calls[host] += 1
+                if random.random() < cfg.get("error_rate", 0.0):
+                    with stub.lock:
+                        stub.errors[host] += 1
+                    return self._send(cfg.get("error_status", 503), {"error": "injected failure"})
+                try:
+                    body = json.loads(raw) if raw else None
+                except ValueError:
+                    body = None
+                payload = respond(host, path, parts.query, body)
+                if payload is None:
+                    return self._send(404, {"error": "unknown path"})
+                # Wikipedia's REST API validates with ETags; answer conditional requests like it does
+                etag = f'"{hashlib.sha1(json.dumps(payload).encode("utf-8")).hexdigest()[:16]}"' if host == "en.wikipedia.org" else None
+                if etag and self.headers.get("If-None-Match") == etag:
+                    return self._send(304, None, etag)
+                self._send(200, payload, etag)
+
+            def _send(self, status, payload, etag=None):
+                data = json.dumps(payload).encode("utf-8") if payload is not None else b""
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                if etag: self.send_header("ETag", etag)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = _serve
+            do_POST = _serve
+
+        return Handler
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def stats(self):
+        with self.lock:
+            return {host: {"calls": self.calls[host], "errors": self.errors[host]} for host in self.profile}
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_PORT
+    profile = None
+    if len(sys.argv) > 2:
+        with open(sys.argv[2], encoding="utf-8") as f:
+            profile = json.load(f)
+    stub = UpstreamStub(port, profile)
+    print(f"Upstream stand-in listening on {stub.base_url} (set AGRI_UPSTREAM_BASE to this URL)")
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        stub.stop()
@@ -13,8 +13,70 @@ import webbrowser
 import pyttsx3
 import base64
 import random
+import uuid
+import re
+import queue
 from PIL import Image, ImageTk
 from io import BytesIO
+try:
+    from live_channel import LiveSubscriber
+except ImportError:
+    import sys
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+    from live_channel import LiveSubscriber
+from crop_engine import predict_crop_scores
+from disease_database import SCAN_CROPS
+from tts_cache import split_sentences
+from http_pool import get_session
+
+class SimSyncWorker:
+    """V40.2: Debounced slider sync - one background worker, latest state wins.
+
+    Slider ticks only overwrite the pending state; the worker waits until input has been
+    still for `debounce` seconds, posts the newest state once over a persistent session and
+    drops predictor results that were superseded while in flight. Without `on_prediction`
+    only the shared state is synced (the GUI scores crops locally).
+    """
+    def __init__(self, session, api_base, on_prediction=None, debounce=0.15):
+        self.session = session
+        self.api_base = api_base
+        self.on_prediction = on_prediction
+        self.debounce = debounce
+        self.cond = threading.Condition()
+        self.pending = None
+        self.push_state = False
+        self.generation = 0
+        self.last_submit = 0.0
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def submit(self, state, push_state=True):
+        with self.cond:
+            self.pending = dict(state)
+            self.push_state = self.push_state or push_state
+            self.generation += 1
+            self.last_submit = time.monotonic()
+            self.cond.notify()
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while self.pending is None:
+                    self.cond.wait()
+                while True:
+                    remaining = self.last_submit + self.debounce - time.monotonic()
+                    if remaining <= 0: break
+                    self.cond.wait(remaining)
+                state, push, gen = self.pending, self.push_state, self.generation
+                self.pending, self.push_state = None, False
+            try:
+                if push:
+                    self.session.post(f"{self.api_base}/simulate", json=state, timeout=5)
+                if self.on_prediction is None or gen != self.generation: continue  # Superseded while syncing
+                res = self.session.post(f"{self.api_base}/predict-crop", json=state, timeout=5)
+                if res.status_code == 200 and gen == self.generation:
+                    self.on_prediction(res.json())
+            except requests.RequestException:
+                pass
 
 class UltimateAgriCommandV14(tk.Tk):
     def __init__(self):
@@ -39,18 +101,34 @@ class UltimateAgriCommandV14(tk.Tk):
         self.market_data = {}
         self.geo_entries = {}
         self.chat_history = [] 
+        self.chat_session_id = uuid.uuid4().hex  # V42.0: server-side summary of older turns is kept per session
+        self.history_sync = {"version": None, "synced": 0}  # V42.1: what the server's conversation log holds
         self.last_img_base64 = ""
         self.last_condition_label = "None"
         self.last_ai_briefing = ""  
         self.voice_active = True
-        self.tts_busy = False
+        # V40.6: Sentence queue replaces the old busy flag (nothing is dropped or truncated)
+        self.speech_queue = queue.Queue()
+        self.voice_ids = {}
+        # V40.4: Single-consumer chat render queue (word/line batches per frame)
+        self.chat_queue = deque()
+        self.chat_rendering = False
+        self.chat_render_job = None  # pending after() id of the renderer, cancelled when the chat is cleared
+        self.instant_chat = tk.BooleanVar(value=False)
         
         try:
             self.tts_engine = pyttsx3.init()
             self.tts_engine.setProperty('rate', 165)
         except:
             self.tts_engine = None
+        if self.tts_engine:
+            threading.Thread(target=self._speech_worker, daemon=True).start()
         
+        self.http = get_session("backend")
+        # V40.3: Crop scores are computed in-process; the worker only syncs shared state
+        self.sync_worker = SimSyncWorker(self.http, self.api_base)
+        self.intel_offsets = {}
+
         self.setup_styles()
         self.setup_ui()
         self.bootstrap()
@@ -147,6 +225,11 @@ class UltimateAgriCommandV14(tk.Tk):
         tk.Button(self.sidebar, text="🌍 ANALYZE LOCATION", bg=self.colors["accent"], fg="black", font=("Inter", 9, "bold"), relief="flat", command=self.analyze_geographic_intelligence).pack(fill="x", pady=10)
 
         tk.Label(self.sidebar, text="📸 BIO-SCAN UPLINK", bg=self.colors["sidebar"], fg=self.colors["dim"], font=("Inter", 9, "bold")).pack(anchor="w", pady=(15, 5))
+        f_crop = tk.Frame(self.sidebar, bg=self.colors["sidebar"])
+        f_crop.pack(fill="x", pady=5)
+        tk.Label(f_crop, text="Scan Crop", bg=self.colors["sidebar"], fg=self.colors["dim"], font=("Inter", 7)).pack(side="left")
+        self.scan_crop_var = tk.StringVar(value=SCAN_CROPS[0])
+        ttk.Combobox(f_crop, textvariable=self.scan_crop_var, values=SCAN_CROPS, state="readonly", font=("Inter", 8), width=15).pack(side="right")
         self.vision_preview = tk.Label(self.sidebar, text="[ NO IMAGE ]", bg="#0d1117", fg=self.colors["dim"], font=("Inter", 7), width=35, height=6)
         self.vision_preview.pack(pady=5)
         self.upload_btn = tk.Button(self.sidebar, text="SCAN LEAF DATA", bg="#161b22", fg="white", font=("Inter", 8, "bold"), relief="flat", command=self.upload_and_diagnose)
@@ -209,6 +292,7 @@ class UltimateAgriCommandV14(tk.Tk):
         
         # V14.0: Clear Chat Button
         tk.Button(self.ai_pane, text="CLEAR HISTORY", bg=self.colors["red"], fg="white", font=("Inter", 8, "bold"), relief="flat", command=self.clear_chat_history).pack(fill="x", pady=(5,10))
+        tk.Checkbutton(self.ai_pane, text="INSTANT TEXT RENDER", variable=self.instant_chat, bg=self.colors["sidebar"], fg=self.colors["dim"], selectcolor="#161b22", activebackground=self.colors["sidebar"], font=("Inter", 7, "bold")).pack(anchor="w")
 
         chat_in_f = tk.Frame(self.ai_pane, bg="#161b22", height=45)
         chat_in_f.pack(fill="x", pady=(15, 0))
@@ -219,10 +303,15 @@ class UltimateAgriCommandV14(tk.Tk):
         tk.Button(chat_in_f, text="SYNC", bg=self.colors["accent"], fg="black", font=("Inter", 9, "bold"), relief="flat", width=8, command=self.send_ai_query).pack(side="right", fill="y")
 
     def bootstrap(self):
+        # V40.1: Subscribe to server push; only poll when no WebSocket client is installed
+        ws_url = self.api_base.replace("http", "ws", 1) + "/live-ws"
+        self.live = LiveSubscriber(ws_url, on_update=lambda s: self.after(0, self.update_dashboard, s['telemetry'], s['market']))
+        if self.live.start(): return
+
         def _poll():
             while True:
                 try:
-                    res = requests.get(f"{self.api_base}/live-data", timeout=3)
+                    res = self.http.get(f"{self.api_base}/live-data", timeout=3)
                     if res.status_code == 200:
                         all_data = res.json()
                         self.after(0, self.update_dashboard, all_data['telemetry'], all_data['market'])
@@ -240,7 +329,7 @@ class UltimateAgriCommandV14(tk.Tk):
             try:
                 url = f"https://nominatim.openstreetmap.org/search?q={query}&format=json&addressdetails=1&limit=5"
                 headers = {"User-Agent": "AgriCommand/1.0"}
-                res = requests.get(url, headers=headers, timeout=3)
+                res = get_session("nominatim").get(url, headers=headers, timeout=3)
                 if res.status_code == 200:
                     suggestions = res.json()
                     self.current_suggestions = suggestions
@@ -283,7 +372,8 @@ class UltimateAgriCommandV14(tk.Tk):
 
     def on_geo_change(self, key, val):
         self.sim_data[key] = val
-        requests.post(f"{self.api_base}/simulate", json=self.sim_data)
+        if key in ("place", "state", "country"): self.intel_offsets = {}
+        self.sync_worker.submit(self.sim_data)
         self.update_predictor()
 
     def toggle_voice(self):
@@ -296,13 +386,14 @@ class UltimateAgriCommandV14(tk.Tk):
 
     def stop_voice(self):
         if self.tts_engine:
-            try: self.tts_engine.stop(); self.tts_busy = False
+            self._drain_speech()
+            try: self.tts_engine.stop()
             except: pass
 
     def on_sim_change(self, key, val, lbl):
         v = float(val); lbl.config(text=f"{v:.2f}")
         self.sim_data[key] = v
-        requests.post(f"{self.api_base}/simulate", json=self.sim_data)
+        self.sync_worker.submit(self.sim_data)
         self.update_predictor()
 
     def update_dashboard(self, telemetry, market):
@@ -318,15 +409,20 @@ class UltimateAgriCommandV14(tk.Tk):
         self.update_predictor()
 
     def update_predictor(self):
-        def _task():
-            try:
-                res = requests.post(f"{self.api_base}/predict-crop", json=self.sim_data, timeout=5)
-                if res.status_code == 200:
-                    data = res.json()
-                    self.after(0, self.draw_predictor, data['scores'], data['recommendation'])
-                    self.after(0, lambda: self.cards['suitability'].config(text=f"{data['suitability']}%"))
-            except: pass
-        threading.Thread(target=_task, daemon=True).start()
+        """V40.3: Local scoring, plus any server-side regional intelligence boosts"""
+        if not hasattr(self, "canvas"): return  # Sliders fire while the UI is still being built
+        scores = predict_crop_scores(self.sim_data)["scores"]
+        for crop, offset in self.intel_offsets.items():
+            if crop in scores: scores[crop] = round(min(100, max(0, scores[crop] + offset)), 1)
+        best = max(scores, key=scores.get)
+        self.draw_predictor(scores, best)
+        self.cards['suitability'].config(text=f"{scores[best]}%")
+
+    def reconcile_predictor(self, server_scores):
+        """Keep the server's local-intelligence boosts as offsets over the local engine"""
+        local = predict_crop_scores(self.sim_data)["scores"]
+        self.intel_offsets = {c: round(v - local[c], 1) for c, v in server_scores.items() if c in local and v != local[c]}
+        self.update_predictor()
 
     def draw_predictor(self, scores, best):
         self.ax.clear(); self.ax.set_facecolor("#0c1117")
@@ -334,41 +430,48 @@ class UltimateAgriCommandV14(tk.Tk):
         colors = ['#00d1ff' if c != best else '#00f07f' for c in crops]
         self.ax.barh(crops, vals, color=colors)
         self.ax.set_xlim(0, 100); self.ax.tick_params(colors="white", labelsize=8)
-        self.canvas.draw()
+        self.canvas.draw_idle()
 
     def speak(self, text, summary_localized=None):
         if not self.voice_active or not self.tts_engine: return
-        def _tts():
-            if self.tts_busy: return
-            self.tts_busy = True
+        # Priority: Localized Summary > Full Text (Cleaned)
+        speech_text = summary_localized if summary_localized else text
+        clean_text = str(speech_text).replace("**", "").replace("__", "").replace("#", "").replace("*", "")
+        lang = self.voice_lang_var.get().lower()
+        for sentence in split_sentences(clean_text):
+            self.speech_queue.put((sentence, lang))
+
+    def _drain_speech(self):
+        try:
+            while True: self.speech_queue.get_nowait()
+        except queue.Empty:
+            pass
+
+    def _voice_for(self, target_lang):
+        """V17.0: Enhanced Voice Search for Indian Languages (resolved once per language)"""
+        if target_lang not in self.voice_ids:
+            voice_id = None
+            for v in self.tts_engine.getProperty('voices'):
+                v_name = v.name.lower()
+                v_lang = v.languages[0].lower() if hasattr(v, 'languages') and v.languages else ""
+                if target_lang in v_name or target_lang[:2] in v_lang:
+                    voice_id = v.id
+                    break
+            self.voice_ids[target_lang] = voice_id
+        return self.voice_ids[target_lang]
+
+    def _speech_worker(self):
+        """Single consumer: speaks queued sentences in order, one at a time"""
+        while True:
+            sentence, lang = self.speech_queue.get()
+            if not self.voice_active: continue
             try:
-                voices = self.tts_engine.getProperty('voices')
-                target_lang = self.voice_lang_var.get().lower()
-                
-                # V17.0: Enhanced Voice Search for Indian Languages
-                voice_id = None
-                for v in voices:
-                    v_name = v.name.lower()
-                    v_lang = v.languages[0].lower() if hasattr(v, 'languages') and v.languages else ""
-                    
-                    if target_lang in v_name or target_lang[:2] in v_lang:
-                        voice_id = v.id
-                        break
-                
-                if voice_id:
-                    self.tts_engine.setProperty('voice', voice_id)
-                
-                # Priority: Localized Summary > Full Text (Cleaned)
-                speech_text = summary_localized if summary_localized else text
-                
-                clean_text = str(speech_text).replace("**", "").replace("__", "").replace("#", "").replace("*", "")
-                self.tts_engine.say(clean_text)
+                voice_id = self._voice_for(lang)
+                if voice_id: self.tts_engine.setProperty('voice', voice_id)
+                self.tts_engine.say(sentence)
                 self.tts_engine.runAndWait()
             except Exception as e:
                 print(f"TTS Error: {e}")
-            finally: 
-                self.tts_busy = False
-        threading.Thread(target=_tts, daemon=True).start()
 
     def analyze_geographic_intelligence(self):
         """V16.0: Scientific Realism with Real-Time Entry Sync"""
@@ -383,11 +486,11 @@ class UltimateAgriCommandV14(tk.Tk):
             try:
                 # Add small variance (0.95-1.05) for realistic data drift
                 self.sim_data["variance"] = random.uniform(0.95, 1.05)
-                res = requests.post(f"{self.api_base}/geographic-intelligence", json=self.sim_data, timeout=10)
+                res = self.http.post(f"{self.api_base}/geographic-intelligence", json=self.sim_data, timeout=10)
                 if res.status_code == 200:
                     data = res.json()
                     self.after(0, lambda: self.display_chat("GEO-INTEL", data['intelligence']))
-                    self.after(0, self.draw_predictor, data['scores'], data['best_crop'])
+                    self.after(0, self.reconcile_predictor, data['scores'])
                     self.after(0, lambda: self.speak(data['intelligence'], data.get('speech_summary')))
                     # Sync dashboard sensors too
                     self.after(0, self.bootstrap_once)
@@ -400,7 +503,7 @@ class UltimateAgriCommandV14(tk.Tk):
     def bootstrap_once(self):
         """Force a single dashboard sensor update for the new location"""
         try:
-            res = requests.get(f"{self.api_base}/live-data", timeout=3)
+            res = self.http.get(f"{self.api_base}/live-data", timeout=3)
             if res.status_code == 200:
                 all_data = res.json()
                 self.update_dashboard(all_data['telemetry'], all_data['market'])
@@ -409,6 +512,14 @@ class UltimateAgriCommandV14(tk.Tk):
     def clear_chat_history(self):
         """V14.0: Clear chat history"""
         self.chat_history = []
+        self.chat_session_id = uuid.uuid4().hex
+        self.history_sync = {"version": None, "synced": 0}
+        self.chat_queue.clear()
+        # A tick already scheduled would keep writing the in-flight message into the cleared widget
+        if self.chat_render_job is not None:
+            self.after_cancel(self.chat_render_job)
+            self.chat_render_job = None
+        self.chat_rendering = False
         self.chat_out.config(state="normal")
         self.chat_out.delete(1.0, "end")
         self.chat_out.config(state="disabled")
@@ -426,8 +537,11 @@ class UltimateAgriCommandV14(tk.Tk):
         self.display_chat("SYS", f"Regional Bio-Scan Initiated... ({self.lang_var.get()})")
         def _task():
             try:
-                res = requests.post(f"{self.api_base}/vision-diagnosis", json={
-                    "image_base64": self.last_img_base64, "language": self.lang_var.get()
+                res = self.http.post(f"{self.api_base}/vision-diagnosis", json={
+                    "image_base64": self.last_img_base64, "language": self.lang_var.get(),
+                    "state": self.sim_data["state"], "season": self.season_var.get(),
+                    # V41.1: A known crop narrows the disease shortlist the most
+                    "crop": None if self.scan_crop_var.get() == SCAN_CROPS[0] else self.scan_crop_var.get()
                 }, timeout=45)
                 data = res.json(); ans = data.get("answer", "Faulty Connection.")
                 self.last_ai_briefing = ans; self.last_condition_label = ans.split('.')[0] if '.' in ans else "Active Bio-Risk"
@@ -437,22 +551,48 @@ class UltimateAgriCommandV14(tk.Tk):
         threading.Thread(target=_task, daemon=True).start()
 
 
+    def attach_history(self, target, messages):
+        """V42.1: Only messages the server's log hasn't seen; the full list to start or resync it"""
+        for k in ("history", "history_version", "history_delta"): target.pop(k, None)
+        target["session_id"] = self.chat_session_id
+        sync = self.history_sync
+        if sync["version"] and sync["synced"] <= len(messages):
+            target.update(history_version=sync["version"], history_delta=messages[sync["synced"]:])
+        else:
+            target["history"] = list(messages)
+
+    def post_with_history(self, endpoint, payload, messages, target, **kwargs):
+        self.attach_history(target, messages)
+        res = self.http.post(f"{self.api_base}/{endpoint}", json=payload, **kwargs)
+        if res.status_code == 200 and res.json().get("history_conflict"):
+            self.history_sync = {"version": None, "synced": 0}
+            self.attach_history(target, messages)
+            res = self.http.post(f"{self.api_base}/{endpoint}", json=payload, **kwargs)
+        return res
+
+    def mark_history_synced(self, data, count):
+        version = data.get("history_version")
+        self.history_sync = {"version": version, "synced": count if version else 0}
+
     def send_ai_query(self):
         msg = self.chat_in.get()
         if not msg:
             return
         self.chat_in.delete(0, tk.END)
         self.display_chat("OPERATOR", msg)
+        earlier = list(self.chat_history)
         self.chat_history.append({"role": "user", "content": msg})
         def _task():
             try:
-                res = requests.post(f"{self.api_base}/chat", json={
-                    "message": msg, "context_data": {**self.sim_data, "history": self.chat_history}, 
+                context_data = dict(self.sim_data)
+                res = self.post_with_history("chat", {
+                    "message": msg, "context_data": context_data, 
                     "language": self.lang_var.get()
-                })
+                }, earlier, context_data)
                 data = res.json()
                 ans = data.get("answer", "Link lost.")
                 self.chat_history.append({"role": "assistant", "content": ans})
+                self.mark_history_synced(data, len(self.chat_history))  # the server logged both turns
                 self.last_ai_briefing = ans
                 self.after(0, lambda: self.display_chat("STRATEGIST", ans))
                 self.after(0, lambda: self.speak(ans, data.get("speech_summary")))
@@ -460,32 +600,57 @@ class UltimateAgriCommandV14(tk.Tk):
                 self.after(0, lambda: self.display_chat("ERROR", str(e)))
         threading.Thread(target=_task, daemon=True).start()
 
+    CHAT_CHARS_PER_FRAME = 400
+    CHAT_FRAME_MS = 16
+
     def display_chat(self, sender, text):
+        """V40.4: Queue a message; one consumer renders messages in order without interleaving"""
+        self.chat_queue.append((sender, str(text)))
+        if not self.chat_rendering:
+            self.chat_rendering = True
+            self._schedule_render()
+
+    def _schedule_render(self, chunks=None):
+        """Next renderer tick: the rest of the current message after a frame, else the next message when idle"""
+        if chunks:
+            self.chat_render_job = self.after(self.CHAT_FRAME_MS, self._render_chat, chunks)
+        else:
+            self.chat_render_job = self.after_idle(self._render_chat)
+
+    def _render_chat(self, chunks=None):
+        self.chat_render_job = None
+        if chunks is None:
+            if not self.chat_queue:
+                self.chat_rendering = False
+                return
+            sender, text = self.chat_queue.popleft()
+            color = self.colors["accent"]
+            if sender == "OPERATOR": color = "white"
+            elif sender == "SYS": color = self.colors["gold"]
+            elif sender == "BIO-SCAN": color = self.colors["green"]
+            tag = f"hdr_{sender}"
+            self.chat_out.tag_configure(tag, font=("Inter", 9, "bold"), foreground=color)
+            self._chat_insert((f"\n[{sender}] ", tag))
+            if self.instant_chat.get():
+                self._chat_insert((text + "\n",))
+                self._schedule_render()
+                return
+            chunks = deque(re.findall(r"\S+\s*|\s+", text))
+            chunks.append("\n")
+
+        # Insert whole words/lines up to the per-frame budget, then yield to the event loop
+        batch, size = [], 0
+        while chunks and size < self.CHAT_CHARS_PER_FRAME:
+            piece = chunks.popleft()
+            batch.append(piece); size += len(piece)
+        self._chat_insert(("".join(batch),))
+        self._schedule_render(chunks)
+
+    def _chat_insert(self, args):
         self.chat_out.config(state="normal")
-        color = self.colors["accent"]
-        if sender == "OPERATOR": color = "white"
-        elif sender == "SYS": color = self.colors["gold"]
-        elif sender == "BIO-SCAN": color = self.colors["green"]
-        
-        self.chat_out.insert("end", f"\n[{sender}] ", "bold")
-        self.chat_out.tag_configure("bold", font=("Inter", 9, "bold"), foreground=color)
-        
-        # V15.0 Rapid Typing Effect
-        def _type(i=0):
-            if i < len(text):
-                self.chat_out.config(state="normal")
-                self.chat_out.insert("end", text[i])
-                self.chat_out.config(state="disabled")
-                self.chat_out.see("end")
-                # Speed control: 5ms per char for "High Accuracy/Speed" feel
-                self.after(5, lambda: _type(i+1))
-            else:
-                self.chat_out.config(state="normal")
-                self.chat_out.insert("end", "\n")
-                self.chat_out.config(state="disabled")
-                self.chat_out.see("end")
-        
-        _type()
+        self.chat_out.insert("end", *args)
+        self.chat_out.config(state="disabled")
+        self.chat_out.see("end")
 
     def open_analytics_window(self):
         win = tk.Toplevel(self); win.title("🧬 REGIONAL ANALYTICS"); win.geometry("800x500"); win.configure(bg="#05070a")
@@ -498,14 +663,16 @@ class UltimateAgriCommandV14(tk.Tk):
             if self.last_ai_briefing: self.speak(self.last_ai_briefing)
             payload = {
                 "data": self.sim_data, "recommendation": self.last_ai_briefing, 
-                "sector": self.sector_var.get(), "history": self.chat_history,
+                "sector": self.sector_var.get(),
                 "image_base64": self.last_img_base64, "condition_name": self.last_condition_label,
                 "language": self.lang_var.get(),
                 "country": self.sim_data["country"], "state": self.sim_data["state"],
                 "place": self.sim_data["place"], "soil_type": self.sim_data["soil_type"]
             }
-            res = requests.post(f"{self.api_base}/generate-report", json=payload)
-            if res.status_code == 200: webbrowser.open(res.json()['report_url'])
+            res = self.post_with_history("generate-report", payload, self.chat_history, payload)
+            if res.status_code == 200:
+                self.mark_history_synced(res.json(), len(self.chat_history))
+                webbrowser.open(res.json()['report_url'])
             else: messagebox.showerror("Engine Fault", f"V13.5 Safety Triggered: {res.json().get('message')}")
         except Exception as e: messagebox.showerror("Error", f"Report failed: {str(e)}")
 
@@ -1,28 +1,28 @@
 import streamlit as st
-import requests
-import re
 import os
-import json
 import base64
 import random
+import uuid
 import datetime
 import pandas as pd
 from PIL import Image
 from io import BytesIO
-from gtts import gTTS
-from fpdf import FPDF
 from dotenv import load_dotenv
 import folium
+from folium.plugins import HeatMap
 from streamlit_folium import st_folium
 
 # --- CONFIG & PATHS ---
 load_dotenv(os.path.join(os.path.dirname(__file__), "backend", ".env"))
 try:
-    from disease_database import DISEASE_TREATMENTS, get_disease_info
+    from disease_database import SCAN_CROPS
 except ImportError:
     import sys
     sys.path.append(os.path.join(os.path.dirname(__file__), "backend"))
-    from disease_database import DISEASE_TREATMENTS, get_disease_info
+    from disease_database import SCAN_CROPS
+from live_channel import LiveSubscriber
+from tts_cache import TTSCache, LANG_CODES, clean_speech_text
+from connectivity import BackendLink, BackendBusy
 
 # --- PAGE CONFIG (SEO OPTIMIZED) ---
 st.set_page_config(
@@ -183,42 +183,50 @@ st.markdown("""
 # --- BACKEND LINK ---
 API_BASE = "http://localhost:8002/api"
 
+@st.cache_resource
+def get_backend_link():
+    """V40.7: One health-probed link per Streamlit server; the chosen mode is cached between probes"""
+    return BackendLink(API_BASE)
+
 def call_backend(endpoint, method="POST", payload=None):
-    # Try localhost first (Local Dev Mode)
+    # Local Dev Mode: only when the last /api/health probe found the server
+    if method == "POST" and payload and "context_data" in payload:
+        # Pass history in context_data if missing (V42.1: sessions keep it on the server instead)
+        if "history" not in payload["context_data"] and "session_id" not in payload["context_data"]:
+            payload["context_data"]["history"] = st.session_state.chat_history
     try:
-        url = f"{API_BASE}/{endpoint}"
-        if method == "POST":
-            # Pass history in context_data if missing
-            if payload and "context_data" in payload:
-                if "history" not in payload["context_data"]:
-                    payload["context_data"]["history"] = st.session_state.chat_history
-            res = requests.post(url, json=payload, timeout=2) # Short timeout to check if alive
-        else:
-            res = requests.get(url, timeout=2)
-        if res.status_code == 200:
-            return res.json()
-    except:
-        pass
+        res = get_backend_link().request(endpoint, method, payload)
+        if res is not None:
+            return res
+    except BackendBusy as busy:
+        # The server is still working on it; re-running locally would double the upstream cost
+        st.warning(f"⏳ Backend is still processing this request. Please retry in a moment. (Ref: {busy.request_id})")
+        return None
 
     # FALLBACK: Local Logic Mode (Streamlit Cloud Mode)
     try:
-        from backend import logic
+        import logic  # V41.3: the same engine module the FastAPI routes call
         res = None
         if endpoint == "geographic-intelligence":
             res = logic.get_geographic_intelligence_logic(payload)
         elif endpoint == "chat":
             res = logic.chat_logic(payload['message'], payload['language'], payload['context_data'])
         elif endpoint == "vision-diagnosis":
-            res = logic.vision_diagnosis_logic(payload['image_base64'], payload['language'])
+            res = logic.vision_diagnosis_logic(payload['image_base64'], payload['language'], payload.get('lat'), payload.get('lon'),
+                                               payload.get('crop'), payload.get('state'), payload.get('season'))
         elif endpoint == "live-data":
             weather = logic.get_real_weather(payload.get("place", "Coimbatore")) if payload else None
             market = logic.get_real_commodity_prices()
             res = {"telemetry": weather or {}, "market": market or {}}
         elif endpoint == "generate-report":
             res = logic.generate_report_logic(payload)
+        elif endpoint == "outbreak-heatmap":
+            res = logic.outbreak_heatmap_logic(**(payload or {}))
         
         # --- FRONTEND KILL SWITCH (CLOUD MODE) ---
-        if res and isinstance(res, dict) and "answer" in res:
+        # Chat answers are already cleaned by chat_logic before they are logged; changing them here would
+        # make this session's history differ from the conversation log
+        if endpoint != "chat" and res and isinstance(res, dict) and "answer" in res:
             meta_triggers = ["Meta AI", "Facebook", "Meta's", "Llama", "Jason Weston"]
             if any(t.lower() in res["answer"].lower() for t in meta_triggers):
                 res["answer"] = f"AgriVision AI Architect Update: I am an autonomous intelligence platform developed by SHAIK MOHAMMAD THAHEER at SRM Institute. My previous response about Meta was a base-model hallucination. " + res["answer"]
@@ -230,6 +238,20 @@ def call_backend(endpoint, method="POST", payload=None):
     
     return None
 
+@st.cache_resource
+def get_live_subscriber():
+    """V40.1: One push subscription per Streamlit server, shared by every session"""
+    sub = LiveSubscriber(API_BASE.replace("http", "ws", 1) + "/live-ws")
+    sub.start()
+    return sub
+
+def get_live_data():
+    """Latest pushed telemetry/market; falls back to a one-off fetch in standalone mode"""
+    live = get_live_subscriber()
+    if live.connected and live.state["market"]:
+        return live.snapshot()
+    return call_backend("live-data", method="GET")
+
 # Location autocomplete removed per user request
 
 # --- SECRETS / ENV ---
@@ -245,24 +267,31 @@ GROQ_API_KEY = get_api_key("GROQ_API_KEY")
 HF_API_KEY = get_api_key("HUGGING_FACE_API_KEY")
 
 # --- LOGIC ENGINES ---
+@st.cache_resource
+def get_tts_cache():
+    """V40.5: Process-wide voice cache (LRU memory + on-disk MP3 store)"""
+    return TTSCache(os.path.join(os.path.dirname(__file__), ".tts_cache"))
+
 def trigger_voice_output(text, lang_name):
-    """Refined Voice Sync: Ensures real-time localized audio briefing"""
+    """Refined Voice Sync: starts background synthesis as soon as the summary arrives"""
     if not st.session_state.voice_active: return
     
-    lang_code_map = {"English": "en", "Hindi": "hi", "Tamil": "ta", "Telugu": "te", "Urdu": "ur", "Malayalam": "ml"}
-    code = lang_code_map.get(lang_name, "en")
-    
-    try:
-        # Clean text for better TTS (Remove markdown links/formatting)
-        clean_text = re.sub(r'\[.*?\]\(.*?\)', '', text)
-        clean_text = clean_text.replace("**", "").replace("__", "").replace("#", "")
-        
-        tts = gTTS(text=clean_text[:500], lang=code) # Limit to 500 chars for speed
-        fp = BytesIO()
-        tts.write_to_fp(fp)
-        st.session_state.last_speech = fp.getvalue()
-    except:
-        st.session_state.last_speech = None
+    code = LANG_CODES.get(lang_name, "en")
+    clean_text = clean_speech_text(text)
+    # V40.6: Full advisory, sentence-chunked. The backend streams chunks in order as they finish;
+    # standalone mode synthesizes the same chunks concurrently and joins them at playback.
+    res = call_backend("tts", payload={"text": clean_text, "language": code})
+    if res and res.get("stream_url"):
+        st.session_state.last_speech = res["stream_url"]
+    else:
+        st.session_state.last_speech = get_tts_cache().synthesize_chunks(clean_text, code)
+
+def resolve_speech(timeout=30):
+    """Playable briefing: a progressive stream URL, or joined MP3 bytes from local chunk futures"""
+    pending = st.session_state.last_speech
+    if pending is None: return None
+    if isinstance(pending, (str, bytes)): return pending
+    return b"".join(TTSCache.stream(pending, timeout=timeout)) or None
 
 def get_wiki_intel(place):
     # Try calling backend geographic-intelligence first
@@ -270,6 +299,7 @@ def get_wiki_intel(place):
 
 
 def generate_elite_pdf(profile, audit, intel, telemetry):
+    from fpdf import FPDF  # Only loaded when a report is actually requested
     pdf = FPDF()
     pdf.add_page()
     # Header
@@ -308,12 +338,53 @@ def generate_elite_pdf(profile, audit, intel, telemetry):
     
     return pdf.output()
 
+# --- V42.1: CONVERSATION LOG SYNC ---
+# The backend keeps the chat history per session; requests carry only the messages it hasn't seen yet.
+def clean_messages(messages):
+    """Remove any mention of Meta from past messages to prevent poisoning the model"""
+    cleaned = []
+    for m in messages:
+        content = m["content"]
+        for t in ["Meta AI", "Facebook", "Meta"]:
+            content = content.replace(t, "AgriVision AI")
+        cleaned.append({"role": m["role"], "content": content})
+    return cleaned
+
+def attach_history(target, messages):
+    """Delta against the last acknowledged version, or the full list to start a log or resync it"""
+    sync = st.session_state.history_sync
+    for k in ("history", "history_version", "history_delta"): target.pop(k, None)
+    target["session_id"] = st.session_state.chat_session_id
+    if sync["version"] and sync["synced"] <= len(messages):
+        target.update(history_version=sync["version"], history_delta=clean_messages(messages[sync["synced"]:]))
+    else:
+        target["history"] = clean_messages(messages)
+
+def mark_history_synced(res, count):
+    """`count` local messages are now in the server log (unless the response carries no version)"""
+    version = (res or {}).get("history_version")
+    st.session_state.history_sync = {"version": version, "synced": count if version else 0}
+
+def call_with_history(endpoint, payload, messages, target):
+    attach_history(target, messages)
+    res = call_backend(endpoint, payload=payload)
+    if res and res.get("history_conflict"):
+        # Another tab or worker moved the log on: replace it with this client's view
+        mark_history_synced(None, 0)
+        attach_history(target, messages)
+        res = call_backend(endpoint, payload=payload)
+    return res
+
 # --- SESSION STATE (CONTEXTUAL MEMORY) ---
 if 'chat_history' not in st.session_state: st.session_state.chat_history = []
 if 'location_context' not in st.session_state: st.session_state.location_context = None
 if 'bio_context' not in st.session_state: st.session_state.bio_context = None
 if 'intel' not in st.session_state: st.session_state.intel = ""
 if 'audit' not in st.session_state: st.session_state.audit = None
+# V42.0: The server keeps intel blocks and the history summary per chat session; unchanged intel goes by ref
+if 'chat_session_id' not in st.session_state: st.session_state.chat_session_id = uuid.uuid4().hex
+if 'intel_refs' not in st.session_state: st.session_state.intel_refs = {}
+if 'history_sync' not in st.session_state: st.session_state.history_sync = {"version": None, "synced": 0}
 if 'last_speech' not in st.session_state: st.session_state.last_speech = None
 if 'voice_active' not in st.session_state: st.session_state.voice_active = True
 if 'telemetry' not in st.session_state: st.session_state.telemetry = {"temp": 28.5, "ph": 6.5, "n": 2.50, "suitability": 85}
@@ -357,7 +428,7 @@ with st.sidebar:
     if st.button("📍 LOCATE ON MAP", use_container_width=True):
         with st.spinner("Searching Coordinates..."):
             try:
-                from backend import logic
+                import logic
                 query = f"{place}, {state}, {country}"
                 res = logic.forward_geocode(query)
                 if res:
@@ -416,6 +487,7 @@ with st.sidebar:
     st.markdown('<div class="sidebar-section-label">Bio-Scan Uplink</div>', unsafe_allow_html=True)
     
     # Selection Mode: Prevent camera from opening automatically
+    scan_crop = st.selectbox("Scan Crop", SCAN_CROPS, label_visibility="collapsed")
     input_mode = st.radio("Input Source", ["📁 UPLOAD", "📸 CAMERA"], horizontal=True, label_visibility="collapsed")
     
     final_image = None
@@ -443,7 +515,13 @@ with st.sidebar:
                 img_to_save.save(buffered, format="JPEG", quality=85)
                 img_b64 = base64.b64encode(buffered.getvalue()).decode()
                 
-                res = call_backend("vision-diagnosis", payload={"image_base64": img_b64, "language": lang})
+                # V41.1: Location context narrows the disease shortlist sent to the vision model
+                vision_payload = {"image_base64": img_b64, "language": lang, "state": state, "season": season}
+                if scan_crop != SCAN_CROPS[0]: vision_payload["crop"] = scan_crop
+                # V39.0: Geo-tag the scan for the outbreak heatmap
+                if st.session_state.map_coords:
+                    vision_payload["lat"], vision_payload["lon"] = st.session_state.map_coords
+                res = call_backend("vision-diagnosis", payload=vision_payload)
                 if res:
                     ans = res.get("answer", "Faulty Connection.")
                     disease_info = res.get("disease_info", {})
@@ -501,21 +579,22 @@ with st.sidebar:
     if st.button("📂 GENERATE ELITE REPORT"):
         with st.spinner("Compiling Industrial Audit..."):
             # Fetch latest market data for the report
-            live_res = call_backend("live-data", method="GET")
+            live_res = get_live_data()
             market = live_res.get("market", {}) if live_res else {}
             
             payload = {
                 "data": {"temperature": temp, "ph": ph, "nitrogen": nitro, "place": place, "state": state, "country": country, "soil_type": soil, "season": season},
                 "recommendation": st.session_state.chat_history[-1]['content'] if st.session_state.chat_history else "Industrial session active. Field protocols deployed.",
-                "language": lang, "history": st.session_state.chat_history,
+                "language": lang,
                 "market_snapshot": market,
                 "condition_name": st.session_state.audit.get('label') if st.session_state.audit else "Unknown",
                 "disease_info": st.session_state.audit.get('db') if st.session_state.audit else None,
                 "image_base64": st.session_state.audit.get('image_base64') if st.session_state.audit else None,
                 "country": country, "state": state, "place": place, "soil_type": soil, "season": season
             }
-            res = call_backend("generate-report", payload=payload)
+            res = call_with_history("generate-report", payload, st.session_state.chat_history, payload)
             if res:
+                mark_history_synced(res, len(st.session_state.chat_history))
                 if "error" in res:
                     st.error(f"🚨 Report Engine Error: {res['error']}")
                 elif "report_b64" in res:
@@ -562,6 +641,11 @@ with col_viz:
         m = folium.Map(location=st.session_state.map_center, zoom_start=st.session_state.map_zoom)
         if st.session_state.map_coords:
             folium.Marker(st.session_state.map_coords, popup="Selected Mission Site").add_to(m)
+
+        # V39.0: Disease pressure overlay from the pre-aggregated outbreak index
+        outbreak = call_backend("outbreak-heatmap", method="GET", payload={"days": 30})
+        if outbreak and outbreak.get("tiles"):
+            HeatMap([[t["lat"], t["lon"], t["count"]] for t in outbreak["tiles"]], name="Disease Pressure", radius=25).add_to(m)
         
         map_interaction = st_folium(m, height=450, width=None, key="main_geo_map", use_container_width=True)
         
@@ -574,7 +658,7 @@ with col_viz:
                 st.session_state.map_center = [c["lat"], c["lng"]]
                 # Background geocode
                 try:
-                    from backend import logic
+                    import logic
                     geo = logic.reverse_geocode(c["lat"], c["lng"])
                     if geo:
                         st.session_state.place_val = geo["place"]
@@ -719,7 +803,9 @@ with col_chat:
     if st.button("🔊 PLAY VOICE BRIEFING", use_container_width=True):
         if st.session_state.last_speech_text:
             trigger_voice_output(st.session_state.last_speech_text, lang)
-            st.audio(st.session_state.last_speech, format="audio/mp3", autoplay=True)
+            audio = resolve_speech()
+            if audio: st.audio(audio, format="audio/mp3", autoplay=True)
+            st.session_state.last_speech = None
         else:
             st.warning("No briefing available in context.")
 
@@ -730,39 +816,40 @@ with col_chat:
             st.markdown(f'<div class="{cls}">{msg["content"]}</div>', unsafe_allow_html=True)
 
     if prompt := st.chat_input("Enter Command (Strategy, Bio, or Geo)...", key="master_input"):
-        # CLEAN HISTORY: Remove any mention of Meta from past messages to prevent poisoning the model
-        clean_history = []
-        for m in st.session_state.chat_history:
-            content = m["content"]
-            for t in ["Meta AI", "Facebook", "Meta"]:
-                content = content.replace(t, "AgriVision AI")
-            clean_history.append({"role": m["role"], "content": content})
-        
+        earlier = list(st.session_state.chat_history)
         st.session_state.chat_history.append({"role": "user", "content": prompt})
         with st.spinner("Neural Uplink Syncing..."):
             # Pass full agricultural context in every query
-            res = call_backend("chat", payload={
-                "message": prompt, 
-                "language": lang, 
-                "context_data": {
-                    "telemetry": st.session_state.telemetry,
-                    "place": place, "state": state, "country": country, 
-                    "soil": soil, "season": season,
-                    "location_intel": st.session_state.intel,
-                    "bio_audit": st.session_state.audit.get('raw_res') if st.session_state.audit else None,
-                    "chat_focus": st.session_state.chat_focus,
-                    "history": clean_history # Send cleaned history
-                }
-            })
+            context_data = {
+                "telemetry": st.session_state.telemetry,
+                "place": place, "state": state, "country": country, 
+                "soil": soil, "season": season,
+                "chat_focus": st.session_state.chat_focus,
+            }
+            intel_blocks = {
+                "location_intel": st.session_state.intel,
+                "bio_audit": st.session_state.audit.get('raw_res') if st.session_state.audit else None,
+            }
+            # V42.0: Intel the server already holds for this session is sent as its digest only
+            for kind, text in intel_blocks.items():
+                sent = st.session_state.intel_refs.get(kind)
+                if text and sent and sent[0] == text: context_data[f"{kind}_ref"] = sent[1]
+                else: context_data[kind] = text
+            payload = {"message": prompt, "language": lang, "context_data": context_data}
+            res = call_with_history("chat", payload, earlier, context_data)
+            if res and res.get("context_refs_missing"):
+                # Session expired server-side: resend the full blocks once (the history delta is already in)
+                mark_history_synced(res, len(earlier))
+                for kind in res["context_refs_missing"]:
+                    context_data.pop(f"{kind}_ref", None)
+                    context_data[kind] = intel_blocks[kind]
+                res = call_with_history("chat", payload, earlier, context_data)
             if res:
+                st.session_state.intel_refs = {kind: (intel_blocks[kind], ref) for kind, ref in (res.get("intel_refs") or {}).items()}
+                # Stored exactly as the server logged it (identity safeguard already applied server-side)
                 ans = res.get("answer", "Link Failure.")
-                
-                # --- FINAL UI LEVEL KILL SWITCH ---
-                if any(t in ans for t in ["Meta AI", "Facebook", "Llama"]):
-                    ans = f"I am AgriVision AI, developed by SHAIK MOHAMMAD THAHEER. " + ans
-                    for t in ["Meta AI", "Facebook", "Llama"]: ans = ans.replace(t, "Thaheer AI")
-                
                 st.session_state.chat_history.append({"role": "assistant", "content": ans})
+                mark_history_synced(res, len(st.session_state.chat_history))  # the server logged both turns
                 
                 # V36.0: NATURAL VOICE TRIGGER
                 st.session_state.last_speech_text = res.get("speech_summary", ans)
@@ -771,7 +858,8 @@ with col_chat:
 
     # --- VOICE OUTPUT RENDERER ---
     if st.session_state.last_speech and st.session_state.voice_active:
-        st.audio(st.session_state.last_speech, format="audio/mp3", autoplay=True)
+        audio = resolve_speech()
+        if audio: st.audio(audio, format="audio/mp3", autoplay=True)
         # Clear after playing to avoid repeat on rerun
         st.session_state.last_speech = None
 
@@ -792,6 +880,9 @@ with col_chat:
         st.session_state.chat_history = []
         st.session_state.intel = ""
         st.session_state.audit = None
+        st.session_state.chat_session_id = uuid.uuid4().hex
+        st.session_state.intel_refs = {}
+        st.session_state.history_sync = {"version": None, "synced": 0}
         st.session_state.last_report_url = None
         st.rerun()
 